@@ -3,6 +3,7 @@
 namespace App\Http\Controllers;
 
 use App\Models\Customer;
+use App\Services\Promotions\PromotionCustomerProfile;
 use Illuminate\Http\Request;
 use Illuminate\Support\Facades\Auth;
 use Illuminate\Support\Facades\Log;
@@ -132,6 +133,9 @@ public function update(Request $request, $id)
             ]);
 
             $customer->update($validated);
+            if ($customer->wasChanged('price_group_id')) {
+                PromotionCustomerProfile::forget((int) $customer->company_id, (int) $customer->id);
+            }
             $customer->load('creator', 'priceGroup');
 
             return response()->json([
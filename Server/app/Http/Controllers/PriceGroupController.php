@@ -5,6 +5,7 @@
 use Illuminate\Http\Request;
 use App\Models\PriceGroup;
 use App\Services\PriceGroupService;
+use App\Services\Promotions\PromotionCustomerProfile;
 use Illuminate\Support\Facades\Validator;
 use Illuminate\Validation\Rule;
 
@@ -153,6 +154,10 @@ public function update(Request $request, $id)
         }
 
         $priceGroup->update($updateData);
+        if ($priceGroup->wasChanged('code')) {
+            // Promotions may target the group by code
+            PromotionCustomerProfile::forgetCompany($user->company_id);
+        }
 
         return response()->json([
             'message' => 'Price group updated successfully',
@@ -5,6 +5,7 @@
 use App\Models\ProductPrice;
 use App\Models\UOM;
 use App\Services\UOMConversionService;
+use App\Services\Promotions\PromotionPriceCache;
 use Illuminate\Support\Facades\Auth;
 use Illuminate\Support\Facades\Cache;
 use Illuminate\Support\Facades\Log;
@@ -754,6 +755,52 @@ public function getLowStockProducts()
         }
     }
 
+    // Lightweight product lookup for pickers: prefix search on name/SKU, or resolve ids[]
+    public function search(Request $request)
+    {
+        $user = $request->user();
+        if (!$user || !$user->company_id) {
+            return response()->json(['error' => 'Unauthorized or no company associated'], 403);
+        }
+
+        $validated = $request->validate([
+            'q' => 'nullable|string|max:100',
+            'ids' => 'nullable|array|max:500',
+            'ids.*' => 'integer',
+            'limit' => 'nullable|integer|min:1|max:50',
+        ]);
+
+        $query = Product::query()
+            ->select(['id', 'name', 'sku'])
+            ->where('company_id', $user->company_id);
+
+        if (!empty($validated['ids'])) {
+            return response()->json($query->whereIn('id', $validated['ids'])->get(), 200);
+        }
+
+        $term = trim($validated['q'] ?? '');
+        if ($term === '') {
+            return response()->json([], 200);
+        }
+
+        // One prefix query per column so each can range-scan its own index
+        // (products_company_name_index, products_company_sku_index); an OR
+        // across the two columns would fall back to scanning the company
+        $prefix = addcslashes($term, '%_\\') . '%';
+        $limit = $validated['limit'] ?? 20;
+
+        $byName = (clone $query)->where('name', 'like', $prefix)->orderBy('name')->limit($limit)->get();
+        $bySku = (clone $query)->where('sku', 'like', $prefix)->orderBy('name')->limit($limit)->get();
+
+        $products = $byName->concat($bySku)
+            ->unique('id')
+            ->sortBy('name', SORT_STRING | SORT_FLAG_CASE)
+            ->take($limit)
+            ->values();
+
+        return response()->json($products, 200);
+    }
+
     // Show specific product
     public function show($id)
     {
@@ -844,6 +891,11 @@ public function update(Request $request, $id)
 
             $product->update($validated);
 
+            // Free "get" units of promotions are valued at cached product prices
+            if ($product->wasChanged('price')) {
+                PromotionPriceCache::forget($product->company_id);
+            }
+
             // Sync multiple sale UOMs if provided
             if ($saleUomIds !== null) {
                 $syncData = [];
@@ -0,0 +1,91 @@
+<?php
+
+namespace App\Http\Controllers;
+
+use App\Jobs\Promotions\RunPromotionBacktestShardJob;
+use App\Models\PromotionBacktest;
+use App\Models\Sale;
+use Illuminate\Http\Request;
+
+class PromotionBacktestController extends Controller
+{
+    /**
+     * Queue a backtest of a draft promotion over the company's sales in a
+     * date range. The sales are split into id-range shards, one job each.
+     */
+    public function store(Request $request)
+    {
+        $user = $request->user();
+        if (!$user || !$user->company_id) {
+            return response()->json(['error' => 'Unauthorized or no company associated'], 403);
+        }
+
+        $validated = $request->validate([
+            'start_date' => 'required|date',
+            'end_date' => 'required|date|after_or_equal:start_date',
+            'promotion' => 'required|array',
+            'promotion.name' => 'nullable|string|max:255',
+            'promotion.type' => 'required|in:percentage,fixed_amount,buy_x_get_y,spend_save,bulk_discount',
+            'promotion.discount_value' => 'nullable|numeric|min:0',
+            'promotion.buy_quantity' => 'nullable|integer|min:1',
+            'promotion.get_quantity' => 'nullable|integer|min:1',
+            'promotion.buy_products' => 'nullable|array',
+            'promotion.get_products' => 'nullable|array',
+            'promotion.bxgy_config' => 'nullable|array',
+            'promotion.minimum_purchase' => 'nullable|numeric|min:0',
+            'promotion.minimum_quantity' => 'nullable|integer|min:1',
+            'promotion.scope' => 'required|in:all,category,product,customer_group',
+            'promotion.scope_items' => 'nullable|array',
+            'promotion.is_stackable' => 'boolean',
+        ]);
+
+        $startDate = date('Y-m-d', strtotime($validated['start_date']));
+        $endDate = date('Y-m-d', strtotime($validated['end_date']));
+
+        $range = Sale::where('company_id', $user->company_id)
+            ->whereBetween('created_at', [$startDate . ' 00:00:00', $endDate . ' 23:59:59'])
+            ->selectRaw('MIN(id) as min_id, MAX(id) as max_id, COUNT(*) as total')
+            ->toBase()
+            ->first();
+        $totalSales = (int) ($range->total ?? 0);
+
+        $backtest = PromotionBacktest::create([
+            'company_id' => $user->company_id,
+            'created_by' => $user->id,
+            'promotion' => $validated['promotion'],
+            'start_date' => $startDate,
+            'end_date' => $endDate,
+            'status' => $totalSales > 0 ? 'pending' : 'completed',
+            'total_sales' => $totalSales,
+            'completed_at' => $totalSales > 0 ? null : now(),
+        ]);
+
+        if ($totalSales > 0) {
+            $chunkSize = max(1, (int) config('promotions.backtest_chunk_size', 500));
+            $shardCount = max(1, min((int) config('promotions.backtest_shards', 4), (int) ceil($totalSales / $chunkSize)));
+            $minId = (int) $range->min_id;
+            $maxId = (int) $range->max_id;
+            $step = (int) ceil(($maxId - $minId + 1) / $shardCount);
+
+            for ($from = $minId; $from <= $maxId; $from += $step) {
+                $shard = $backtest->shards()->create([
+                    'from_sale_id' => $from,
+                    'to_sale_id' => min($maxId, $from + $step - 1),
+                ]);
+                RunPromotionBacktestShardJob::dispatch($shard);
+            }
+        }
+
+        return response()->json($backtest->summary(), 202);
+    }
+
+    /**
+     * Progress and (partial) results of a backtest.
+     */
+    public function show(Request $request, $id)
+    {
+        $backtest = PromotionBacktest::where('company_id', $request->user()->company_id)->findOrFail($id);
+
+        return response()->json($backtest->summary());
+    }
+}
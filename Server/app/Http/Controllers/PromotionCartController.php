@@ -0,0 +1,100 @@
+<?php
+
+namespace App\Http\Controllers;
+
+use App\Services\Promotions\PromotionCartSession;
+use Illuminate\Http\Request;
+
+/**
+ * Server-side POS carts for pricing large carts edited line by line. Each
+ * response has the same shape as calculateDiscount plus the cart lines.
+ */
+class PromotionCartController extends Controller
+{
+    private const MAX_DELTAS = 200;
+
+    /**
+     * Create a cart, optionally with initial lines and customer.
+     */
+    public function store(Request $request)
+    {
+        $user = $request->user();
+        if (!$user || !$user->company_id) {
+            return response()->json(['error' => 'Unauthorized or no company associated'], 403);
+        }
+
+        $validated = $request->validate([
+            'customer_id' => 'nullable|integer',
+            'lines' => 'nullable|array',
+            'lines.*.line_id' => 'nullable|string|max:100',
+            'lines.*.product_id' => 'required|integer',
+            'lines.*.quantity' => 'required|integer|min:1',
+            'lines.*.price' => 'required|numeric',
+        ]);
+
+        $session = PromotionCartSession::create(
+            (int) $user->company_id,
+            $validated['lines'] ?? [],
+            !empty($validated['customer_id']) ? (int) $validated['customer_id'] : null
+        );
+        $quote = $session->quote();
+        $session->save();
+
+        return response()->json($quote, 201);
+    }
+
+    public function show(Request $request, string $id)
+    {
+        $session = PromotionCartSession::find($id, (int) $request->user()->company_id);
+        if (!$session) {
+            return response()->json(['error' => 'Cart not found or expired'], 404);
+        }
+
+        $quote = $session->quote();
+        $session->save();
+
+        return response()->json($quote);
+    }
+
+    /**
+     * Apply line deltas and return the new quote. full=1 re-prices every
+     * promotion instead of only those the changed lines can affect.
+     */
+    public function applyDeltas(Request $request, string $id)
+    {
+        $validated = $request->validate([
+            'full' => 'boolean',
+            'deltas' => 'required|array|min:1|max:' . self::MAX_DELTAS,
+            'deltas.*.op' => 'required|in:add_line,set_quantity,remove_line,set_customer',
+            'deltas.*.line_id' => 'nullable|string|max:100|required_if:deltas.*.op,set_quantity,remove_line',
+            'deltas.*.product_id' => 'required_if:deltas.*.op,add_line|integer',
+            'deltas.*.quantity' => 'required_if:deltas.*.op,add_line,set_quantity|integer|min:1',
+            'deltas.*.price' => 'required_if:deltas.*.op,add_line|numeric',
+            'deltas.*.customer_id' => 'nullable|integer',
+        ]);
+
+        $session = PromotionCartSession::find($id, (int) $request->user()->company_id);
+        if (!$session) {
+            return response()->json(['error' => 'Cart not found or expired'], 404);
+        }
+
+        $session->applyDeltas($validated['deltas']);
+        if (!empty($validated['full'])) {
+            $session->recompute();
+        }
+        $quote = $session->quote();
+        $session->save();
+
+        return response()->json($quote);
+    }
+
+    public function destroy(Request $request, string $id)
+    {
+        $session = PromotionCartSession::find($id, (int) $request->user()->company_id);
+        if ($session) {
+            $session->forget();
+        }
+
+        return response()->json(['message' => 'Cart discarded']);
+    }
+}
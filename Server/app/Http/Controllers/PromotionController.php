@@ -4,6 +4,11 @@
 
 use App\Models\Promotion;
 use App\Models\Product; // Import Product model
+use App\Services\Promotions\PromotionEvaluator;
+use App\Services\Promotions\PromotionMetrics;
+use App\Services\Promotions\PromotionQuoteStore;
+use App\Services\Promotions\PromotionRuleCache;
+use Carbon\Carbon;
 use Illuminate\Http\Request;
 use Illuminate\Support\Facades\Auth;
 use Illuminate\Support\Facades\Log;
@@ -11,25 +16,156 @@
 
 class PromotionController extends Controller
 {
+    /**
+     * Columns a client may request through ?fields= on the listing.
+     */
+    private const LIST_FIELDS = [
+        'id', 'name', 'description', 'type', 'discount_value', 'buy_quantity', 'get_quantity',
+        'buy_products', 'get_products', 'bxgy_config', 'minimum_purchase', 'minimum_quantity',
+        'scope', 'scope_items', 'first_time_only', 'customer_groups', 'start_date', 'end_date',
+        'usage_limit_total', 'usage_limit_per_customer', 'usage_count', 'is_active', 'priority',
+        'is_stackable', 'created_by', 'created_at', 'updated_at',
+    ];
+
+    /**
+     * List the company's promotions.
+     *
+     * Filters: status (active|inactive, where inactive is everything not
+     * currently active), type, date_from/date_to (promotion window overlaps
+     * the range). Passing per_page or cursor switches to cursor pagination;
+     * fields= selects a subset of columns and with_counts=1 adds per-tab
+     * totals. updated_since returns only rows changed since then plus the
+     * ids still matching, so clients can apply a delta. Responses carry an
+     * ETag and honour If-None-Match.
+     */
     public function index(Request $request)
     {
         $user = $request->user();
-        
-        $query = Promotion::where('company_id', $user->company_id)
-            ->with(['creator'])
-            ->orderBy('priority', 'desc')
-            ->orderBy('created_at', 'desc');
-
-        if ($request->has('status')) {
-            if ($request->status === 'active') {
-                $query->active();
-            } elseif ($request->status === 'inactive') {
-                $query->where('is_active', false);
+
+        $validated = $request->validate([
+            'status' => 'nullable|in:all,active,inactive',
+            'type' => 'nullable|string|max:50',
+            'date_from' => 'nullable|date',
+            'date_to' => 'nullable|date',
+            'fields' => 'nullable|string|max:500',
+            'per_page' => 'nullable|integer|min:1|max:100',
+            'cursor' => 'nullable|string',
+            'with_counts' => 'nullable|boolean',
+            'updated_since' => 'nullable|date',
+        ]);
+
+        $query = Promotion::where('company_id', $user->company_id);
+
+        if (!empty($validated['type'])) {
+            $query->where('type', $validated['type']);
+        }
+        if (!empty($validated['date_from'])) {
+            $query->where(function ($q) use ($validated) {
+                $q->whereNull('end_date')->orWhere('end_date', '>=', Carbon::parse($validated['date_from']));
+            });
+        }
+        if (!empty($validated['date_to'])) {
+            $query->where(function ($q) use ($validated) {
+                $q->whereNull('start_date')->orWhere('start_date', '<=', Carbon::parse($validated['date_to'])->endOfDay());
+            });
+        }
+
+        $counts = $request->boolean('with_counts') ? $this->statusCounts(clone $query) : null;
+
+        $status = $validated['status'] ?? 'all';
+        if ($status === 'active') {
+            $query->active();
+        } elseif ($status === 'inactive') {
+            $query->inactive();
+        }
+
+        $etag = $this->listEtag($request, $query);
+        if (in_array($etag, $request->getETags(), true)) {
+            return response('', 304)->header('ETag', $etag);
+        }
+
+        if (!empty($validated['fields'])) {
+            $fields = array_intersect(self::LIST_FIELDS, array_map('trim', explode(',', $validated['fields'])));
+            // Ordering columns are always needed for the cursor
+            $query->select(array_values(array_unique(array_merge($fields, ['id', 'priority', 'created_at']))));
+            if (in_array('created_by', $fields)) {
+                $query->with('creator:id,name');
             }
+        } else {
+            $query->with('creator:id,name');
         }
 
-        $promotions = $query->get();
-        return response()->json($promotions);
+        $query->orderBy('priority', 'desc')
+            ->orderBy('created_at', 'desc')
+            ->orderBy('id', 'desc');
+
+        if (!empty($validated['updated_since'])) {
+            $since = Carbon::parse($validated['updated_since'])->setTimezone(config('app.timezone'));
+            $serverTime = now();
+
+            return response()->json([
+                'data' => (clone $query)->where('updated_at', '>=', $since)->get(),
+                'ids' => (clone $query)->toBase()->pluck('id'),
+                'counts' => $counts,
+                'server_time' => $serverTime->toIso8601String(),
+            ])->header('ETag', $etag);
+        }
+
+        if (!$request->filled('per_page') && !$request->filled('cursor')) {
+            return response()->json($query->get())->header('ETag', $etag);
+        }
+
+        $page = $query->cursorPaginate($validated['per_page'] ?? 20);
+
+        return response()->json([
+            'data' => $page->items(),
+            'next_cursor' => $page->nextCursor()?->encode(),
+            'per_page' => $page->perPage(),
+            'counts' => $counts,
+            'server_time' => now()->toIso8601String(),
+        ])->header('ETag', $etag);
+    }
+
+    /**
+     * ETag for a listing: the request parameters plus the size and latest
+     * write of the filtered set, so any create, update, delete or usage
+     * increment changes it. One aggregate query instead of the full payload.
+     */
+    private function listEtag(Request $request, $query): string
+    {
+        $state = (clone $query)->toBase()
+            ->selectRaw('COUNT(*) as total, MAX(updated_at) as last_updated')
+            ->first();
+
+        $params = $request->except('updated_since');
+        ksort($params);
+
+        return '"' . sha1(json_encode([$params, $state->total ?? 0, $state->last_updated ?? null])) . '"';
+    }
+
+    /**
+     * Totals for the all/active/inactive tabs in a single query. Inactive is
+     * the complement of active, so the two always add up to all.
+     */
+    private function statusCounts($query): array
+    {
+        $now = now();
+        $row = $query->toBase()
+            ->selectRaw('COUNT(*) as all_count')
+            ->selectRaw(
+                'SUM(CASE WHEN is_active = ? AND (start_date IS NULL OR start_date <= ?) AND (end_date IS NULL OR end_date >= ?) THEN 1 ELSE 0 END) as active_count',
+                [true, $now, $now]
+            )
+            ->first();
+
+        $all = (int) ($row->all_count ?? 0);
+        $active = (int) ($row->active_count ?? 0);
+
+        return [
+            'all' => $all,
+            'active' => $active,
+            'inactive' => $all - $active,
+        ];
     }
 
     public function store(Request $request)
@@ -98,6 +234,7 @@ public function store(Request $request)
         $validated['customer_groups'] = json_encode($validated['customer_groups'] ?? []);
 
         $promotion = Promotion::create($validated);
+        PromotionRuleCache::forget($promotion->company_id);
 
         return response()->json([
             'message' => 'Promotion created successfully',
@@ -107,7 +244,10 @@ public function store(Request $request)
 
     public function show($id)
     {
-        $promotion = Promotion::with(['creator', 'usages'])->findOrFail($id);
+        $promotion = Promotion::where('company_id', Auth::user()->company_id)
+            ->with('creator:id,name')
+            ->withCount('usages')
+            ->findOrFail($id);
         return response()->json($promotion);
     }
 
@@ -187,6 +327,7 @@ public function update(Request $request, $id)
         }
 
         $promotion->update($validated);
+        PromotionRuleCache::forget($promotion->company_id);
 
         return response()->json([
             'message' => 'Promotion updated successfully',
@@ -210,6 +351,7 @@ public function destroy($id)
         }
 
         $promotion->delete();
+        PromotionRuleCache::forget($promotion->company_id);
         return response()->json(['message' => 'Promotion deleted successfully']);
     }
 
@@ -218,6 +360,7 @@ public function toggleStatus($id)
         $promotion = Promotion::findOrFail($id);
         $promotion->is_active = !$promotion->is_active;
         $promotion->save();
+        PromotionRuleCache::forget($promotion->company_id);
 
         return response()->json([
             'message' => 'Promotion status updated',
@@ -228,14 +371,50 @@ public function toggleStatus($id)
     public function getActivePromotions(Request $request)
     {
         $user = $request->user();
-        $promotions = Promotion::where('company_id', $user->company_id)
-            ->active()
-            ->orderBy('priority', 'desc')
-            ->get();
+        $promotions = PromotionRuleCache::activePromotions($user->company_id);
 
         return response()->json($promotions);
     }
 
+    /**
+     * Versioned snapshot of the active rule set so the POS can price carts
+     * locally. The version doubles as the ETag; clients poll with
+     * If-None-Match and only download the rules again when it changes.
+     * Sales are still re-evaluated by SaleController::store.
+     */
+    public function snapshot(Request $request)
+    {
+        $evaluator = PromotionEvaluator::forCompany($request->user()->company_id);
+        $etag = '"' . $evaluator->snapshotVersion() . '"';
+
+        if (in_array($etag, $request->getETags(), true)) {
+            return response('', 304)->header('ETag', $etag);
+        }
+
+        return response()->json($evaluator->snapshot())->header('ETag', $etag);
+    }
+
+    /**
+     * Aggregated promotion evaluation metrics for the company: latency
+     * histograms, query counts, cart sizes and time per promotion type, per
+     * instrumented route. ?reset=1 clears them after reading.
+     */
+    public function metrics(Request $request)
+    {
+        $user = $request->user();
+        if (!$user || !$user->company_id) {
+            return response()->json(['error' => 'Unauthorized or no company associated'], 403);
+        }
+
+        $companyId = (int) $user->company_id;
+        $summary = PromotionMetrics::summary($companyId);
+        if ($request->boolean('reset')) {
+            PromotionMetrics::forget($companyId);
+        }
+
+        return response()->json($summary);
+    }
+
     public function calculateDiscount(Request $request)
     {
         $request->validate([
@@ -244,7 +423,8 @@ public function calculateDiscount(Request $request)
             'cart_items.*.product_id' => 'required|integer',
             'cart_items.*.quantity' => 'required|integer|min:1',
             'cart_items.*.price' => 'required|numeric',
-            'customer_id' => 'nullable|integer'
+            'customer_id' => 'nullable|integer',
+            'explain' => 'nullable|boolean'
         ]);
 
         try {
@@ -253,289 +433,21 @@ public function calculateDiscount(Request $request)
             $cartItems = $request->cart_items;
             $customerId = $request->customer_id;
 
-            // Fetch product categories to handle category scope
-            $productIds = array_column($cartItems, 'product_id');
-            $productsKeyed = Product::whereIn('id', $productIds)
-                ->where('company_id', $companyId)
-                ->get()
-                ->keyBy('id');
-
-            $activePromotions = Promotion::where('company_id', $companyId)
-                ->where('is_active', true)
-                ->where(function ($q) {
-                    $q->whereNull('start_date')->orWhere('start_date', '<=', now());
-                })
-                ->where(function ($q) {
-                    $q->whereNull('end_date')->orWhere('end_date', '>=', now());
-                })
-                ->orderBy('priority', 'desc')
-                ->get();
-
-            $applicablePromotions = [];
-            $totalDiscount = 0.0;
-
-            foreach ($activePromotions as $promo) {
-                // usage limits
-                if ($promo->usage_limit_total && $promo->usage_count >= $promo->usage_limit_total) {
-                    continue;
-                }
-                if ($customerId && $promo->usage_limit_per_customer) {
-                    $customerUsage = DB::table('sale_promotions')
-                        ->join('sales', 'sale_promotions.sale_id', '=', 'sales.id')
-                        ->where('sale_promotions.promotion_id', $promo->id)
-                        ->where('sales.customer_id', $customerId)
-                        ->count();
-                    if ($customerUsage >= $promo->usage_limit_per_customer) {
-                        continue;
-                    }
-                }
-
-                // normalize scope_items
-                $scopeItems = is_string($promo->scope_items) ? @json_decode($promo->scope_items, true) : $promo->scope_items;
-                if (!is_array($scopeItems)) {
-                    $scopeItems = [];
-                }
-
-                // matched items based on scope
-                $matchedItems = [];
-                switch ($promo->scope) {
-                    case 'all':
-                        $matchedItems = $cartItems;
-                        break;
-                    case 'product':
-                        $matchedItems = array_filter($cartItems, function ($item) use ($scopeItems) {
-                            return in_array((int)$item['product_id'], array_map('intval', $scopeItems));
-                        });
-                        break;
-                    case 'category':
-                        $matchedItems = array_filter($cartItems, function ($item) use ($scopeItems, $productsKeyed) {
-                            $product = $productsKeyed[$item['product_id']] ?? null;
-                            return $product && in_array($product->category, $scopeItems);
-                        });
-                        break;
-                    default:
-                        $matchedItems = $cartItems;
-                        break;
-                }
-
-                if (empty($matchedItems)) {
-                    continue;
-                }
-
-                // parse bxgy_config and buy/get products defensively
-                $bxgy = [];
-                if ($promo->bxgy_config) {
-                    $bxgy = is_string($promo->bxgy_config) ? @json_decode($promo->bxgy_config, true) : (array)$promo->bxgy_config;
-                    if (!is_array($bxgy)) {
-                        $bxgy = [];
-                    }
-                }
-
-                $buyProducts = [];
-                if ($promo->buy_products) {
-                    $buyProducts = is_array($promo->buy_products) ? $promo->buy_products : (@json_decode($promo->buy_products, true) ?: []);
-                } elseif (!empty($bxgy['buy_products'])) {
-                    $buyProducts = is_array($bxgy['buy_products']) ? $bxgy['buy_products'] : (@json_decode($bxgy['buy_products'] ?? '[]', true) ?: []);
-                }
-
-                $getProducts = [];
-                if ($promo->get_products) {
-                    $getProducts = is_array($promo->get_products) ? $promo->get_products : (@json_decode($promo->get_products, true) ?: []);
-                } elseif (!empty($bxgy['get_products'])) {
-                    $getProducts = is_array($bxgy['get_products']) ? $bxgy['get_products'] : (@json_decode($bxgy['get_products'] ?? '[]', true) ?: []);
-                }
-
-                $scenario = $bxgy['scenario'] ?? ($promo->bxgy_scenario ?? null);
-                $buyQty = $promo->buy_quantity ?? ($bxgy['buy_quantity'] ?? null);
-                $getQty = $promo->get_quantity ?? ($bxgy['get_quantity'] ?? null);
-                $minimumPurchase = $promo->minimum_purchase ?? ($bxgy['minimum_purchase'] ?? null);
-                $minimumQuantity = $promo->minimum_quantity ?? ($bxgy['minimum_quantity'] ?? null);
-                $tierRules = $bxgy['tier_rules'] ?? ($promo->tier_rules ?? []);
-
-                // check minimum requirements (if configured)
-                $cartQuantityTotal = array_reduce($cartItems, function ($sum, $item) {
-                    return $sum + ($item['quantity'] ?? 0);
-                }, 0);
-
-                $minimumPurchaseMet = !empty($minimumPurchase) ? ($cartTotal >= $minimumPurchase) : false;
-                $minimumQuantityMet = !empty($minimumQuantity) ? ($cartQuantityTotal >= $minimumQuantity) : false;
-
-                $hasAnyMinConfigured = !empty($minimumPurchase) || !empty($minimumQuantity);
-                if ($hasAnyMinConfigured && !$minimumPurchaseMet && !$minimumQuantityMet) {
-                    continue;
-                }
-
-                $discount = 0.0;
-
-                switch ($promo->type) {
-                    case 'percentage':
-                    case 'bulk_discount':
-                        $matchedTotal = array_reduce($matchedItems, function ($sum, $item) {
-                            return $sum + ($item['price'] * $item['quantity']);
-                        }, 0);
-                        $discount = $matchedTotal * ($promo->discount_value / 100);
-                        break;
-
-                    case 'fixed_amount':
-                        if ($promo->minimum_purchase && $cartTotal < $promo->minimum_purchase) {
-                            continue 2;
-                        }
-                        $discount = $promo->discount_value;
-                        break;
-
-                    case 'buy_x_get_y':
-                        $scenario = $scenario ?: 'specific_product';
-                        $expandUnits = function ($items) {
-                            $units = [];
-                            foreach ($items as $it) {
-                                $qty = max(0, (int)($it['quantity'] ?? 0));
-                                for ($i = 0; $i < $qty; $i++) {
-                                    $units[] = ['product_id' => (int)$it['product_id'], 'price' => (float)$it['price']];
-                                }
-                            }
-                            return $units;
-                        };
-
-                        if ($scenario === 'specific_product') {
-                            if (empty($buyProducts)) break;
-                            $eligibleBuyItems = array_filter($cartItems, function ($it) use ($buyProducts) {
-                                return in_array((int)$it['product_id'], array_map('intval', $buyProducts));
-                            });
-                            $totalBuyUnits = array_reduce($eligibleBuyItems, function ($s, $it) {
-                                return $s + ($it['quantity'] ?? 0);
-                            }, 0);
-                            if (empty($buyQty) || $buyQty <= 0) break;
-                            $sets = floor($totalBuyUnits / $buyQty);
-                            $freeUnits = $sets * ($getQty ?: 0);
-                            if ($freeUnits <= 0) break;
-
-                            // Try to find eligible get items in cart
-                            $eligibleGetItems = [];
-                            if (!empty($getProducts)) {
-                                $eligibleGetItems = array_filter($cartItems, function ($it) use ($getProducts) {
-                                    return in_array((int)$it['product_id'], array_map('intval', $getProducts));
-                                });
-                            }
-
-                            $units = $expandUnits($eligibleGetItems);
-
-                            // If not enough get items in cart, fetch missing get product prices from DB
-                            $missingUnits = $freeUnits - count($units);
-                            if ($missingUnits > 0 && !empty($getProducts)) {
-                                $getProductPrices = \App\Models\Product::whereIn('id', $getProducts)->pluck('price', 'id')->toArray();
-                                $getPrices = array_values($getProductPrices);
-                                sort($getPrices);
-                                for ($i = 0; $i < $missingUnits; $i++) {
-                                    $price = $getPrices[0] ?? 0;
-                                    $units[] = ['product_id' => $getProducts[0], 'price' => $price];
-                                }
-                            }
-
-                            // If get_products not set, fallback to matchedItems in cart
-                            if (empty($getProducts)) {
-                                $units = $expandUnits($matchedItems);
-                            }
-
-                            usort($units, function ($a, $b) {
-                                return $a['price'] <=> $b['price'];
-                            });
-                            for ($i = 0; $i < min($freeUnits, count($units)); $i++) {
-                                $discount += $units[$i]['price'];
-                            }
-                        } elseif ($scenario === 'any_x_items') {
-                            $units = $expandUnits($matchedItems);
-                            $totalUnits = count($units);
-                            if (empty($buyQty) || $buyQty <= 0) break;
-                            $sets = floor($totalUnits / $buyQty);
-                            $freeUnits = $sets * ($getQty ?: 0);
-                            if ($freeUnits <= 0) break;
-                            usort($units, function ($a, $b) {
-                                return $a['price'] <=> $b['price'];
-                            });
-                            for ($i = 0; $i < min($freeUnits, count($units)); $i++) {
-                                $discount += $units[$i]['price'];
-                            }
-                        } elseif ($scenario === 'spend_x_get_y') {
-                            $minSpend = $minimumPurchase ?: ($bxgy['minimum_purchase'] ?? null);
-                            if (empty($minSpend) || $cartTotal < $minSpend) break;
-                            $freeUnits = ($getQty ?: 0);
-                            if ($freeUnits <= 0) break;
-                            $eligibleGetItems = [];
-                            if (!empty($getProducts)) {
-                                $eligibleGetItems = array_filter($cartItems, function ($it) use ($getProducts) {
-                                    return in_array((int)$it['product_id'], array_map('intval', $getProducts));
-                                });
-                            }
-                            if (empty($eligibleGetItems)) {
-                                // Fetch get product prices from DB if not in cart
-                                if (!empty($getProducts)) {
-                                    $getProductPrices = \App\Models\Product::whereIn('id', $getProducts)->pluck('price', 'id')->toArray();
-                                    $getPrices = array_values($getProductPrices);
-                                    sort($getPrices);
-                                    $eligibleGetItems = [];
-                                    for ($i = 0; $i < $freeUnits; $i++) {
-                                        $eligibleGetItems[] = ['product_id' => $getProducts[0], 'price' => $getPrices[0] ?? 0, 'quantity' => 1];
-                                    }
-                                } else {
-                                    $eligibleGetItems = $matchedItems;
-                                }
-                            }
-                            $units = $expandUnits($eligibleGetItems);
-                            usort($units, function ($a, $b) {
-                                return $a['price'] <=> $b['price'];
-                            });
-                            for ($i = 0; $i < min($freeUnits, count($units)); $i++) {
-                                $discount += $units[$i]['price'];
-                            }
-                        } elseif ($scenario === 'tiered') {
-                            if (!is_array($tierRules) || count($tierRules) === 0) break;
-                            $units = $expandUnits($matchedItems);
-                            usort($units, function ($a, $b) {
-                                return $a['price'] <=> $b['price'];
-                            });
-                            $totalUnits = count($units);
-                            foreach ($tierRules as $tier) {
-                                $bq = intval($tier['buy_qty'] ?? 0);
-                                $gq = intval($tier['get_qty'] ?? 0);
-                                if ($bq <= 0 || $gq <= 0) continue;
-                                $sets = floor($totalUnits / $bq);
-                                if ($sets <= 0) continue;
-                                $freeUnits = $sets * $gq;
-                                for ($i = 0; $i < min($freeUnits, count($units)); $i++) {
-                                    $discount += $units[$i]['price'];
-                                }
-                                $units = array_slice($units, min(count($units), $freeUnits));
-                                $totalUnits = count($units);
-                            }
-                        }
-                        break;
-                }
-
-                if ($discount > 0) {
-                    $applicablePromotions[] = [
-                        'id' => $promo->id,
-                        'name' => $promo->name,
-                        'type' => $promo->type,
-                        'discount' => round($discount, 2),
-                        'buy_quantity' => $promo->buy_quantity,
-                        'get_quantity' => $promo->get_quantity,
-                        'buy_products' => $buyProducts,
-                        'get_products' => $getProducts,
-                        'minimum_purchase' => $promo->minimum_purchase,
-                        'minimum_quantity' => $promo->minimum_quantity
-                    ];
-                    $totalDiscount += $discount;
-                    // Only break if this promo is NOT stackable and a discount was applied
-                    if (!$promo->is_stackable) {
-                        break;
-                    }
-                }
+            $evaluator = PromotionEvaluator::forCompany($companyId);
+            if ($request->boolean('explain')) {
+                // Same quote plus a per-promotion trace of why each one did or did not apply
+                $result = $evaluator->explain($cartItems, $cartTotal, $customerId);
+                $trace = $result['trace'];
+                unset($result['trace']);
+            } else {
+                $result = $evaluator->evaluate($cartItems, $cartTotal, $customerId);
+            }
+            $result['quote_id'] = PromotionQuoteStore::issue($evaluator->ruleSet(), $cartItems, $cartTotal, $customerId, $result);
+            if (isset($trace)) {
+                $result['trace'] = $trace;
             }
 
-            return response()->json([
-                'applicable_promotions' => $applicablePromotions,
-                'total_discount' => round($totalDiscount, 2)
-            ]);
+            return response()->json($result);
         } catch (\Exception $e) {
             Log::error('❌ Promotion calculation error', [
                 'message' => $e->getMessage(),
@@ -549,10 +461,47 @@ public function calculateDiscount(Request $request)
             ], 500);
         }
     }
-}
 
+    /**
+     * Quote several carts in one request (offline POS replays, what-if runs).
+     * Each cart may carry a client "ref" that is echoed back with its result.
+     */
+    public function calculateDiscountBatch(Request $request)
+    {
+        $maxCarts = config('promotions.batch_max_carts', 500);
 
+        $validated = $request->validate([
+            'carts' => 'required|array|min:1|max:' . $maxCarts,
+            'carts.*.ref' => 'nullable|string|max:100',
+            'carts.*.cart_total' => 'required|numeric',
+            'carts.*.cart_items' => 'required|array',
+            'carts.*.cart_items.*.product_id' => 'required|integer',
+            'carts.*.cart_items.*.quantity' => 'required|integer|min:1',
+            'carts.*.cart_items.*.price' => 'required|numeric',
+            'carts.*.customer_id' => 'nullable|integer',
+        ]);
 
+        try {
+            $carts = $validated['carts'];
+            $evaluator = PromotionEvaluator::forCompany(Auth::user()->company_id);
+            $quotes = $evaluator->evaluateMany($carts);
 
+            $results = [];
+            foreach ($carts as $i => $cart) {
+                $results[] = ['ref' => $cart['ref'] ?? (string) $i] + $quotes[$i];
+            }
 
+            return response()->json(['results' => $results]);
+        } catch (\Exception $e) {
+            Log::error('❌ Promotion batch calculation error', [
+                'message' => $e->getMessage(),
+                'trace' => $e->getTraceAsString()
+            ]);
 
+            return response()->json([
+                'results' => [],
+                'error' => $e->getMessage()
+            ], 500);
+        }
+    }
+}
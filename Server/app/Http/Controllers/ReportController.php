@@ -14,6 +14,11 @@
 
 class ReportController extends Controller
 {
+    /**
+     * Rows read per query when streaming large CSV exports.
+     */
+    private const CSV_CHUNK_SIZE = 1000;
+
     /**
      * Get a simple overview of sales for the current month.
      * This provides key insights into the store's performance.
@@ -442,26 +447,24 @@ public function promotionsReport(Request $request)
         $endDate = $request->input('end_date', Carbon::now()->toDateString());
 
         // Get promotions for the company
-        $promotions = \App\Models\Promotion::where('company_id', $user->company_id)->get();
+        $promotions = \App\Models\Promotion::where('company_id', $user->company_id)
+            ->select(['id', 'name', 'type', 'scope', 'is_active'])
+            ->get();
 
         $activeCount = $promotions->where('is_active', true)->count();
-        
-        // Calculate discount and usage within date range
+
+        // Usage and discount within date range, aggregated per promotion
+        $totals = $this->promotionUsageTotals($user->company_id, $startDate, $endDate);
         $totalDiscount = 0;
         $totalUsage = 0;
 
-        $list = $promotions->map(function ($promo) use ($startDate, $endDate, &$totalDiscount, &$totalUsage) {
-            // Get usages for this promotion within date range
-            $usages = \App\Models\PromotionUsage::where('promotion_id', $promo->id)
-                ->whereBetween('created_at', [$startDate . ' 00:00:00', $endDate . ' 23:59:59'])
-                ->get();
-            
-            $usageCount = $usages->count();
-            $discountSum = $usages->sum('discount_amount');
-            
+        $list = $promotions->map(function ($promo) use ($totals, &$totalDiscount, &$totalUsage) {
+            $usageCount = (int) ($totals[$promo->id]->usage_count ?? 0);
+            $discountSum = (float) ($totals[$promo->id]->total_discount ?? 0);
+
             $totalDiscount += $discountSum;
             $totalUsage += $usageCount;
-            
+
             return [
                 'id' => $promo->id,
                 'name' => $promo->name,
@@ -1178,6 +1181,7 @@ public function exportTransfersExcel(Request $request)
 
     /**
      * Export Promotions as CSV
+     * Streams the per-promotion summary, or every individual redemption with mode=redemptions
      */
     public function exportPromotionsCsv(Request $request)
     {
@@ -1188,29 +1192,59 @@ public function exportPromotionsCsv(Request $request)
 
         $startDate = $request->input('start_date', Carbon::now()->subDays(30)->toDateString());
         $endDate = $request->input('end_date', Carbon::now()->toDateString());
+        $detail = $request->input('mode') === 'redemptions';
 
-        $promotions = \App\Models\Promotion::where('company_id', $user->company_id)->get();
+        $companyId = (int) $user->company_id;
+        $companyName = $user->company ? $user->company->name : 'N/A';
 
-        $csvOutput = fopen('php://temp', 'r+');
-        fwrite($csvOutput, chr(0xEF).chr(0xBB).chr(0xBF)); // UTF-8 BOM
+        $writeRows = function () use ($detail, $companyId, $companyName, $startDate, $endDate) {
+            $csvOutput = fopen('php://output', 'w');
+            fwrite($csvOutput, chr(0xEF).chr(0xBB).chr(0xBF)); // UTF-8 BOM
 
-        fputcsv($csvOutput, ['Promotions Report']);
-        fputcsv($csvOutput, []);
-        fputcsv($csvOutput, ['Company:', $user->company ? $user->company->name : 'N/A']);
-        fputcsv($csvOutput, ['Period:', "{$startDate} to {$endDate}"]);
-        fputcsv($csvOutput, ['Generated:', now()->format('Y-m-d H:i:s')]);
-        fputcsv($csvOutput, []);
+            fputcsv($csvOutput, [$detail ? 'Promotion Redemptions Report' : 'Promotions Report']);
+            fputcsv($csvOutput, []);
+            fputcsv($csvOutput, ['Company:', $companyName]);
+            fputcsv($csvOutput, ['Period:', "{$startDate} to {$endDate}"]);
+            fputcsv($csvOutput, ['Generated:', now()->format('Y-m-d H:i:s')]);
+            fputcsv($csvOutput, []);
+
+            if ($detail) {
+                $this->writePromotionRedemptionRows($csvOutput, $companyId, $startDate, $endDate);
+            } else {
+                $this->writePromotionSummaryRows($csvOutput, $companyId, $startDate, $endDate);
+            }
+
+            fclose($csvOutput);
+        };
+
+        $filename = ($detail ? 'Promotion_Redemptions_' : 'Promotions_') . $startDate . '_' . $endDate . '.csv';
+        return response()->streamDownload($writeRows, $filename, [
+            'Content-Type' => 'text/csv; charset=utf-8',
+            'Cache-Control' => 'no-cache, no-store, must-revalidate',
+            'Pragma' => 'no-cache',
+            'Expires' => '0',
+            'X-Accel-Buffering' => 'no',
+        ]);
+    }
+
+    /**
+     * Write one summary row per promotion, reading promotions in chunks.
+     */
+    private function writePromotionSummaryRows($csvOutput, int $companyId, $startDate, $endDate): void
+    {
+        $totals = $this->promotionUsageTotals($companyId, $startDate, $endDate);
 
         fputcsv($csvOutput, [
             'Promotion Name', 'Type', 'Scope', 'Usage Count', 'Total Discount', 'Status'
         ]);
 
+        $promotions = \App\Models\Promotion::where('company_id', $companyId)
+            ->select(['id', 'name', 'type', 'scope', 'is_active'])
+            ->lazyById(self::CSV_CHUNK_SIZE);
+
         foreach ($promotions as $promo) {
-            $usages = \App\Models\PromotionUsage::where('promotion_id', $promo->id)
-                ->whereBetween('created_at', [$startDate . ' 00:00:00', $endDate . ' 23:59:59'])
-                ->get();
-            $usageCount = $usages->count();
-            $discountSum = $usages->sum('discount_amount');
+            $usageCount = (int) ($totals[$promo->id]->usage_count ?? 0);
+            $discountSum = (float) ($totals[$promo->id]->total_discount ?? 0);
             fputcsv($csvOutput, [
                 $promo->name,
                 $promo->type,
@@ -1220,18 +1254,76 @@ public function exportPromotionsCsv(Request $request)
                 $promo->is_active ? 'Active' : 'Inactive'
             ]);
         }
+    }
 
-        rewind($csvOutput);
-        $csvData = stream_get_contents($csvOutput);
-        fclose($csvOutput);
+    /**
+     * Write every redemption in the period, flushing after each chunk so the
+     * export never holds more than one chunk in memory.
+     */
+    private function writePromotionRedemptionRows($csvOutput, int $companyId, $startDate, $endDate): void
+    {
+        fputcsv($csvOutput, [
+            'Redemption ID', 'Date', 'Promotion Name', 'Type', 'Sale ID', 'Sale Total', 'Customer ID', 'Customer Name', 'Discount'
+        ]);
 
-        $filename = 'Promotions_' . $startDate . '_' . $endDate . '.csv';
-        return response($csvData, 200)
-            ->header('Content-Type', 'text/csv; charset=utf-8')
-            ->header('Content-Disposition', 'attachment; filename="' . $filename . '"')
-            ->header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            ->header('Pragma', 'no-cache')
-            ->header('Expires', '0');
+        $redemptions = DB::table('promotion_usage')
+            ->join('promotions', 'promotions.id', '=', 'promotion_usage.promotion_id')
+            ->leftJoin('sales', 'sales.id', '=', 'promotion_usage.sale_id')
+            ->leftJoin('customers', 'customers.id', '=', 'promotion_usage.customer_id')
+            ->where('promotions.company_id', $companyId)
+            ->whereBetween('promotion_usage.created_at', [$startDate . ' 00:00:00', $endDate . ' 23:59:59'])
+            ->select([
+                'promotion_usage.id',
+                'promotion_usage.created_at',
+                'promotion_usage.sale_id',
+                'promotion_usage.customer_id',
+                'promotion_usage.discount_amount',
+                'promotions.name as promotion_name',
+                'promotions.type as promotion_type',
+                'sales.total as sale_total',
+                'customers.name as customer_name',
+            ])
+            ->lazyById(self::CSV_CHUNK_SIZE, 'promotion_usage.id', 'id');
+
+        $written = 0;
+        foreach ($redemptions as $row) {
+            fputcsv($csvOutput, [
+                $row->id,
+                $row->created_at,
+                $row->promotion_name,
+                $row->promotion_type,
+                $row->sale_id,
+                $row->sale_total !== null ? number_format((float) $row->sale_total, 2, '.', '') : '',
+                $row->customer_id,
+                $row->customer_name ?? 'Walk-in',
+                number_format((float) $row->discount_amount, 2, '.', ''),
+            ]);
+
+            if (++$written % self::CSV_CHUNK_SIZE === 0) {
+                fflush($csvOutput);
+                flush();
+            }
+        }
+    }
+
+    /**
+     * Usage count and discount per promotion for a report period, keyed by
+     * promotion id. Whole-day periods read the promotion_usage_daily rollup;
+     * periods with explicit times are aggregated from promotion_usage.
+     */
+    private function promotionUsageTotals($companyId, $startDate, $endDate)
+    {
+        $isDay = fn ($value) => (bool) preg_match('/^\d{4}-\d{2}-\d{2}$/', (string) $value);
+
+        if ($isDay($startDate) && $isDay($endDate)) {
+            return \App\Models\PromotionUsageDaily::totalsForCompany((int) $companyId, $startDate, $endDate);
+        }
+
+        return \App\Models\PromotionUsage::totalsForCompany(
+            (int) $companyId,
+            Carbon::parse($startDate),
+            $isDay($endDate) ? Carbon::parse($endDate)->endOfDay() : Carbon::parse($endDate)
+        );
     }
 
     /**
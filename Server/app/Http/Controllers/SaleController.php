@@ -9,10 +9,14 @@
 use Illuminate\Support\Facades\DB;
 use App\Models\Promotion;
 use App\Models\PromotionUsage;
+use App\Models\PromotionCustomerUsage;
 use App\Models\TaxConfiguration;
 use App\Models\Customer;
 use App\Models\MpesaTransaction;
 use App\Services\PriceGroupService;
+use App\Services\Promotions\PromotionCustomerProfile;
+use App\Services\Promotions\PromotionEvaluator;
+use App\Services\Promotions\PromotionQuoteStore;
 
 class SaleController extends Controller
 {
@@ -34,6 +38,7 @@ public function store(Request $request)
             'mpesa_phone_number'     => 'nullable|string|max:20',
             'mpesa_checkout_request_id' => 'nullable|string|max:255',
             'mpesa_receipt_number'   => 'nullable|string|max:255',
+            'promotion_quote_id'     => 'nullable|string|max:64',
         ]);
 
         $user = $request->user();
@@ -54,9 +59,46 @@ public function store(Request $request)
             }
         }
 
-        DB::beginTransaction();
+        // Usage claimed in its own short transaction, released again if the sale fails
+        $claimedPromotionIds = [];
 
         try {
+            // Promotions are resolved before the transaction so no product rows
+            // are locked while they are evaluated
+            [$appliedPromotions, $totalDiscount] = $companyId
+                ? $this->resolvePromotionsForSale($companyId, $validated['items'], $validated['customer_id'] ?? null, $validated['promotion_quote_id'] ?? null)
+                : [[], 0.0];
+
+            // Claim usage of the applied promotions with one conditional update
+            // committed on its own, so capped promotion rows stay locked for a
+            // single statement rather than the whole sale. If another terminal
+            // exhausted a capped promotion meanwhile, re-price the cart once
+            // from fresh usage counts before giving up.
+            for ($attempt = 1; ; $attempt++) {
+                DB::beginTransaction();
+
+                if (Promotion::claimUsage(array_column($appliedPromotions, 'id'))) {
+                    DB::commit();
+                    $claimedPromotionIds = array_column($appliedPromotions, 'id');
+                    break;
+                }
+
+                DB::rollBack();
+
+                if ($attempt >= 2) {
+                    return response()->json([
+                        'message' => 'Sale failed',
+                        'error' => 'A promotion applied to this cart has reached its usage limit. Refresh the cart and try again.',
+                    ], 409);
+                }
+
+                // The quote is single-use and was redeemed above; it also priced
+                // the promotion that just ran out, so re-price without it
+                [$appliedPromotions, $totalDiscount] = $this->resolvePromotionsForSale($companyId, $validated['items'], $validated['customer_id'] ?? null);
+            }
+
+            DB::beginTransaction();
+
             $allSaleItems = [];
             $mainItems = $validated['items'];
 
@@ -93,38 +135,6 @@ public function store(Request $request)
                 }
             }
             
-            // Calculate promotions on main items only
-            $cartTotal = collect($mainItems)->sum(fn($i) => $i['price'] * $i['quantity']);
-            $cartItems = $mainItems; // already in required shape
-            $totalDiscount = 0.0;
-            $appliedPromotions = [];
-            if ($user) {
-                $promotions = Promotion::where('company_id', $user->company_id)
-                    ->active()
-                    ->orderBy('priority', 'desc')
-                    ->get();
-
-                foreach ($promotions as $promotion) {
-                    $discount = $this->calculatePromotionDiscountForSale($promotion, $cartTotal, $cartItems, $validated['customer_id'] ?? null);
-                    if ($discount > 0) {
-                        $appliedPromotions[] = [
-                            'id' => $promotion->id,
-                            'name' => $promotion->name,
-                            'discount' => $discount,
-                            'type' => $promotion->type,
-                        ];
-
-                        if (!$promotion->is_stackable) {
-                            $totalDiscount = max($totalDiscount, $discount);
-                            // if non-stackable, prefer highest and stop further stacking
-                            break;
-                        } else {
-                            $totalDiscount += $discount;
-                        }
-                    }
-                }
-            }
-
             $grossTotal = collect($allSaleItems)->sum(fn($item) => $item['price'] * $item['quantity']);
             $manualDiscount = $validated['discount'] ?? 0;
             $totalDiscount += $manualDiscount;
@@ -280,23 +290,6 @@ public function store(Request $request)
                 }
             }
 
-            // Record promotion usage if any
-            if (!empty($appliedPromotions)) {
-                foreach ($appliedPromotions as $ap) {
-                    $promo = Promotion::find($ap['id']);
-                    if ($promo) {
-                        PromotionUsage::create([
-                            'promotion_id' => $promo->id,
-                            'customer_id' => $validated['customer_id'] ?? null,
-                            'sale_id' => $sale->id,
-                            'discount_amount' => $ap['discount'],
-                            'used_at' => now(),
-                        ]);
-                        $promo->incrementUsage();
-                    }
-                }
-            }
-
             // Create invoice record for this sale
             $invoice = \App\Models\Invoice::create([
                 'type' => 'sale',
@@ -338,7 +331,22 @@ public function store(Request $request)
                 }
             }
 
+            // Record promotion usage last: the daily rollup and per-customer
+            // rows are shared by every sale of a promotion, so they are only
+            // locked for the statements right before commit
+            if (!empty($appliedPromotions)) {
+                PromotionUsage::recordForSale($sale->id, $validated['customer_id'] ?? null, $appliedPromotions);
+                if (!empty($validated['customer_id'])) {
+                    PromotionCustomerUsage::recordUses((int) $validated['customer_id'], array_column($appliedPromotions, 'id'));
+                }
+            }
+
             DB::commit();
+            $claimedPromotionIds = [];
+
+            if ($companyId) {
+                PromotionCustomerProfile::recordSale($companyId, $validated['customer_id'] ?? null);
+            }
 
             return response()->json([
                 'message' => 'Sale recorded successfully',
@@ -351,6 +359,7 @@ public function store(Request $request)
 
         } catch (\Exception $e) {
             DB::rollBack();
+            Promotion::releaseUsage($claimedPromotionIds);
             return response()->json([
                 'message' => 'Sale failed',
                 'error'   => $e->getMessage(),
@@ -406,106 +415,55 @@ private function validateGroupedPricingForSale(array $items, ?Customer $customer
         }
     }
 
-    private function calculatePromotionDiscountForSale(Promotion $promotion, $cartTotal, array $cartItems, $customerId = null)
+    /**
+     * Resolve the promotions for a sale's main items. A matching quote from
+     * calculateDiscount is applied as-is; otherwise the cart is evaluated
+     * the same way calculateDiscount would.
+     *
+     * @return array{0: array, 1: float} applied promotions and their total discount
+     */
+    private function resolvePromotionsForSale(int $companyId, array $cartItems, $customerId = null, ?string $quoteId = null): array
     {
-        // Customer usage constraint already handled in PromotionController.canBeUsedBy
-        // Build items map (product_id => [quantity, price])
-        $itemsByProduct = [];
-        foreach ($cartItems as $item) {
-            $pid = (int) $item['product_id'];
-            if (!isset($itemsByProduct[$pid])) {
-                $itemsByProduct[$pid] = ['quantity' => 0, 'price' => (float) $item['price']];
-            }
-            $itemsByProduct[$pid]['quantity'] += (int) $item['quantity'];
-            $itemsByProduct[$pid]['price'] = min($itemsByProduct[$pid]['price'], (float) $item['price']);
-        }
+        $cartTotal = collect($cartItems)->sum(fn($i) => $i['price'] * $i['quantity']);
+        $customerId = $customerId ? (int) $customerId : null;
+        $evaluator = PromotionEvaluator::forCompany($companyId);
 
-        // Validate minimums
-        if ($promotion->minimum_purchase && $cartTotal < (float) $promotion->minimum_purchase) {
-            return 0.0;
-        }
+        $quoted = PromotionQuoteStore::redeem($quoteId, $companyId, $cartItems, $cartTotal, $customerId);
 
-        // Scope filtering
-        $scopedItems = $itemsByProduct;
-        if ($promotion->scope !== 'all') {
-            $scopedItems = [];
-            $scopeItems = (array) ($promotion->scope_items ?? []);
-            if ($promotion->scope === 'product') {
-                $allowedIds = array_map('intval', $scopeItems);
-                foreach ($itemsByProduct as $pid => $info) {
-                    if (in_array($pid, $allowedIds, true)) {
-                        $scopedItems[$pid] = $info;
-                    }
-                }
-            } elseif ($promotion->scope === 'category') {
-                $productIds = array_keys($itemsByProduct);
-                $products = Product::whereIn('id', $productIds)->select('id','category')->get();
-                $allowedCategories = array_map('strval', $scopeItems);
-                foreach ($products as $p) {
-                    if ($p->category && in_array($p->category, $allowedCategories, true)) {
-                        $scopedItems[$p->id] = $itemsByProduct[$p->id];
-                    }
-                }
-            }
+        // The quote saw the customer's usage when it was priced; another sale
+        // to the same customer may have used up a per-customer limit since
+        if ($quoted !== null && $customerId && !$this->quoteWithinCustomerLimits($evaluator, $quoted, $customerId)) {
+            $quoted = null;
         }
 
-        // Minimum quantity on scoped items
-        if ($promotion->minimum_quantity) {
-            $totalQty = 0;
-            foreach ($scopedItems as $info) { $totalQty += (int) $info['quantity']; }
-            if ($totalQty < (int) $promotion->minimum_quantity) {
-                return 0.0;
-            }
+        if ($quoted === null) {
+            // Same evaluation and combination policy as calculateDiscount
+            $quoted = $evaluator->evaluate($cartItems, $cartTotal, $customerId);
         }
 
-        switch ($promotion->type) {
-            case 'percentage':
-                $scopedSubtotal = 0.0;
-                foreach ($scopedItems as $info) { $scopedSubtotal += $info['quantity'] * $info['price']; }
-                return ($scopedSubtotal * (float) $promotion->discount_value) / 100.0;
-
-            case 'fixed_amount':
-                $scopedSubtotal = 0.0;
-                foreach ($scopedItems as $info) { $scopedSubtotal += $info['quantity'] * $info['price']; }
-                return min((float) $promotion->discount_value, $scopedSubtotal);
-
-            case 'spend_save':
-                $scopedSubtotal = 0.0;
-                foreach ($scopedItems as $info) { $scopedSubtotal += $info['quantity'] * $info['price']; }
-                if ($promotion->minimum_purchase && $scopedSubtotal < (float) $promotion->minimum_purchase) {
-                    return 0.0;
-                }
-                return ($scopedSubtotal * (float) $promotion->discount_value) / 100.0;
-
-            case 'bulk_discount':
-                $scopedQty = 0;
-                $scopedSubtotal = 0.0;
-                foreach ($scopedItems as $info) {
-                    $scopedQty += (int) $info['quantity'];
-                    $scopedSubtotal += $info['quantity'] * $info['price'];
-                }
-                if ($scopedQty >= (int) $promotion->minimum_quantity) {
-                    return ($scopedSubtotal * (float) $promotion->discount_value) / 100.0;
-                }
-                return 0.0;
-
-            case 'buy_x_get_y':
-                $buy = (int) ($promotion->buy_quantity ?? 0);
-                $get = (int) ($promotion->get_quantity ?? 0);
-                if ($buy <= 0 || $get <= 0) { return 0.0; }
-                $discount = 0.0;
-                foreach ($scopedItems as $info) {
-                    $q = (int) $info['quantity'];
-                    if ($q < $buy) { continue; }
-                    // Each full group of BUY grants GET items free
-                    $freeGroups = intdiv($q, $buy);
-                    $freeItems = $freeGroups * $get;
-                    $discount += $freeItems * (float) $info['price'];
-                }
-                return $discount;
+        $appliedPromotions = array_map(function ($promo) {
+            return [
+                'id' => $promo['id'],
+                'name' => $promo['name'],
+                'discount' => $promo['discount'],
+                'type' => $promo['type'],
+            ];
+        }, $quoted['applicable_promotions']);
 
-            default:
-                return 0.0;
-        }
+        return [$appliedPromotions, (float) $quoted['total_discount']];
+    }
+
+    /**
+     * Whether the customer can still use every per-customer-limited
+     * promotion of a redeemed quote.
+     */
+    private function quoteWithinCustomerLimits(PromotionEvaluator $evaluator, array $quoted, int $customerId): bool
+    {
+        $quotedIds = array_flip(array_column($quoted['applicable_promotions'], 'id'));
+        $limited = array_filter($evaluator->ruleSet()->promotions, function ($rule) use ($quotedIds) {
+            return isset($quotedIds[$rule->id]) && $rule->usageLimitPerCustomer;
+        });
+
+        return count($evaluator->withinUsageLimits($limited, $customerId)) === count($limited);
     }
 }
@@ -0,0 +1,39 @@
+<?php
+
+namespace App\Http\Middleware;
+
+use App\Services\Promotions\PromotionMetrics;
+use Closure;
+use Illuminate\Http\Request;
+use Symfony\Component\HttpFoundation\Response;
+
+class PromotionMetricsMiddleware
+{
+    /**
+     * Record promotion evaluation metrics for the request and report them
+     * in a Server-Timing header.
+     */
+    public function handle(Request $request, Closure $next, string $route = ''): Response
+    {
+        if (!config('promotions.metrics.enabled', false)) {
+            return $next($request);
+        }
+
+        PromotionMetrics::begin();
+
+        try {
+            $response = $next($request);
+        } finally {
+            $metrics = PromotionMetrics::finish(
+                $request->user()?->company_id,
+                $route !== '' ? $route : $request->method() . ' /' . ltrim($request->path(), '/')
+            );
+        }
+
+        if ($metrics !== null) {
+            $response->headers->set('Server-Timing', PromotionMetrics::serverTiming($metrics));
+        }
+
+        return $response;
+    }
+}
@@ -0,0 +1,216 @@
+<?php
+namespace App\Jobs\Promotions;
+
+use App\Models\PromotionBacktestShard;
+use App\Models\Sale;
+use App\Services\Promotions\CompiledPromotion;
+use App\Services\Promotions\PromotionEvaluator;
+use Illuminate\Bus\Queueable;
+use Illuminate\Contracts\Queue\ShouldQueue;
+use Illuminate\Foundation\Bus\Dispatchable;
+use Illuminate\Queue\InteractsWithQueue;
+use Illuminate\Queue\SerializesModels;
+use Illuminate\Support\Facades\DB;
+
+/**
+ * Replays one sale id range of a backtest through the promotion evaluator,
+ * reading sales in chunks and saving running totals after each chunk so the
+ * backtest can report progress. Empties that checkout auto-added to a sale
+ * are left out of the replayed cart, as the POS never quotes them.
+ */
+class RunPromotionBacktestShardJob implements ShouldQueue
+{
+    use Dispatchable, InteractsWithQueue, Queueable, SerializesModels;
+
+    public $tries = 1;
+    public $timeout = 3600;
+
+    public $shard;
+
+    public function __construct(PromotionBacktestShard $shard)
+    {
+        $this->shard = $shard;
+    }
+
+    public function handle()
+    {
+        $shard = $this->shard;
+        $backtest = $shard->backtest;
+
+        $shard->update([
+            'status' => 'processing',
+            'processed_sales' => 0,
+            'redemptions' => 0,
+            'total_discount' => 0,
+            'products' => [],
+            'error' => null,
+        ]);
+        $backtest->refreshStatus();
+
+        try {
+            $evaluator = PromotionEvaluator::forDraft((int) $backtest->company_id, $backtest->draftPromotion());
+            $rule = $evaluator->ruleSet()->promotions[0];
+
+            $processed = 0;
+            $redemptions = 0;
+            $totalDiscount = 0.0;
+            $products = [];
+
+            Sale::where('company_id', $backtest->company_id)
+                ->whereBetween('id', [$shard->from_sale_id, $shard->to_sale_id])
+                ->whereBetween('created_at', [
+                    $backtest->start_date->toDateString() . ' 00:00:00',
+                    $backtest->end_date->toDateString() . ' 23:59:59',
+                ])
+                ->select(['id', 'customer_id'])
+                ->with(['items:id,sale_id,product_id,quantity,unit_price'])
+                ->chunkById(config('promotions.backtest_chunk_size', 500), function ($sales) use ($shard, $evaluator, $rule, &$processed, &$redemptions, &$totalDiscount, &$products) {
+                    $emptyLinks = self::emptyLinks($sales);
+                    $carts = [];
+                    foreach ($sales as $sale) {
+                        $items = [];
+                        $total = 0.0;
+                        $autoAdded = self::autoAddedEmpties($sale->items, $emptyLinks);
+                        foreach ($sale->items as $item) {
+                            if (!$item->product_id || (float) $item->quantity <= 0 || isset($autoAdded[$item->id])) {
+                                continue;
+                            }
+                            $items[] = [
+                                'product_id' => (int) $item->product_id,
+                                'quantity' => (float) $item->quantity,
+                                'price' => (float) $item->unit_price,
+                            ];
+                            $total += (float) $item->unit_price * (float) $item->quantity;
+                        }
+                        if (!empty($items)) {
+                            $carts[$sale->id] = [
+                                'cart_items' => $items,
+                                'cart_total' => $total,
+                                'customer_id' => $sale->customer_id,
+                            ];
+                        }
+                    }
+
+                    $context = $evaluator->context(empty($carts) ? [] : array_merge(...array_column($carts, 'cart_items')));
+                    $quotes = empty($carts) ? [] : $evaluator->evaluateMany($carts, $context);
+                    $categories = $context->categories();
+
+                    foreach ($quotes as $saleId => $quote) {
+                        if ($quote['total_discount'] <= 0) {
+                            continue;
+                        }
+                        $redemptions++;
+                        $totalDiscount += $quote['total_discount'];
+
+                        foreach ($carts[$saleId]['cart_items'] as $item) {
+                            if (self::affectsLine($rule, $item['product_id'], $categories)) {
+                                $products[$item['product_id']][0] = ($products[$item['product_id']][0] ?? 0) + 1;
+                                $products[$item['product_id']][1] = ($products[$item['product_id']][1] ?? 0) + $item['quantity'];
+                            }
+                        }
+                    }
+
+                    $processed += $sales->count();
+                    $shard->update([
+                        'processed_sales' => $processed,
+                        'redemptions' => $redemptions,
+                        'total_discount' => round($totalDiscount, 2),
+                        'products' => $products,
+                    ]);
+                });
+
+            $shard->update(['status' => 'completed']);
+        } catch (\Throwable $e) {
+            $shard->update([
+                'status' => 'failed',
+                'error' => $e->getMessage()
+            ]);
+        }
+
+        $backtest->refreshStatus();
+    }
+
+    /**
+     * Called by the queue when the job dies outside handle()'s own error
+     * handling (timeout, killed worker), so the backtest does not stay
+     * processing forever.
+     */
+    public function failed(\Throwable $e): void
+    {
+        $this->shard->update([
+            'status' => 'failed',
+            'error' => $e->getMessage() ?: class_basename($e),
+        ]);
+        $this->shard->backtest->refreshStatus();
+    }
+
+    /**
+     * Active empties of the products sold in a chunk, keyed by the product
+     * they are linked to.
+     */
+    private static function emptyLinks($sales): array
+    {
+        $productIds = $sales->flatMap(fn ($sale) => $sale->items->pluck('product_id'))->filter()->unique()->values();
+        if ($productIds->isEmpty()) {
+            return [];
+        }
+
+        $links = [];
+        DB::table('product_empties')
+            ->where('is_active', true)
+            ->whereIn('product_id', $productIds)
+            ->get(['product_id', 'empty_product_id', 'quantity', 'deposit_amount'])
+            ->each(function ($link) use (&$links) {
+                $links[(int) $link->product_id][] = $link;
+            });
+
+        return $links;
+    }
+
+    /**
+     * Ids of the lines SaleController::store added as empties of another
+     * line: the linked empty product, at the deposit price, in the linked
+     * quantity per unit.
+     *
+     * @return array<int, true>
+     */
+    private static function autoAddedEmpties($items, array $emptyLinks): array
+    {
+        $autoAdded = [];
+        foreach ($items as $item) {
+            foreach ($emptyLinks[(int) $item->product_id] ?? [] as $link) {
+                $line = $items->first(function ($line) use ($item, $link, $autoAdded) {
+                    return $line->id !== $item->id
+                        && !isset($autoAdded[$line->id])
+                        && (int) $line->product_id === (int) $link->empty_product_id
+                        && abs((float) $line->quantity - (float) $item->quantity * (float) $link->quantity) < 0.0001
+                        && abs((float) $line->unit_price - (float) $link->deposit_amount) < 0.005;
+                });
+                if ($line) {
+                    $autoAdded[$line->id] = true;
+                }
+            }
+        }
+
+        return $autoAdded;
+    }
+
+    /**
+     * Whether a cart line is one the promotion targets.
+     */
+    private static function affectsLine(CompiledPromotion $rule, int $productId, array $categories): bool
+    {
+        if (!empty($rule->buyProductSet) || !empty($rule->getProductSet)) {
+            return isset($rule->buyProductSet[$productId]) || isset($rule->getProductSet[$productId]);
+        }
+
+        switch ($rule->scope) {
+            case 'product':
+                return isset($rule->scopeProductIds[$productId]);
+            case 'category':
+                return isset($categories[$productId]) && isset($rule->scopeCategories[$categories[$productId]]);
+            default:
+                return true;
+        }
+    }
+}
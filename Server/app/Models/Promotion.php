@@ -80,6 +80,19 @@ public function scopeActive($query)
             });
     }
 
+    /**
+     * Every promotion the active scope leaves out: switched off, not yet
+     * started or already ended.
+     */
+    public function scopeInactive($query)
+    {
+        return $query->where(function ($q) {
+            $q->where('is_active', false)
+              ->orWhere('start_date', '>', now())
+              ->orWhere('end_date', '<', now());
+        });
+    }
+
     public function scopeForCompany($query, $companyId)
     {
         return $query->where('company_id', $companyId);
@@ -104,8 +117,8 @@ public function canBeUsedBy($customerId)
     {
         if (!$this->isValid()) return false;
         
-        if ($this->usage_limit_per_customer) {
-            $customerUsage = $this->usages()->where('customer_id', $customerId)->count();
+        if ($this->usage_limit_per_customer && $customerId) {
+            $customerUsage = PromotionCustomerUsage::usesFor((int) $customerId, [$this->id])[$this->id] ?? 0;
             if ($customerUsage >= $this->usage_limit_per_customer) return false;
         }
         
@@ -116,4 +129,40 @@ public function incrementUsage()
     {
         $this->increment('usage_count');
     }
+
+    /**
+     * Claim one use of each promotion in a single conditional update that
+     * never pushes usage_count past usage_limit_total. Returns false when
+     * any promotion could not be claimed; the caller must then roll back
+     * its transaction, since the others were already incremented.
+     */
+    public static function claimUsage(array $promotionIds): bool
+    {
+        $ids = array_values(array_unique(array_map('intval', $promotionIds)));
+        if (empty($ids)) {
+            return true;
+        }
+
+        $claimed = static::whereIn('id', $ids)
+            ->where(function ($q) {
+                $q->whereNull('usage_limit_total')
+                  ->orWhereColumn('usage_count', '<', 'usage_limit_total');
+            })
+            ->increment('usage_count');
+
+        return $claimed === count($ids);
+    }
+
+    /**
+     * Give back uses claimed with claimUsage() for a sale that then failed.
+     */
+    public static function releaseUsage(array $promotionIds): void
+    {
+        $ids = array_values(array_unique(array_map('intval', $promotionIds)));
+        if (empty($ids)) {
+            return;
+        }
+
+        static::whereIn('id', $ids)->where('usage_count', '>', 0)->decrement('usage_count');
+    }
 }
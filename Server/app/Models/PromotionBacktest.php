@@ -0,0 +1,112 @@
+<?php
+
+namespace App\Models;
+
+use Illuminate\Database\Eloquent\Model;
+
+class PromotionBacktest extends Model
+{
+    protected $fillable = [
+        'company_id',
+        'created_by',
+        'promotion',
+        'start_date',
+        'end_date',
+        'status',
+        'total_sales',
+        'completed_at',
+    ];
+
+    protected $casts = [
+        'promotion' => 'array',
+        'start_date' => 'date',
+        'end_date' => 'date',
+        'total_sales' => 'integer',
+        'completed_at' => 'datetime',
+    ];
+
+    public function shards()
+    {
+        return $this->hasMany(PromotionBacktestShard::class);
+    }
+
+    public function creator()
+    {
+        return $this->belongsTo(User::class, 'created_by');
+    }
+
+    /**
+     * Unsaved Promotion built from the draft attributes.
+     */
+    public function draftPromotion(): Promotion
+    {
+        $draft = new Promotion();
+        $draft->fill(array_intersect_key($this->promotion ?? [], array_flip($draft->getFillable())));
+        $draft->name = $draft->name ?: 'Draft promotion';
+        $draft->company_id = $this->company_id;
+
+        return $draft;
+    }
+
+    /**
+     * Mark the backtest completed or failed once every shard has finished.
+     */
+    public function refreshStatus(): void
+    {
+        $statuses = $this->shards()->pluck('status');
+
+        if ($statuses->contains('failed')) {
+            $this->update(['status' => 'failed', 'completed_at' => now()]);
+        } elseif ($statuses->every(fn ($status) => $status === 'completed')) {
+            $this->update(['status' => 'completed', 'completed_at' => now()]);
+        } elseif ($this->status === 'pending') {
+            $this->update(['status' => 'processing']);
+        }
+    }
+
+    /**
+     * Progress and results summed over the shards.
+     */
+    public function summary(int $topProducts = 50): array
+    {
+        $shards = $this->shards()->get();
+
+        $products = [];
+        foreach ($shards as $shard) {
+            foreach ((array) $shard->products as $productId => [$sales, $units]) {
+                $products[$productId][0] = ($products[$productId][0] ?? 0) + $sales;
+                $products[$productId][1] = ($products[$productId][1] ?? 0) + $units;
+            }
+        }
+        uasort($products, fn ($a, $b) => $b[0] <=> $a[0]);
+
+        $names = Product::whereIn('id', array_slice(array_keys($products), 0, $topProducts))->pluck('name', 'id');
+        $affected = [];
+        foreach (array_slice($products, 0, $topProducts, true) as $productId => [$sales, $units]) {
+            $affected[] = [
+                'product_id' => (int) $productId,
+                'name' => $names[$productId] ?? null,
+                'sales' => $sales,
+                'units' => round($units, 4),
+            ];
+        }
+
+        $processed = (int) $shards->sum('processed_sales');
+
+        return [
+            'id' => $this->id,
+            'status' => $this->status,
+            'start_date' => $this->start_date->toDateString(),
+            'end_date' => $this->end_date->toDateString(),
+            'total_sales' => $this->total_sales,
+            'processed_sales' => $processed,
+            'progress' => $this->total_sales > 0 ? round(min(100, $processed / $this->total_sales * 100), 1) : 100.0,
+            'redemptions' => (int) $shards->sum('redemptions'),
+            'total_discount' => round((float) $shards->sum('total_discount'), 2),
+            'affected_product_count' => count($products),
+            'affected_products' => $affected,
+            'errors' => $shards->pluck('error')->filter()->values(),
+            'completed_at' => $this->completed_at,
+        ];
+    }
+}
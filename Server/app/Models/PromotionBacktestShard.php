@@ -0,0 +1,32 @@
+<?php
+
+namespace App\Models;
+
+use Illuminate\Database\Eloquent\Model;
+
+class PromotionBacktestShard extends Model
+{
+    protected $fillable = [
+        'promotion_backtest_id',
+        'from_sale_id',
+        'to_sale_id',
+        'status',
+        'processed_sales',
+        'redemptions',
+        'total_discount',
+        'products',
+        'error',
+    ];
+
+    protected $casts = [
+        'processed_sales' => 'integer',
+        'redemptions' => 'integer',
+        'total_discount' => 'decimal:2',
+        'products' => 'array',
+    ];
+
+    public function backtest()
+    {
+        return $this->belongsTo(PromotionBacktest::class, 'promotion_backtest_id');
+    }
+}
@@ -0,0 +1,98 @@
+<?php
+
+namespace App\Models;
+
+use Illuminate\Database\Eloquent\Model;
+use Illuminate\Support\Facades\DB;
+
+class PromotionCustomerUsage extends Model
+{
+    protected $table = 'promotion_customer_usage';
+
+    protected $fillable = [
+        'promotion_id',
+        'customer_id',
+        'uses',
+    ];
+
+    protected $casts = [
+        'uses' => 'integer',
+    ];
+
+    public function promotion()
+    {
+        return $this->belongsTo(Promotion::class);
+    }
+
+    public function customer()
+    {
+        return $this->belongsTo(Customer::class);
+    }
+
+    /**
+     * Uses per promotion for one customer, keyed by promotion id.
+     *
+     * @return array<int, int>
+     */
+    public static function usesFor(int $customerId, array $promotionIds): array
+    {
+        if (empty($promotionIds)) {
+            return [];
+        }
+
+        return static::where('customer_id', $customerId)
+            ->whereIn('promotion_id', $promotionIds)
+            ->pluck('uses', 'promotion_id')
+            ->map(fn ($uses) => (int) $uses)
+            ->all();
+    }
+
+    /**
+     * Uses per customer and promotion for several customers in one query,
+     * keyed by customer id then promotion id.
+     *
+     * @return array<int, array<int, int>>
+     */
+    public static function usesForCustomers(array $customerIds, array $promotionIds): array
+    {
+        if (empty($customerIds) || empty($promotionIds)) {
+            return [];
+        }
+
+        $uses = [];
+        static::whereIn('customer_id', $customerIds)
+            ->whereIn('promotion_id', $promotionIds)
+            ->get(['customer_id', 'promotion_id', 'uses'])
+            ->each(function ($row) use (&$uses) {
+                $uses[(int) $row->customer_id][(int) $row->promotion_id] = (int) $row->uses;
+            });
+
+        return $uses;
+    }
+
+    /**
+     * Add one use of each promotion for a customer in a single upsert.
+     */
+    public static function recordUses(int $customerId, array $promotionIds): void
+    {
+        if (empty($promotionIds)) {
+            return;
+        }
+
+        $now = now();
+        $rows = array_map(function ($promotionId) use ($customerId, $now) {
+            return [
+                'promotion_id' => (int) $promotionId,
+                'customer_id' => $customerId,
+                'uses' => 1,
+                'created_at' => $now,
+                'updated_at' => $now,
+            ];
+        }, array_values(array_unique($promotionIds)));
+
+        DB::table('promotion_customer_usage')->upsert($rows, ['promotion_id', 'customer_id'], [
+            'uses' => DB::raw('promotion_customer_usage.uses + 1'),
+            'updated_at' => $now,
+        ]);
+    }
+}
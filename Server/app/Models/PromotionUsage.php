@@ -3,6 +3,7 @@
 namespace App\Models;
 
 use Illuminate\Database\Eloquent\Model;
+use Illuminate\Support\Collection;
 
 class PromotionUsage extends Model
 {
@@ -35,4 +36,46 @@ public function sale()
     {
         return $this->belongsTo(Sale::class);
     }
+
+    /**
+     * Bulk-insert one usage row per applied promotion of a sale and add them to
+     * the daily rollup.
+     *
+     * @param array<int, array{id: int, discount: float}> $appliedPromotions
+     */
+    public static function recordForSale(int $saleId, $customerId, array $appliedPromotions): void
+    {
+        $now = now();
+
+        static::insert(array_map(function ($applied) use ($saleId, $customerId, $now) {
+            return [
+                'promotion_id' => $applied['id'],
+                'customer_id' => $customerId,
+                'sale_id' => $saleId,
+                'discount_amount' => round((float) $applied['discount'], 2),
+                'used_at' => $now,
+                'created_at' => $now,
+                'updated_at' => $now,
+            ];
+        }, array_values($appliedPromotions)));
+
+        PromotionUsageDaily::recordForSale($appliedPromotions, $now);
+    }
+
+    /**
+     * Uses and discount per promotion of a company between two timestamps,
+     * aggregated in one query and keyed by promotion id.
+     */
+    public static function totalsForCompany(int $companyId, $from, $to): Collection
+    {
+        return static::query()
+            ->join('promotions', 'promotions.id', '=', 'promotion_usage.promotion_id')
+            ->where('promotions.company_id', $companyId)
+            ->whereBetween('promotion_usage.created_at', [$from, $to])
+            ->groupBy('promotion_usage.promotion_id')
+            ->selectRaw('promotion_usage.promotion_id, COUNT(*) as usage_count, SUM(promotion_usage.discount_amount) as total_discount')
+            ->toBase()
+            ->get()
+            ->keyBy('promotion_id');
+    }
 }
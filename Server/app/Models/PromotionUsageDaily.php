@@ -0,0 +1,81 @@
+<?php
+
+namespace App\Models;
+
+use Illuminate\Database\Eloquent\Model;
+use Illuminate\Support\Collection;
+use Illuminate\Support\Facades\DB;
+
+class PromotionUsageDaily extends Model
+{
+    protected $table = 'promotion_usage_daily';
+
+    protected $fillable = [
+        'promotion_id',
+        'day',
+        'uses',
+        'discount',
+    ];
+
+    protected $casts = [
+        'day' => 'date',
+        'uses' => 'integer',
+        'discount' => 'decimal:2',
+    ];
+
+    public function promotion()
+    {
+        return $this->belongsTo(Promotion::class);
+    }
+
+    /**
+     * Add a sale's applied promotions to the rollup for the day they were
+     * used, in a single upsert.
+     *
+     * @param array<int, array{id: int, discount: float}> $appliedPromotions
+     */
+    public static function recordForSale(array $appliedPromotions, $usedAt): void
+    {
+        if (empty($appliedPromotions)) {
+            return;
+        }
+
+        $day = $usedAt->toDateString();
+        $rows = [];
+        foreach ($appliedPromotions as $applied) {
+            $rows[(int) $applied['id']] = [
+                'promotion_id' => (int) $applied['id'],
+                'day' => $day,
+                'uses' => 1,
+                'discount' => round((float) $applied['discount'], 2),
+                'created_at' => $usedAt,
+                'updated_at' => $usedAt,
+            ];
+        }
+
+        // The row being inserted is VALUES() on MySQL and "excluded" elsewhere
+        $incoming = fn (string $column) => DB::getDriverName() === 'mysql' ? "VALUES({$column})" : "excluded.{$column}";
+
+        DB::table('promotion_usage_daily')->upsert(array_values($rows), ['promotion_id', 'day'], [
+            'uses' => DB::raw('promotion_usage_daily.uses + ' . $incoming('uses')),
+            'discount' => DB::raw('promotion_usage_daily.discount + ' . $incoming('discount')),
+            'updated_at' => $usedAt,
+        ]);
+    }
+
+    /**
+     * Uses and discount per promotion of a company over whole days (inclusive),
+     * keyed by promotion id.
+     */
+    public static function totalsForCompany(int $companyId, string $startDay, string $endDay): Collection
+    {
+        return DB::table('promotion_usage_daily')
+            ->join('promotions', 'promotions.id', '=', 'promotion_usage_daily.promotion_id')
+            ->where('promotions.company_id', $companyId)
+            ->whereBetween('promotion_usage_daily.day', [$startDay, $endDay])
+            ->groupBy('promotion_usage_daily.promotion_id')
+            ->selectRaw('promotion_usage_daily.promotion_id, SUM(promotion_usage_daily.uses) as usage_count, SUM(promotion_usage_daily.discount) as total_discount')
+            ->get()
+            ->keyBy('promotion_id');
+    }
+}
@@ -0,0 +1,217 @@
+<?php
+
+namespace App\Services\Promotions;
+
+use App\Models\Promotion;
+
+/**
+ * A promotion normalized once for evaluation.
+ *
+ * JSON columns are decoded (including legacy double-encoded values), product
+ * lists are turned into int-keyed sets and the buy X get Y scenario, quantities,
+ * minimums and tier rules are resolved from the columns and bxgy_config.
+ */
+class CompiledPromotion
+{
+    public int $id;
+    public string $name;
+    public string $type;
+    public string $scope;
+    public float $discountValue = 0.0;
+    public int $priority = 0;
+    public bool $isStackable = false;
+
+    /** @var array<int, true> */
+    public array $scopeProductIds = [];
+
+    /** @var array<string, true> */
+    public array $scopeCategories = [];
+
+    /** @var int[] */
+    public array $buyProducts = [];
+
+    /** @var array<int, true> */
+    public array $buyProductSet = [];
+
+    /** @var int[] */
+    public array $getProducts = [];
+
+    /** @var array<int, true> */
+    public array $getProductSet = [];
+
+    public ?string $scenario = null;
+    public ?int $buyQuantity = null;
+    public ?int $getQuantity = null;
+    public ?float $minimumPurchase = null;
+    public ?int $minimumQuantity = null;
+
+    /** @var array<int, array{buy: int, get: int}> */
+    public array $tierRules = [];
+
+    public ?int $startsAt = null;
+    public ?int $endsAt = null;
+    public ?int $usageLimitTotal = null;
+    public ?int $usageLimitPerCustomer = null;
+    public bool $firstTimeOnly = false;
+
+    /** @var array<string, true> price group ids and (upper-case) codes the customer must belong to */
+    public array $customerGroups = [];
+
+    public static function fromModel(Promotion $promo): self
+    {
+        $rule = new self();
+        $rule->id = (int) $promo->id;
+        $rule->name = (string) $promo->name;
+        $rule->type = (string) $promo->type;
+        $rule->scope = (string) ($promo->scope ?: 'all');
+        $rule->discountValue = (float) ($promo->discount_value ?? 0);
+        $rule->priority = (int) ($promo->priority ?? 0);
+        $rule->isStackable = (bool) $promo->is_stackable;
+
+        $scopeItems = self::decodeList($promo->scope_items);
+        if ($rule->scope === 'product') {
+            $rule->scopeProductIds = array_fill_keys(self::intList($scopeItems), true);
+        } elseif ($rule->scope === 'category') {
+            $rule->scopeCategories = array_fill_keys(array_map('strval', $scopeItems), true);
+        }
+
+        $bxgy = self::decodeMap($promo->bxgy_config);
+
+        $buyProducts = self::intList(self::decodeList($promo->buy_products));
+        if (empty($buyProducts) && !empty($bxgy['buy_products'])) {
+            $buyProducts = self::intList(self::decodeList($bxgy['buy_products']));
+        }
+        $getProducts = self::intList(self::decodeList($promo->get_products));
+        if (empty($getProducts) && !empty($bxgy['get_products'])) {
+            $getProducts = self::intList(self::decodeList($bxgy['get_products']));
+        }
+        $rule->buyProducts = $buyProducts;
+        $rule->buyProductSet = array_fill_keys($buyProducts, true);
+        $rule->getProducts = $getProducts;
+        $rule->getProductSet = array_fill_keys($getProducts, true);
+
+        $rule->scenario = !empty($bxgy['scenario']) ? (string) $bxgy['scenario'] : null;
+        if ($rule->type === 'buy_x_get_y' && $rule->scenario === null) {
+            $rule->scenario = 'specific_product';
+        }
+
+        $rule->buyQuantity = self::optionalInt($promo->buy_quantity ?? ($bxgy['buy_quantity'] ?? null));
+        $rule->getQuantity = self::optionalInt($promo->get_quantity ?? ($bxgy['get_quantity'] ?? null));
+        $rule->minimumPurchase = self::optionalFloat($promo->minimum_purchase ?? ($bxgy['minimum_purchase'] ?? null));
+        $rule->minimumQuantity = self::optionalInt($promo->minimum_quantity ?? ($bxgy['minimum_quantity'] ?? null));
+
+        foreach ((array) ($bxgy['tier_rules'] ?? []) as $tier) {
+            $buy = (int) ($tier['buy_qty'] ?? 0);
+            $get = (int) ($tier['get_qty'] ?? 0);
+            if ($buy > 0 && $get > 0) {
+                $rule->tierRules[] = ['buy' => $buy, 'get' => $get];
+            }
+        }
+
+        $rule->startsAt = $promo->start_date ? $promo->start_date->getTimestamp() : null;
+        $rule->endsAt = $promo->end_date ? $promo->end_date->getTimestamp() : null;
+        $rule->usageLimitTotal = self::optionalInt($promo->usage_limit_total);
+        $rule->usageLimitPerCustomer = self::optionalInt($promo->usage_limit_per_customer);
+        $rule->firstTimeOnly = (bool) $promo->first_time_only;
+        $groups = self::decodeList($promo->customer_groups);
+        if ($rule->scope === 'customer_group') {
+            // Customer group scope targets the groups picked as scope items
+            $groups = array_merge($groups, $scopeItems);
+        }
+        $groups = array_filter(array_map(fn ($group) => strtoupper(trim((string) $group)), $groups), 'strlen');
+        $rule->customerGroups = array_fill_keys($groups, true);
+
+        return $rule;
+    }
+
+    /**
+     * Whether the promotion's date window contains the given unix timestamp.
+     */
+    public function isLiveAt(int $timestamp): bool
+    {
+        if ($this->startsAt !== null && $timestamp < $this->startsAt) {
+            return false;
+        }
+
+        return $this->endsAt === null || $timestamp <= $this->endsAt;
+    }
+
+    /**
+     * Whether applying the promotion depends on usage counters that only
+     * the server can read at quote time.
+     */
+    public function hasUsageLimits(): bool
+    {
+        return $this->usageLimitTotal !== null || $this->usageLimitPerCustomer !== null;
+    }
+
+    /**
+     * Whether the promotion only applies to some customers (first-time
+     * buyers or members of given groups).
+     */
+    public function isTargeted(): bool
+    {
+        return $this->firstTimeOnly || !empty($this->customerGroups);
+    }
+
+    /**
+     * Compact form for the POS rule snapshot, holding exactly the fields the
+     * client-side evaluator reads.
+     */
+    public function toSnapshot(): array
+    {
+        return [
+            'id' => $this->id,
+            'name' => $this->name,
+            'type' => $this->type,
+            'scope' => $this->scope,
+            'value' => $this->discountValue,
+            'priority' => $this->priority,
+            'stackable' => $this->isStackable,
+            'scope_products' => array_keys($this->scopeProductIds),
+            'scope_categories' => array_map('strval', array_keys($this->scopeCategories)),
+            'buy_products' => $this->buyProducts,
+            'get_products' => $this->getProducts,
+            'scenario' => $this->scenario,
+            'buy_quantity' => $this->buyQuantity,
+            'get_quantity' => $this->getQuantity,
+            'minimum_purchase' => $this->minimumPurchase,
+            'minimum_quantity' => $this->minimumQuantity,
+            'tiers' => $this->tierRules,
+            'limited' => $this->hasUsageLimits(),
+            'targeted' => $this->isTargeted(),
+        ];
+    }
+
+    /**
+     * Decode a JSON column that may have been stored double-encoded.
+     */
+    private static function decodeMap($value): array
+    {
+        for ($i = 0; $i < 2 && is_string($value); $i++) {
+            $value = json_decode($value, true);
+        }
+
+        return is_array($value) ? $value : [];
+    }
+
+    private static function decodeList($value): array
+    {
+        return array_values(self::decodeMap($value));
+    }
+
+    private static function intList(array $values): array
+    {
+        return array_values(array_unique(array_filter(array_map('intval', $values))));
+    }
+
+    private static function optionalInt($value): ?int
+    {
+        return empty($value) ? null : (int) $value;
+    }
+
+    private static function optionalFloat($value): ?float
+    {
+        return empty($value) ? null : (float) $value;
+    }
+}
@@ -0,0 +1,412 @@
+<?php
+
+namespace App\Services\Promotions;
+
+use App\Models\User;
+use Illuminate\Support\Facades\DB;
+use Illuminate\Support\Str;
+
+/**
+ * Micro-benchmarks of the promotion hot path over a synthetic catalogue.
+ *
+ * seed() writes one company with 2,000 products in 25 categories and 1,000
+ * promotions covering every type, scope and buy X get Y scenario; run()
+ * times each scenario and reports latency percentiles, peak memory and
+ * queries per call. Queries per call are held to fixed budgets on any
+ * machine, and the rest is compared against stored baselines so a
+ * regression fails the run. Used by the promotions:benchmark command and
+ * tests/Feature/PromotionBenchmarkTest.
+ */
+class PromotionBenchmark
+{
+    public const PROMOTION_COUNT = 1000;
+    public const PRODUCT_COUNT = 2000;
+    public const CATEGORY_COUNT = 25;
+    public const CUSTOMER_COUNT = 50;
+
+    private const TYPES = ['percentage', 'fixed_amount', 'buy_x_get_y', 'spend_save', 'bulk_discount'];
+    private const SCENARIOS = ['specific_product', 'any_x_items', 'spend_x_get_y', 'tiered'];
+
+    /**
+     * Most queries one call of each scenario may issue. These do not depend
+     * on the machine, and any per-line, per-promotion or per-cart query
+     * blows through them.
+     */
+    public const QUERY_BUDGETS = [
+        'rule_set_compile' => 1,
+        'quote_10_lines' => 3,
+        'quote_500_lines' => 3,
+        'quote_50k_unit_lines' => 3,
+        'quote_with_customer_limits' => 4,
+        'quote_500_lines_best_for_customer' => 3,
+        'batch_100_carts' => 5,
+        'cart_session_delta' => 2,
+    ];
+
+    private int $iterations;
+    private int $warmup;
+    private int $companyId = 0;
+
+    /** @var array<int, float> product id => price */
+    private array $prices = [];
+
+    /** @var int[] */
+    private array $customerIds = [];
+
+    private int $queries = 0;
+    private bool $listening = false;
+
+    public function __construct(int $iterations = 30, int $warmup = 2)
+    {
+        $this->iterations = max(1, $iterations);
+        $this->warmup = max(0, $warmup);
+    }
+
+    public static function baselinePath(): string
+    {
+        return base_path('tests/Benchmarks/promotion_baselines.json');
+    }
+
+    /**
+     * Write the synthetic catalogue to the current default connection.
+     */
+    public function seed(): void
+    {
+        mt_srand(20261018);
+        $now = now();
+        $user = User::create([
+            'name' => 'Benchmark User',
+            'email' => 'benchmark-' . uniqid() . '@example.test',
+            'password' => Str::random(32),
+        ]);
+
+        $this->companyId = DB::table('companies')->insertGetId([
+            'name' => 'Benchmark Company',
+            'email' => 'benchmark-' . uniqid() . '@example.test',
+            'created_at' => $now,
+            'updated_at' => $now,
+        ]);
+
+        $products = [];
+        for ($i = 1; $i <= self::PRODUCT_COUNT; $i++) {
+            $products[] = [
+                'name' => "Product {$i}",
+                'price' => mt_rand(50, 50000) / 100,
+                'stock_quantity' => 1000000,
+                'category' => 'Category ' . ($i % self::CATEGORY_COUNT),
+                'company_id' => $this->companyId,
+                'created_at' => $now,
+                'updated_at' => $now,
+            ];
+        }
+        foreach (array_chunk($products, 250) as $chunk) {
+            DB::table('products')->insert($chunk);
+        }
+        $this->prices = DB::table('products')
+            ->where('company_id', $this->companyId)
+            ->pluck('price', 'id')
+            ->map(fn ($price) => (float) $price)
+            ->all();
+        $productIds = array_keys($this->prices);
+
+        $customers = [];
+        for ($i = 1; $i <= self::CUSTOMER_COUNT; $i++) {
+            $customers[] = [
+                'name' => "Customer {$i}",
+                'company_id' => $this->companyId,
+                'created_by' => $user->id,
+                'created_at' => $now,
+                'updated_at' => $now,
+            ];
+        }
+        DB::table('customers')->insert($customers);
+        $this->customerIds = DB::table('customers')->where('company_id', $this->companyId)->pluck('id')->all();
+
+        $promotions = [];
+        for ($i = 0; $i < self::PROMOTION_COUNT; $i++) {
+            $promotions[] = $this->promotionRow($i, $productIds, $user->id, $now);
+        }
+        foreach (array_chunk($promotions, 100) as $chunk) {
+            DB::table('promotions')->insert($chunk);
+        }
+
+        PromotionRuleCache::forget($this->companyId);
+    }
+
+    /**
+     * Run every scenario.
+     *
+     * @param callable(string): void|null $progress called with each scenario name
+     * @return array<string, array{p50_ms: float, p95_ms: float, p99_ms: float, max_ms: float, peak_memory_mb: float, queries: int}>
+     */
+    public function run(?callable $progress = null): array
+    {
+        $this->listenForQueries();
+
+        $small = $this->cart(10, 1, 5);
+        $large = $this->cart(500, 1, 20);
+        $bulk = $this->cart(100, 50000, 50000);
+        $withCustomer = $this->cart(50, 1, 10);
+        $batch = [];
+        for ($i = 0; $i < 100; $i++) {
+            $batch[] = ['cart_items' => $this->cart(20, 1, 5), 'customer_id' => $this->customerIds[$i % count($this->customerIds)]];
+        }
+        foreach ($batch as $i => $cart) {
+            $batch[$i]['cart_total'] = self::total($cart['cart_items']);
+        }
+
+        $companyId = $this->companyId;
+        $customerId = $this->customerIds[0];
+        $session = null;
+        $bestForCustomer = new PromotionCombinationSolver(PromotionCombinationSolver::BEST_FOR_CUSTOMER, (float) config('promotions.solver_budget_ms', 5));
+
+        $scenarios = [
+            'rule_set_compile' => function () use ($companyId) {
+                PromotionRuleCache::forget($companyId);
+                PromotionRuleCache::forCompany($companyId);
+            },
+            'quote_10_lines' => fn () => PromotionEvaluator::forCompany($companyId)->evaluate($small, self::total($small)),
+            'quote_500_lines' => fn () => PromotionEvaluator::forCompany($companyId)->evaluate($large, self::total($large)),
+            'quote_50k_unit_lines' => fn () => PromotionEvaluator::forCompany($companyId)->evaluate($bulk, self::total($bulk)),
+            'quote_with_customer_limits' => fn () => PromotionEvaluator::forCompany($companyId)->evaluate($withCustomer, self::total($withCustomer), $customerId),
+            'quote_500_lines_best_for_customer' => fn () => (new PromotionEvaluator(PromotionRuleCache::forCompany($companyId), $bestForCustomer))
+                ->evaluate($large, self::total($large)),
+            'batch_100_carts' => fn () => PromotionEvaluator::forCompany($companyId)->evaluateMany($batch),
+            'cart_session_delta' => function () use ($companyId, $large, &$session) {
+                $session ??= PromotionCartSession::create($companyId, $large);
+                $line = $large[array_rand($large)];
+                $session->applyDeltas([['op' => 'set_quantity', 'line_id' => (string) $line['product_id'], 'quantity' => mt_rand(1, 20)]]);
+            },
+        ];
+
+        // Build the rule set once so only rule_set_compile pays for it
+        PromotionRuleCache::forCompany($companyId);
+
+        $results = [];
+        foreach ($scenarios as $name => $scenario) {
+            if ($progress) {
+                $progress($name);
+            }
+            $results[$name] = $this->measure($scenario);
+        }
+
+        return $results;
+    }
+
+    /**
+     * Regressions of $results against $baselines, as messages. A scenario
+     * regresses when its p95 latency or peak memory exceeds the baseline by
+     * more than $tolerance (a factor), or when it issues more queries.
+     *
+     * @return string[]
+     */
+    public static function compare(array $results, array $baselines, float $tolerance): array
+    {
+        $regressions = [];
+
+        foreach ($baselines as $name => $baseline) {
+            $result = $results[$name] ?? null;
+            if ($result === null) {
+                continue;
+            }
+
+            // Small absolute slack keeps sub-millisecond scenarios from flapping
+            $maxP95 = $baseline['p95_ms'] * $tolerance + 0.5;
+            if ($result['p95_ms'] > $maxP95) {
+                $regressions[] = sprintf('%s: p95 %.2f ms exceeds baseline %.2f ms (limit %.2f ms)', $name, $result['p95_ms'], $baseline['p95_ms'], $maxP95);
+            }
+
+            $maxMemory = $baseline['peak_memory_mb'] * $tolerance + 1;
+            if ($result['peak_memory_mb'] > $maxMemory) {
+                $regressions[] = sprintf('%s: peak memory %.1f MB exceeds baseline %.1f MB (limit %.1f MB)', $name, $result['peak_memory_mb'], $baseline['peak_memory_mb'], $maxMemory);
+            }
+
+            if ($result['queries'] > $baseline['queries']) {
+                $regressions[] = sprintf('%s: %d queries per call, baseline %d', $name, $result['queries'], $baseline['queries']);
+            }
+        }
+
+        return $regressions;
+    }
+
+    /**
+     * Scenarios in $results that issue more queries per call than their
+     * QUERY_BUDGETS entry, or that have no budget at all, as messages.
+     *
+     * @return string[]
+     */
+    public static function overQueryBudget(array $results): array
+    {
+        $messages = [];
+
+        foreach ($results as $name => $result) {
+            $budget = self::QUERY_BUDGETS[$name] ?? null;
+            if ($budget === null) {
+                $messages[] = sprintf('%s: no query budget set', $name);
+            } elseif ($result['queries'] > $budget) {
+                $messages[] = sprintf('%s: %d queries per call, budget %d', $name, $result['queries'], $budget);
+            }
+        }
+
+        return $messages;
+    }
+
+    public static function loadBaselines(?string $path = null): array
+    {
+        $path = $path ?: self::baselinePath();
+        if (!is_file($path)) {
+            return [];
+        }
+
+        $baselines = json_decode((string) file_get_contents($path), true);
+
+        return is_array($baselines['scenarios'] ?? null) ? $baselines['scenarios'] : [];
+    }
+
+    public static function saveBaselines(array $results, ?string $path = null): void
+    {
+        $path = $path ?: self::baselinePath();
+        if (!is_dir(dirname($path))) {
+            mkdir(dirname($path), 0755, true);
+        }
+
+        file_put_contents($path, json_encode([
+            'recorded_at' => now()->toIso8601String(),
+            'php' => PHP_VERSION,
+            'scenarios' => $results,
+        ], JSON_PRETTY_PRINT) . "\n");
+    }
+
+    private function measure(callable $scenario): array
+    {
+        for ($i = 0; $i < $this->warmup; $i++) {
+            $scenario();
+        }
+
+        $timings = [];
+        $queries = 0;
+        $peak = 0;
+        for ($i = 0; $i < $this->iterations; $i++) {
+            $base = memory_get_usage();
+            memory_reset_peak_usage();
+            $before = $this->queries;
+
+            $start = hrtime(true);
+            $scenario();
+            $timings[] = (hrtime(true) - $start) / 1e6;
+
+            $queries = max($queries, $this->queries - $before);
+            $peak = max($peak, memory_get_peak_usage() - $base);
+        }
+        sort($timings);
+
+        return [
+            'p50_ms' => round(self::percentile($timings, 50), 3),
+            'p95_ms' => round(self::percentile($timings, 95), 3),
+            'p99_ms' => round(self::percentile($timings, 99), 3),
+            'max_ms' => round(end($timings), 3),
+            'peak_memory_mb' => round($peak / 1048576, 2),
+            'queries' => $queries,
+        ];
+    }
+
+    private static function percentile(array $sorted, int $percentile): float
+    {
+        $index = (int) ceil($percentile / 100 * count($sorted)) - 1;
+
+        return $sorted[max(0, min($index, count($sorted) - 1))];
+    }
+
+    private function listenForQueries(): void
+    {
+        if ($this->listening) {
+            return;
+        }
+        DB::listen(function () {
+            $this->queries++;
+        });
+        $this->listening = true;
+    }
+
+    private function promotionRow(int $i, array $productIds, int $userId, $now): array
+    {
+        $type = self::TYPES[$i % count(self::TYPES)];
+        // Mostly product and category scoped, as in real catalogues
+        $scope = $i % 50 === 0 ? 'all' : ($i % 2 ? 'product' : 'category');
+        $pick = fn (int $count) => array_map(fn () => $productIds[mt_rand(0, count($productIds) - 1)], range(1, $count));
+
+        $scopeItems = null;
+        if ($scope === 'product') {
+            $scopeItems = $pick(mt_rand(3, 12));
+        } elseif ($scope === 'category') {
+            $scopeItems = ['Category ' . mt_rand(0, self::CATEGORY_COUNT - 1), 'Category ' . mt_rand(0, self::CATEGORY_COUNT - 1)];
+        }
+
+        $row = [
+            'name' => "Benchmark {$type} {$i}",
+            'type' => $type,
+            'discount_value' => $type === 'fixed_amount' ? mt_rand(1, 50) : mt_rand(5, 30),
+            'buy_quantity' => null,
+            'get_quantity' => null,
+            'buy_products' => null,
+            'get_products' => null,
+            'bxgy_config' => null,
+            'minimum_purchase' => $i % 7 === 0 ? mt_rand(50, 500) : null,
+            'minimum_quantity' => $i % 11 === 0 ? mt_rand(2, 20) : null,
+            'scope' => $scope,
+            'scope_items' => $scopeItems !== null ? json_encode($scopeItems) : null,
+            'start_date' => $i % 4 === 0 ? $now->copy()->subDays(10) : null,
+            'end_date' => $i % 4 === 0 ? $now->copy()->addDays(30) : null,
+            'usage_limit_total' => $i % 20 === 0 ? 1000000 : null,
+            'usage_limit_per_customer' => $i % 40 === 0 ? 100 : null,
+            'is_active' => $i % 10 !== 9,
+            'priority' => $i % 10,
+            'is_stackable' => $i % 3 === 0,
+            'company_id' => $this->companyId,
+            'created_by' => $userId,
+            'created_at' => $now,
+            'updated_at' => $now,
+        ];
+
+        if ($type === 'buy_x_get_y') {
+            $scenario = self::SCENARIOS[intdiv($i, count(self::TYPES)) % count(self::SCENARIOS)];
+            $row['buy_quantity'] = mt_rand(1, 4);
+            $row['get_quantity'] = mt_rand(1, 2);
+            $config = ['scenario' => $scenario];
+            if ($scenario === 'specific_product') {
+                $row['buy_products'] = json_encode($pick(mt_rand(1, 4)));
+                $row['get_products'] = json_encode($pick(mt_rand(1, 3)));
+            } elseif ($scenario === 'spend_x_get_y') {
+                $row['minimum_purchase'] = mt_rand(100, 1000);
+                $row['get_products'] = json_encode($pick(2));
+            } elseif ($scenario === 'tiered') {
+                $config['tier_rules'] = [['buy_qty' => 3, 'get_qty' => 1], ['buy_qty' => 6, 'get_qty' => 2]];
+            }
+            $row['bxgy_config'] = json_encode($config);
+        }
+
+        return $row;
+    }
+
+    /**
+     * Cart of $lines distinct products with quantities in [$minQty, $maxQty].
+     */
+    private function cart(int $lines, int $minQty, int $maxQty): array
+    {
+        $items = [];
+        foreach (array_rand($this->prices, $lines) as $productId) {
+            $items[] = [
+                'product_id' => $productId,
+                'quantity' => mt_rand($minQty, $maxQty),
+                'price' => $this->prices[$productId],
+            ];
+        }
+
+        return $items;
+    }
+
+    private static function total(array $items): float
+    {
+        return array_reduce($items, fn ($sum, $item) => $sum + $item['price'] * $item['quantity'], 0.0);
+    }
+}
@@ -0,0 +1,108 @@
+<?php
+
+namespace App\Services\Promotions;
+
+use App\Models\Product;
+
+/**
+ * Product attributes the promotions of one evaluation need, loaded up front
+ * and shared by every promotion priced against the cart.
+ *
+ * Only what the rule set reads is fetched: categories of cart products when
+ * it has category-scoped promotions (one query), and prices of the get
+ * products of buy X get Y promotions, to value free units missing from the
+ * cart (from PromotionPriceCache). Carts that need neither cost no query.
+ */
+class PromotionCartContext
+{
+    private int $companyId;
+
+    /** @var array<int, string> product id => category */
+    private array $categories = [];
+
+    /** @var array<int, float> product id => price */
+    private array $prices = [];
+
+    /** @var array<int, true> product ids whose category was looked up, found or not */
+    private array $loaded = [];
+
+    private bool $pricesLoaded = false;
+
+    public function __construct(int $companyId)
+    {
+        $this->companyId = $companyId;
+    }
+
+    public static function forCart(PromotionRuleSet $ruleSet, array $cartItems): self
+    {
+        $context = new self($ruleSet->companyId);
+        $context->prefetch($ruleSet, array_column($cartItems, 'product_id'));
+
+        return $context;
+    }
+
+    /**
+     * Load the attributes of the given cart products (and the rule set's get
+     * product prices) that have not been loaded yet.
+     *
+     * @param int[] $productIds
+     */
+    public function prefetch(PromotionRuleSet $ruleSet, array $productIds): void
+    {
+        if (!$this->pricesLoaded) {
+            $this->prices = PromotionPriceCache::getProductPrices($ruleSet);
+            $this->pricesLoaded = true;
+        }
+
+        if (!$ruleSet->hasCategoryRules()) {
+            return;
+        }
+
+        $missing = array_keys(array_diff_key(array_fill_keys(array_map('intval', $productIds), true), $this->loaded));
+        if (empty($missing)) {
+            return;
+        }
+
+        $categories = Product::whereIn('id', $missing)
+            ->where('company_id', $this->companyId)
+            ->whereNotNull('category')
+            ->toBase()
+            ->pluck('category', 'id');
+
+        foreach ($categories as $productId => $category) {
+            $this->categories[(int) $productId] = (string) $category;
+        }
+        $this->loaded += array_fill_keys($missing, true);
+    }
+
+    public function category(int $productId): ?string
+    {
+        return $this->categories[$productId] ?? null;
+    }
+
+    /**
+     * Categories of the given products (all loaded products when null).
+     *
+     * @return array<int, string> product id => category
+     */
+    public function categories(?array $productIds = null): array
+    {
+        if ($productIds === null) {
+            return $this->categories;
+        }
+
+        return array_intersect_key($this->categories, array_flip(array_map('intval', $productIds)));
+    }
+
+    /**
+     * Lowest price among the given products; 0 when none are known.
+     *
+     * @param int[] $productIds
+     */
+    public function cheapestPrice(array $productIds): float
+    {
+        $prices = array_intersect_key($this->prices, array_flip($productIds));
+
+        return empty($prices) ? 0.0 : min($prices);
+    }
+}
@@ -0,0 +1,229 @@
+<?php
+
+namespace App\Services\Promotions;
+
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Str;
+
+/**
+ * A server-held POS cart that is edited through deltas.
+ *
+ * Alongside the lines it keeps the discount each promotion touching the
+ * cart gives on its own. A delta only re-prices the promotions the changed
+ * lines can affect (PromotionRuleSet::affectedBy); stacking and usage limits
+ * are applied over the kept discounts when quoting, which costs at most the
+ * same keyed usage queries as calculateDiscount. When the company's rule set
+ * or a get-product price changes, the whole cart is re-priced.
+ *
+ * One terminal edits a cart at a time; concurrent deltas are not merged.
+ */
+class PromotionCartSession
+{
+    private const TTL_SECONDS = 7200;
+
+    public string $id;
+    public int $companyId;
+    public ?int $customerId = null;
+
+    /** Rules and prices the kept discounts were priced against. */
+    public string $ruleVersion = '';
+
+    /** @var array<string, array{product_id: int, quantity: int, price: float}> line id => line */
+    public array $lines = [];
+
+    /** Product attributes of the lines, extended as lines are added. */
+    public ?PromotionCartContext $context = null;
+
+    /** @var array<int, float> promotion id => discount it gives on its own (only > 0) */
+    public array $discounts = [];
+
+    public static function create(int $companyId, array $lines = [], ?int $customerId = null): self
+    {
+        $session = new self();
+        $session->id = (string) Str::uuid();
+        $session->companyId = $companyId;
+        $session->customerId = $customerId;
+
+        $evaluator = PromotionEvaluator::forCompany($companyId);
+        foreach ($lines as $line) {
+            $session->putLine($line);
+        }
+        $session->recompute($evaluator);
+
+        return $session;
+    }
+
+    public static function find(string $id, int $companyId): ?self
+    {
+        $session = Cache::get("promotion_cart_{$id}");
+
+        return $session instanceof self && $session->companyId === $companyId ? $session : null;
+    }
+
+    public function save(): void
+    {
+        Cache::put("promotion_cart_{$this->id}", $this, self::TTL_SECONDS);
+    }
+
+    public function forget(): void
+    {
+        Cache::forget("promotion_cart_{$this->id}");
+    }
+
+    /**
+     * Apply deltas in order, then re-price only the promotions the changed
+     * products can affect.
+     *
+     * Ops: add_line {line_id?, product_id, quantity, price} (replaces a line
+     * with the same id), set_quantity {line_id, quantity}, remove_line
+     * {line_id}, set_customer {customer_id}. The customer only matters for
+     * usage limits, which are checked when quoting.
+     */
+    public function applyDeltas(array $deltas): void
+    {
+        $changed = [];
+        $added = [];
+        $before = $this->totals();
+
+        foreach ($deltas as $delta) {
+            $lineId = isset($delta['line_id']) ? (string) $delta['line_id'] : null;
+            $previous = $lineId !== null ? ($this->lines[$lineId] ?? null) : null;
+            if ($previous) {
+                $changed[$previous['product_id']] = true;
+            }
+
+            switch ($delta['op']) {
+                case 'add_line':
+                    $line = $this->putLine($delta);
+                    $changed[$line['product_id']] = true;
+                    $added[] = $line['product_id'];
+                    break;
+                case 'set_quantity':
+                    if ($previous) {
+                        $this->lines[$lineId]['quantity'] = (int) $delta['quantity'];
+                    }
+                    break;
+                case 'remove_line':
+                    unset($this->lines[$lineId]);
+                    break;
+                case 'set_customer':
+                    $this->customerId = !empty($delta['customer_id']) ? (int) $delta['customer_id'] : null;
+                    break;
+            }
+        }
+
+        $evaluator = PromotionEvaluator::forCompany($this->companyId);
+        if ($evaluator->snapshotVersion() !== $this->ruleVersion) {
+            $this->recompute($evaluator);
+            return;
+        }
+        $this->context->prefetch($evaluator->ruleSet(), $added);
+
+        if (empty($changed)) {
+            return;
+        }
+
+        $productIds = array_keys($changed);
+        $categories = array_values(array_unique($this->context->categories($productIds)));
+        $this->price($evaluator, $evaluator->ruleSet()->affectedBy($productIds, $categories, $before, $this->totals()));
+    }
+
+    /**
+     * Re-price every promotion touching the cart (the full evaluation).
+     */
+    public function recompute(?PromotionEvaluator $evaluator = null): void
+    {
+        $evaluator = $evaluator ?: PromotionEvaluator::forCompany($this->companyId);
+        $this->ruleVersion = $evaluator->snapshotVersion();
+        $this->discounts = [];
+
+        $cartItems = $this->cartItems();
+        $this->context = $evaluator->context($cartItems);
+        if (!empty($cartItems)) {
+            $this->price($evaluator, $evaluator->candidates($cartItems, $this->context));
+        }
+    }
+
+    /**
+     * Quote the cart like calculateDiscount, including a quote id checkout
+     * can redeem.
+     */
+    public function quote(): array
+    {
+        $evaluator = PromotionEvaluator::forCompany($this->companyId);
+        $ruleSet = $evaluator->ruleSet();
+        if ($evaluator->snapshotVersion() !== $this->ruleVersion) {
+            $this->recompute($evaluator);
+        }
+
+        $cartItems = $this->cartItems();
+        $cartTotal = $this->cartTotal();
+
+        $priced = array_filter($ruleSet->promotions, fn (CompiledPromotion $rule) => isset($this->discounts[$rule->id]));
+        $usable = $evaluator->withinUsageLimits($evaluator->eligibleFor($priced, $this->customerId), $this->customerId);
+        $result = $evaluator->combine($usable, $this->discounts, $cartItems, $cartTotal, $this->context);
+        $result['quote_id'] = PromotionQuoteStore::issue($ruleSet, $cartItems, $cartTotal, $this->customerId, $result);
+
+        return [
+            'cart_id' => $this->id,
+            'customer_id' => $this->customerId,
+            'lines' => $this->lines,
+            'cart_total' => round($cartTotal, 2),
+        ] + $result;
+    }
+
+    public function cartItems(): array
+    {
+        return array_values($this->lines);
+    }
+
+    public function cartTotal(): float
+    {
+        return array_reduce($this->lines, fn ($sum, $line) => $sum + $line['price'] * $line['quantity'], 0.0);
+    }
+
+    /**
+     * @return array{total: float, quantity: int}
+     */
+    private function totals(): array
+    {
+        return [
+            'total' => $this->cartTotal(),
+            'quantity' => PromotionEvaluator::quantityTotal($this->cartItems()),
+        ];
+    }
+
+    /**
+     * @param CompiledPromotion[] $promotions
+     */
+    private function price(PromotionEvaluator $evaluator, array $promotions): void
+    {
+        $cartItems = $this->cartItems();
+        $cartTotal = $this->cartTotal();
+        $cartQuantityTotal = PromotionEvaluator::quantityTotal($cartItems);
+
+        foreach ($promotions as $rule) {
+            $discount = empty($cartItems)
+                ? 0.0
+                : $evaluator->promotionDiscount($rule, $cartItems, $cartTotal, $cartQuantityTotal, $this->context);
+
+            if ($discount > 0) {
+                $this->discounts[$rule->id] = $discount;
+            } else {
+                unset($this->discounts[$rule->id]);
+            }
+        }
+    }
+
+    private function putLine(array $line): array
+    {
+        $productId = (int) $line['product_id'];
+        $lineId = isset($line['line_id']) ? (string) $line['line_id'] : (string) $productId;
+
+        return $this->lines[$lineId] = [
+            'product_id' => $productId,
+            'quantity' => (int) $line['quantity'],
+            'price' => (float) $line['price'],
+        ];
+    }
+}
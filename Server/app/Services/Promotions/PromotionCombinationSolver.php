@@ -0,0 +1,216 @@
+<?php
+
+namespace App\Services\Promotions;
+
+/**
+ * Chooses which of a cart's priced promotions to apply together.
+ *
+ * A combination is valid when it holds at most one non-stackable promotion
+ * and no two buy X get Y promotions give away units from the same products
+ * (a unit can only be free once). The total is capped at the cart total.
+ *
+ * Policies:
+ *  - priority_first: walk promotions by priority, take each one that fits,
+ *    stop after the first non-stackable one taken. Discounts are priced
+ *    lazily, so lower-priority promotions are never priced once it stops.
+ *  - best_for_customer: branch and bound over all priced promotions for the
+ *    largest total, seeded with the priority_first answer. Branches whose
+ *    upper bound (value so far plus the remaining stackable discounts and
+ *    the largest remaining non-stackable one, capped) cannot beat the best
+ *    are pruned, and the search returns its best so far once the time
+ *    budget is spent.
+ */
+class PromotionCombinationSolver
+{
+    public const PRIORITY_FIRST = 'priority_first';
+    public const BEST_FOR_CUSTOMER = 'best_for_customer';
+
+    /** Nodes expanded between checks of the time budget. */
+    private const CLOCK_INTERVAL = 128;
+
+    private string $policy;
+    private int $budgetNs;
+
+    // Search state for best_for_customer
+    private array $items = [];
+    /** @var float[] sum of the stackable discounts from each index on */
+    private array $suffixStackable = [];
+    /** @var float[] largest non-stackable discount from each index on */
+    private array $suffixExclusive = [];
+    private float $cap = 0.0;
+    private float $bestValue = 0.0;
+    private array $bestChoice = [];
+    private int $deadline = 0;
+    private int $nodes = 0;
+    private bool $timedOut = false;
+
+    public function __construct(string $policy = self::PRIORITY_FIRST, float $budgetMs = 5.0)
+    {
+        $this->policy = $policy === self::BEST_FOR_CUSTOMER ? self::BEST_FOR_CUSTOMER : self::PRIORITY_FIRST;
+        $this->budgetNs = (int) max(0, $budgetMs * 1e6);
+    }
+
+    public static function fromConfig(): self
+    {
+        return new self(
+            (string) config('promotions.combination_policy', self::PRIORITY_FIRST),
+            (float) config('promotions.solver_budget_ms', 5)
+        );
+    }
+
+    public function policy(): string
+    {
+        return $this->policy;
+    }
+
+    public function budgetMs(): float
+    {
+        return $this->budgetNs / 1e6;
+    }
+
+    /**
+     * @param CompiledPromotion[] $candidates in priority order
+     * @param callable(CompiledPromotion): float $discountOf discount of a promotion on its own
+     * @param callable(CompiledPromotion): ?array $poolOf product ids (as keys) a buy X get Y promotion gives units from, null otherwise
+     * @return array<int, array{0: CompiledPromotion, 1: float}> chosen promotions with their discounts, in priority order
+     */
+    public function solve(array $candidates, callable $discountOf, callable $poolOf, float $cap): array
+    {
+        $greedy = $this->priorityFirst($candidates, $discountOf, $poolOf);
+        if ($this->policy === self::PRIORITY_FIRST) {
+            return $greedy;
+        }
+
+        $this->items = [];
+        foreach ($candidates as $position => $rule) {
+            $discount = $discountOf($rule);
+            if ($discount > 0) {
+                $this->items[] = [$rule, $discount, $poolOf($rule), $position];
+            }
+        }
+        // Largest discounts first so good answers are found early
+        usort($this->items, fn ($a, $b) => $b[1] <=> $a[1]);
+
+        $this->suffixStackable = [];
+        $this->suffixExclusive = [];
+        $stackable = 0.0;
+        $exclusive = 0.0;
+        for ($i = count($this->items) - 1; $i >= 0; $i--) {
+            [$rule, $discount] = $this->items[$i];
+            if ($rule->isStackable) {
+                $stackable += $discount;
+            } else {
+                $exclusive = max($exclusive, $discount);
+            }
+            $this->suffixStackable[$i] = $stackable;
+            $this->suffixExclusive[$i] = $exclusive;
+        }
+        $remaining = $stackable + $exclusive;
+
+        $this->cap = max(0.0, $cap);
+        $this->bestValue = min(array_sum(array_column($greedy, 1)), $this->cap);
+        $this->bestChoice = $greedy;
+        $this->deadline = hrtime(true) + $this->budgetNs;
+        $this->nodes = 0;
+        $this->timedOut = false;
+
+        if ($this->bestValue < min($remaining, $this->cap)) {
+            $this->search(0, 0.0, [], false, []);
+        }
+
+        $choice = $this->bestChoice;
+        $this->items = [];
+        $this->suffixStackable = [];
+        $this->suffixExclusive = [];
+        $this->bestChoice = [];
+
+        return $choice;
+    }
+
+    /**
+     * Whether the last best_for_customer search ran out of time.
+     */
+    public function timedOut(): bool
+    {
+        return $this->timedOut;
+    }
+
+    private function priorityFirst(array $candidates, callable $discountOf, callable $poolOf): array
+    {
+        $chosen = [];
+        $usedPool = [];
+
+        foreach ($candidates as $rule) {
+            $discount = $discountOf($rule);
+            if ($discount <= 0) {
+                continue;
+            }
+            $pool = $poolOf($rule);
+            if ($pool !== null && array_intersect_key($pool, $usedPool)) {
+                continue;
+            }
+
+            $chosen[] = [$rule, $discount];
+            if ($pool !== null) {
+                $usedPool += $pool;
+            }
+            // Only stop if this promo is NOT stackable and a discount was applied
+            if (!$rule->isStackable) {
+                break;
+            }
+        }
+
+        return $chosen;
+    }
+
+    private function search(int $index, float $value, array $chosen, bool $hasExclusive, array $usedPool): void
+    {
+        if ($this->timedOut) {
+            return;
+        }
+        if (++$this->nodes % self::CLOCK_INTERVAL === 0 && hrtime(true) > $this->deadline) {
+            $this->timedOut = true;
+            return;
+        }
+
+        $capped = min($value, $this->cap);
+        if ($capped > $this->bestValue + 0.000001) {
+            $this->bestValue = $capped;
+            $this->bestChoice = $this->inPriorityOrder($chosen);
+        }
+
+        if ($index >= count($this->items) || $this->bestValue >= $this->cap) {
+            return;
+        }
+        $bound = $value + $this->suffixStackable[$index] + ($hasExclusive ? 0.0 : $this->suffixExclusive[$index]);
+        if (min($bound, $this->cap) <= $this->bestValue + 0.000001) {
+            return;
+        }
+
+        [$rule, $discount, $pool, $position] = $this->items[$index];
+
+        $fits = !($hasExclusive && !$rule->isStackable)
+            && !($pool !== null && array_intersect_key($pool, $usedPool));
+
+        if ($fits) {
+            $chosen[$position] = [$rule, $discount];
+            $this->search(
+                $index + 1,
+                $value + $discount,
+                $chosen,
+                $hasExclusive || !$rule->isStackable,
+                $pool !== null ? $usedPool + $pool : $usedPool
+            );
+            unset($chosen[$position]);
+        }
+
+        $this->search($index + 1, $value, $chosen, $hasExclusive, $usedPool);
+    }
+
+    private function inPriorityOrder(array $chosen): array
+    {
+        ksort($chosen);
+
+        return array_values($chosen);
+    }
+}
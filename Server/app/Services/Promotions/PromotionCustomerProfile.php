@@ -0,0 +1,194 @@
+<?php
+
+namespace App\Services\Promotions;
+
+use App\Models\Customer;
+use App\Models\Sale;
+use Illuminate\Support\Facades\Cache;
+
+/**
+ * Cached eligibility profile of a customer for targeted promotions
+ * (first_time_only, customer_groups): whether they have bought before and
+ * the groups they belong to. A customer's groups are their price group,
+ * matched by id or code.
+ *
+ * Profiles are built with one query per batch of uncached customers and
+ * kept until the customer's purchase history or group changes:
+ * SaleController::store calls recordSale(), CustomerController::update
+ * calls forget() and PriceGroupController::update calls forgetCompany().
+ */
+class PromotionCustomerProfile
+{
+    private const TTL_SECONDS = 86400;
+
+    /**
+     * @return array{has_prior_purchase: bool, price_group_id: int|null, groups: array<string, true>}|null
+     *         null when the customer is not one of the company's
+     */
+    public static function forCustomer(int $companyId, int $customerId): ?array
+    {
+        return self::forCustomers($companyId, [$customerId])[$customerId] ?? null;
+    }
+
+    /**
+     * Profiles of several customers, keyed by customer id. Customers not
+     * found for the company are left out.
+     *
+     * @param int[] $customerIds
+     */
+    public static function forCustomers(int $companyId, array $customerIds): array
+    {
+        $customerIds = array_values(array_unique(array_map('intval', $customerIds)));
+        if (empty($customerIds)) {
+            return [];
+        }
+
+        $version = self::version($companyId);
+        $keys = [];
+        foreach ($customerIds as $customerId) {
+            $keys[$customerId] = self::cacheKey($companyId, $version, $customerId);
+        }
+
+        $cached = Cache::many(array_values($keys));
+        $profiles = [];
+        $missing = [];
+        foreach ($keys as $customerId => $key) {
+            if (is_array($cached[$key] ?? null)) {
+                $profiles[$customerId] = $cached[$key];
+            } else {
+                $missing[] = $customerId;
+            }
+        }
+
+        if (!empty($missing)) {
+            $loaded = self::load($companyId, $missing);
+            $toCache = [];
+            foreach ($loaded as $customerId => $profile) {
+                $profiles[$customerId] = $profile;
+                $toCache[$keys[$customerId]] = $profile;
+            }
+            if (!empty($toCache)) {
+                Cache::putMany($toCache, self::TTL_SECONDS);
+            }
+        }
+
+        return $profiles;
+    }
+
+    /**
+     * Whether a profile satisfies a promotion's targeting. Targeted
+     * promotions never apply without a known customer.
+     */
+    public static function allows(CompiledPromotion $rule, ?array $profile): bool
+    {
+        if (!$rule->isTargeted()) {
+            return true;
+        }
+        if ($profile === null) {
+            return false;
+        }
+        if ($rule->firstTimeOnly && $profile['has_prior_purchase']) {
+            return false;
+        }
+
+        return empty($rule->customerGroups) || (bool) array_intersect_key($rule->customerGroups, $profile['groups']);
+    }
+
+    /**
+     * Mark the customer as having bought (call after recording a sale).
+     */
+    public static function recordSale(int $companyId, ?int $customerId): void
+    {
+        if (!$customerId) {
+            return;
+        }
+
+        $key = self::cacheKey($companyId, self::version($companyId), $customerId);
+        $profile = Cache::get($key);
+        if (is_array($profile) && !$profile['has_prior_purchase']) {
+            $profile['has_prior_purchase'] = true;
+            Cache::put($key, $profile, self::TTL_SECONDS);
+        }
+    }
+
+    /**
+     * Drop a customer's cached profile (call after changing their group).
+     */
+    public static function forget(int $companyId, int $customerId): void
+    {
+        Cache::forget(self::cacheKey($companyId, self::version($companyId), $customerId));
+    }
+
+    /**
+     * Invalidate every cached profile of the company (call after changing
+     * a price group's code).
+     */
+    public static function forgetCompany(?int $companyId): void
+    {
+        if (!$companyId) {
+            return;
+        }
+
+        self::version($companyId);
+        Cache::increment("promotion_customer_profiles_version_{$companyId}");
+    }
+
+    /**
+     * Seeded randomly like PromotionRuleCache::version(), so an evicted
+     * counter never brings back profiles cached before forgetCompany().
+     */
+    private static function version(int $companyId): int
+    {
+        $key = "promotion_customer_profiles_version_{$companyId}";
+
+        $version = Cache::get($key);
+        if ($version === null) {
+            Cache::add($key, random_int(1, PHP_INT_MAX >> 1));
+            $version = Cache::get($key);
+        }
+
+        return (int) $version;
+    }
+
+    private static function cacheKey(int $companyId, int $version, int $customerId): string
+    {
+        return "promotion_customer_profile_{$companyId}_v{$version}_{$customerId}";
+    }
+
+    /**
+     * @param int[] $customerIds
+     */
+    private static function load(int $companyId, array $customerIds): array
+    {
+        $rows = Customer::query()
+            ->leftJoin('price_groups', 'price_groups.id', '=', 'customers.price_group_id')
+            ->where('customers.company_id', $companyId)
+            ->whereIn('customers.id', $customerIds)
+            ->select('customers.id', 'customers.price_group_id', 'price_groups.code as price_group_code')
+            ->selectSub(
+                Sale::query()->selectRaw('1')->whereColumn('sales.customer_id', 'customers.id')->limit(1),
+                'has_prior_purchase'
+            )
+            ->toBase()
+            ->get();
+
+        $profiles = [];
+        foreach ($rows as $row) {
+            $groups = [];
+            if ($row->price_group_id !== null) {
+                $groups[(string) $row->price_group_id] = true;
+            }
+            if ($row->price_group_code !== null && $row->price_group_code !== '') {
+                $groups[strtoupper((string) $row->price_group_code)] = true;
+            }
+
+            $profiles[(int) $row->id] = [
+                'has_prior_purchase' => (bool) $row->has_prior_purchase,
+                'price_group_id' => $row->price_group_id !== null ? (int) $row->price_group_id : null,
+                'groups' => $groups,
+            ];
+        }
+
+        return $profiles;
+    }
+}
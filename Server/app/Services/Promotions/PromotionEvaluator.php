@@ -0,0 +1,848 @@
+<?php
+
+namespace App\Services\Promotions;
+
+use App\Models\Promotion;
+use App\Models\PromotionCustomerUsage;
+
+/**
+ * Evaluates a cart against a company's compiled promotions.
+ *
+ * Shared by the POS quote (PromotionController::calculateDiscount) and the
+ * checkout path (SaleController::store), so both give the same answer. Only
+ * promotions whose scope touches a cart line are evaluated, found through
+ * the rule set's product and category indexes; which of them apply together
+ * is decided by the PromotionCombinationSolver policy.
+ */
+class PromotionEvaluator
+{
+    private PromotionRuleSet $ruleSet;
+    private PromotionCombinationSolver $solver;
+
+    /** Intermediate values of the promotion being priced; only set while explaining. */
+    private ?array $notes = null;
+
+    public function __construct(PromotionRuleSet $ruleSet, ?PromotionCombinationSolver $solver = null)
+    {
+        $this->ruleSet = $ruleSet;
+        $this->solver = $solver ?: PromotionCombinationSolver::fromConfig();
+    }
+
+    public static function forCompany(int $companyId): self
+    {
+        return new self(PromotionRuleCache::forCompany($companyId));
+    }
+
+    /**
+     * Evaluator over a single unsaved promotion, for backtests. Its date
+     * window and usage limits are ignored: the replayed range is the window.
+     */
+    public static function forDraft(int $companyId, Promotion $draft): self
+    {
+        $rule = CompiledPromotion::fromModel($draft);
+        $rule->startsAt = null;
+        $rule->endsAt = null;
+        $rule->usageLimitTotal = null;
+        $rule->usageLimitPerCustomer = null;
+        // Profiles hold today's purchase history, not the replayed sale's
+        $rule->firstTimeOnly = false;
+
+        return new self(new PromotionRuleSet($companyId, 0, [$rule], PHP_INT_MAX));
+    }
+
+    public function ruleSet(): PromotionRuleSet
+    {
+        return $this->ruleSet;
+    }
+
+    /**
+     * Version of the rules and get-product prices this evaluator prices
+     * with; changes when a promotion or a product price is written.
+     */
+    public function snapshotVersion(): string
+    {
+        return $this->ruleSet->snapshotVersion() . '.' . PromotionPriceCache::version($this->ruleSet->companyId);
+    }
+
+    /**
+     * Compact, versioned copy of the rule set for evaluating carts on the
+     * POS client. Each rule carries the cheapest price of its get products
+     * to value free units missing from the cart. Usage-limited and
+     * customer-targeted rules are flagged: only the server can check them.
+     */
+    public function snapshot(): array
+    {
+        $context = PromotionCartContext::forCart($this->ruleSet, []);
+
+        $rules = [];
+        foreach ($this->ruleSet->promotions as $rule) {
+            $rules[] = $rule->toSnapshot() + ['get_price' => $context->cheapestPrice($rule->getProducts)];
+        }
+
+        return [
+            'version' => $this->snapshotVersion(),
+            'expires_at' => $this->ruleSet->expiresAt,
+            'policy' => $this->solver->policy(),
+            'solver_budget_ms' => $this->solver->budgetMs(),
+            'rules' => $rules,
+        ];
+    }
+
+    /**
+     * Prefetch the product attributes the rule set needs for these lines.
+     */
+    public function context(array $cartItems): PromotionCartContext
+    {
+        return PromotionCartContext::forCart($this->ruleSet, $cartItems);
+    }
+
+    /**
+     * Promotions whose scope touches at least one cart line, in priority order.
+     *
+     * @return CompiledPromotion[]
+     */
+    public function candidates(array $cartItems, PromotionCartContext $context): array
+    {
+        $productIds = array_map('intval', array_column($cartItems, 'product_id'));
+
+        return $this->ruleSet->candidatesFor($productIds, array_values($context->categories($productIds)));
+    }
+
+    /**
+     * Drop targeted promotions (first-time buyers, customer groups) the
+     * customer is not eligible for. The customer's cached profile is only
+     * read when a candidate is targeted.
+     *
+     * @param CompiledPromotion[] $candidates
+     * @return CompiledPromotion[]
+     */
+    public function eligibleFor(array $candidates, ?int $customerId): array
+    {
+        if (!self::hasTargeted($candidates)) {
+            return $candidates;
+        }
+        $profile = $customerId ? PromotionCustomerProfile::forCustomer($this->ruleSet->companyId, $customerId) : null;
+
+        return self::filterByProfile($candidates, $profile);
+    }
+
+    private static function hasTargeted(array $candidates): bool
+    {
+        foreach ($candidates as $rule) {
+            if ($rule->isTargeted()) {
+                return true;
+            }
+        }
+
+        return false;
+    }
+
+    private static function filterByProfile(array $candidates, ?array $profile): array
+    {
+        return array_values(array_filter($candidates, fn (CompiledPromotion $rule) => PromotionCustomerProfile::allows($rule, $profile)));
+    }
+
+    /**
+     * Drop promotions whose total cap or per-customer limit is used up.
+     *
+     * usage_count moves with every sale, so it is read fresh rather than
+     * cached; both limits cost at most one keyed query each.
+     *
+     * @param CompiledPromotion[] $candidates
+     * @return CompiledPromotion[]
+     */
+    public function withinUsageLimits(array $candidates, ?int $customerId = null): array
+    {
+        $cappedIds = [];
+        $perCustomerIds = [];
+        foreach ($candidates as $rule) {
+            if ($rule->usageLimitTotal) {
+                $cappedIds[] = $rule->id;
+            }
+            if ($rule->usageLimitPerCustomer) {
+                $perCustomerIds[] = $rule->id;
+            }
+        }
+        $usageCounts = self::usageCounts($cappedIds);
+        $customerUses = $customerId ? PromotionCustomerUsage::usesFor($customerId, $perCustomerIds) : [];
+
+        return self::filterByUsage($candidates, $usageCounts, $customerId, $customerUses);
+    }
+
+    /**
+     * @param CompiledPromotion[] $candidates
+     * @param array<int, int> $usageCounts promotion id => usage_count
+     * @param array<int, int> $customerUses promotion id => uses by this customer
+     * @return CompiledPromotion[]
+     */
+    private static function filterByUsage(array $candidates, array $usageCounts, ?int $customerId, array $customerUses): array
+    {
+        return array_values(array_filter($candidates, function (CompiledPromotion $rule) use ($usageCounts, $customerUses, $customerId) {
+            if ($rule->usageLimitTotal && ($usageCounts[$rule->id] ?? 0) >= $rule->usageLimitTotal) {
+                return false;
+            }
+
+            return !($customerId && $rule->usageLimitPerCustomer && ($customerUses[$rule->id] ?? 0) >= $rule->usageLimitPerCustomer);
+        }));
+    }
+
+    private static function usageCounts(array $promotionIds): array
+    {
+        if (empty($promotionIds)) {
+            return [];
+        }
+
+        return Promotion::whereIn('id', array_values(array_unique($promotionIds)))->pluck('usage_count', 'id')->all();
+    }
+
+    /**
+     * Quote the promotions applicable to a cart.
+     *
+     * @return array{applicable_promotions: array, total_discount: float}
+     */
+    public function evaluate(array $cartItems, $cartTotal, ?int $customerId = null): array
+    {
+        $context = $this->context($cartItems);
+        $candidates = $this->eligibleFor($this->candidates($cartItems, $context), $customerId);
+        $candidates = $this->withinUsageLimits($candidates, $customerId);
+
+        return $this->applyCandidates($candidates, $cartItems, $cartTotal, $context);
+    }
+
+    /**
+     * Quote a cart like evaluate() and report why each promotion did or did
+     * not apply.
+     *
+     * Every promotion of the rule set gets a trace row with the decision
+     * that settled it (scope_mismatch, customer_required,
+     * customer_not_eligible, total_limit_reached, customer_limit_reached,
+     * minimum_not_met, no_discount, not_combined or applied), the values behind it (matched subtotal, free units, ...)
+     * and, for priced promotions, the time spent pricing it. Every usable
+     * candidate is priced, so this is slower than evaluate() and is only
+     * used when a caller asks for it; evaluate() never records anything.
+     */
+    public function explain(array $cartItems, $cartTotal, ?int $customerId = null): array
+    {
+        $startedAt = hrtime(true);
+        $context = $this->context($cartItems);
+        $candidates = $this->candidates($cartItems, $context);
+        $profile = $customerId && self::hasTargeted($candidates)
+            ? PromotionCustomerProfile::forCustomer($this->ruleSet->companyId, $customerId)
+            : null;
+        $eligible = self::filterByProfile($candidates, $profile);
+
+        $cappedIds = [];
+        $perCustomerIds = [];
+        foreach ($eligible as $rule) {
+            if ($rule->usageLimitTotal) {
+                $cappedIds[] = $rule->id;
+            }
+            if ($rule->usageLimitPerCustomer) {
+                $perCustomerIds[] = $rule->id;
+            }
+        }
+        $usageCounts = self::usageCounts($cappedIds);
+        $customerUses = $customerId ? PromotionCustomerUsage::usesFor($customerId, $perCustomerIds) : [];
+        $usable = self::filterByUsage($eligible, $usageCounts, $customerId, $customerUses);
+
+        $rows = [];
+        foreach ($this->ruleSet->promotions as $rule) {
+            $rows[$rule->id] = self::traceRow($rule, 'scope_mismatch');
+        }
+        foreach ($candidates as $rule) {
+            if (!PromotionCustomerProfile::allows($rule, $profile)) {
+                $rows[$rule->id] = self::traceRow($rule, $profile === null ? 'customer_required' : 'customer_not_eligible', [
+                    'first_time_only' => $rule->firstTimeOnly,
+                    'customer_groups' => array_keys($rule->customerGroups),
+                    'has_prior_purchase' => $profile['has_prior_purchase'] ?? null,
+                    'customer_groups_held' => array_keys($profile['groups'] ?? []),
+                ]);
+            } elseif ($rule->usageLimitTotal && ($usageCounts[$rule->id] ?? 0) >= $rule->usageLimitTotal) {
+                $rows[$rule->id] = self::traceRow($rule, 'total_limit_reached', [
+                    'usage_count' => (int) ($usageCounts[$rule->id] ?? 0),
+                    'usage_limit_total' => $rule->usageLimitTotal,
+                ]);
+            } elseif ($customerId && $rule->usageLimitPerCustomer && ($customerUses[$rule->id] ?? 0) >= $rule->usageLimitPerCustomer) {
+                $rows[$rule->id] = self::traceRow($rule, 'customer_limit_reached', [
+                    'customer_uses' => (int) ($customerUses[$rule->id] ?? 0),
+                    'usage_limit_per_customer' => $rule->usageLimitPerCustomer,
+                ]);
+            }
+        }
+
+        $cartQuantityTotal = self::quantityTotal($cartItems);
+        $discounts = [];
+        foreach ($usable as $rule) {
+            $this->notes = [];
+            $pricedAt = hrtime(true);
+            $discounts[$rule->id] = $this->discountFor($rule, $cartItems, $cartTotal, $cartQuantityTotal, $context);
+            $elapsedUs = (hrtime(true) - $pricedAt) / 1e3;
+
+            $reason = $this->notes['reason'] ?? ($discounts[$rule->id] > 0 ? 'not_combined' : 'no_discount');
+            unset($this->notes['reason']);
+            $rows[$rule->id] = self::traceRow($rule, $reason, $this->notes + ['discount' => round($discounts[$rule->id], 2)]);
+            $rows[$rule->id]['eval_us'] = round($elapsedUs, 1);
+        }
+        $this->notes = null;
+
+        $result = $this->combine($usable, $discounts, $cartItems, $cartTotal, $context);
+
+        $appliedIds = array_column($result['applicable_promotions'], 'id');
+        foreach ($appliedIds as $id) {
+            $rows[$id]['decision'] = 'applied';
+        }
+        foreach ($rows as $id => $row) {
+            if ($row['decision'] === 'not_combined') {
+                $rows[$id]['values']['policy'] = $this->solver->policy();
+                $rows[$id]['values']['blocked_by'] = $this->blockedBy($id, $appliedIds, $usable, $cartItems, $context);
+            }
+        }
+
+        $timed = array_filter($rows, fn ($row) => isset($row['eval_us']));
+        uasort($timed, fn ($a, $b) => $b['eval_us'] <=> $a['eval_us']);
+
+        $result['trace'] = [
+            'policy' => $this->solver->policy(),
+            'cart_lines' => count($cartItems),
+            'cart_units' => $cartQuantityTotal,
+            'candidates' => count($candidates),
+            'priced' => count($usable),
+            'total_us' => round((hrtime(true) - $startedAt) / 1e3, 1),
+            'slowest' => array_slice(array_map(fn ($row) => ['id' => $row['id'], 'eval_us' => $row['eval_us']], array_values($timed)), 0, 5),
+            'promotions' => array_values($rows),
+        ];
+
+        return $result;
+    }
+
+    private static function traceRow(CompiledPromotion $rule, string $decision, array $values = []): array
+    {
+        return [
+            'id' => $rule->id,
+            'name' => $rule->name,
+            'type' => $rule->type,
+            'scenario' => $rule->scenario,
+            'priority' => $rule->priority,
+            'stackable' => $rule->isStackable,
+            'decision' => $decision,
+            'values' => $values,
+        ];
+    }
+
+    /**
+     * Applied promotions that kept a priced promotion out of the
+     * combination: a non-stackable one, or a buy X get Y one giving away
+     * units from the same products.
+     *
+     * @return int[]
+     */
+    private function blockedBy(int $promotionId, array $appliedIds, array $usable, array $cartItems, PromotionCartContext $context): array
+    {
+        $byId = [];
+        foreach ($usable as $rule) {
+            $byId[$rule->id] = $rule;
+        }
+        $rule = $byId[$promotionId];
+        $pool = $this->freeUnitPool($rule, $cartItems, $context);
+
+        $blockers = [];
+        foreach ($appliedIds as $appliedId) {
+            $applied = $byId[$appliedId];
+            $appliedPool = $this->freeUnitPool($applied, $cartItems, $context);
+            if (!$applied->isStackable
+                || ($pool !== null && $appliedPool !== null && array_intersect_key($pool, $appliedPool))) {
+                $blockers[] = $appliedId;
+            }
+        }
+
+        return $blockers;
+    }
+
+    /**
+     * Record intermediate values of the promotion being priced (explain only).
+     */
+    private function note(array $values): void
+    {
+        $this->notes = $values + $this->notes;
+    }
+
+    /**
+     * Quote many carts at once. Product attributes, usage counts,
+     * per-customer uses and uncached customer profiles are loaded with one
+     * query each for the whole batch.
+     * Carts are priced independently against current usage; one cart's
+     * promotions do not count toward the limits of the next.
+     *
+     * @param array<int, array{cart_items: array, cart_total: mixed, customer_id?: int|null}> $carts
+     * @param PromotionCartContext|null $context prefetched for all the carts' lines
+     * @return array<int, array{applicable_promotions: array, total_discount: float}> keyed like $carts
+     */
+    public function evaluateMany(array $carts, ?PromotionCartContext $context = null): array
+    {
+        if ($context === null) {
+            $allItems = [];
+            foreach ($carts as $cart) {
+                foreach ($cart['cart_items'] as $item) {
+                    $allItems[] = $item;
+                }
+            }
+            $context = $this->context($allItems);
+        }
+
+        $candidateLists = [];
+        $cappedIds = [];
+        $perCustomerIds = [];
+        $customerIds = [];
+        $targetedCustomerIds = [];
+        foreach ($carts as $key => $cart) {
+            $candidateLists[$key] = $this->candidates($cart['cart_items'], $context);
+            if (!empty($cart['customer_id']) && self::hasTargeted($candidateLists[$key])) {
+                $targetedCustomerIds[] = (int) $cart['customer_id'];
+            }
+
+            foreach ($candidateLists[$key] as $rule) {
+                if ($rule->usageLimitTotal) {
+                    $cappedIds[] = $rule->id;
+                }
+                if ($rule->usageLimitPerCustomer && !empty($cart['customer_id'])) {
+                    $perCustomerIds[] = $rule->id;
+                }
+            }
+            if (!empty($cart['customer_id'])) {
+                $customerIds[] = (int) $cart['customer_id'];
+            }
+        }
+
+        $usageCounts = self::usageCounts($cappedIds);
+        $customerUses = PromotionCustomerUsage::usesForCustomers(
+            array_values(array_unique($customerIds)),
+            array_values(array_unique($perCustomerIds))
+        );
+        $profiles = PromotionCustomerProfile::forCustomers($this->ruleSet->companyId, $targetedCustomerIds);
+
+        $results = [];
+        foreach ($carts as $key => $cart) {
+            $customerId = !empty($cart['customer_id']) ? (int) $cart['customer_id'] : null;
+            $candidates = self::filterByProfile($candidateLists[$key], $profiles[$customerId] ?? null);
+            $candidates = self::filterByUsage($candidates, $usageCounts, $customerId, $customerUses[$customerId] ?? []);
+            $results[$key] = $this->applyCandidates($candidates, $cart['cart_items'], $cart['cart_total'], $context);
+        }
+
+        return $results;
+    }
+
+    /**
+     * Price the usable candidates against one cart and let the solver pick
+     * the combination to apply.
+     *
+     * @param CompiledPromotion[] $candidates
+     */
+    private function applyCandidates(array $candidates, array $cartItems, $cartTotal, PromotionCartContext $context): array
+    {
+        $cartQuantityTotal = self::quantityTotal($cartItems);
+        $discounts = [];
+        $discountOf = function (CompiledPromotion $promo) use (&$discounts, $cartItems, $cartTotal, $cartQuantityTotal, $context) {
+            return $discounts[$promo->id] ??= $this->promotionDiscount($promo, $cartItems, $cartTotal, $cartQuantityTotal, $context);
+        };
+
+        return $this->choose($candidates, $discountOf, $cartItems, $cartTotal, $context);
+    }
+
+    /**
+     * Combine discounts already priced per promotion, as applyCandidates
+     * would.
+     *
+     * @param CompiledPromotion[] $candidates in priority order
+     * @param array<int, float> $discounts promotion id => discount on its own
+     */
+    public function combine(array $candidates, array $discounts, array $cartItems, $cartTotal, PromotionCartContext $context): array
+    {
+        $discountOf = fn (CompiledPromotion $promo) => $discounts[$promo->id] ?? 0.0;
+
+        return $this->choose($candidates, $discountOf, $cartItems, $cartTotal, $context);
+    }
+
+    private function choose(array $candidates, callable $discountOf, array $cartItems, $cartTotal, PromotionCartContext $context): array
+    {
+        $poolOf = fn (CompiledPromotion $promo) => $this->freeUnitPool($promo, $cartItems, $context);
+        $chosen = $this->solver->solve($candidates, $discountOf, $poolOf, (float) $cartTotal);
+
+        // Never discount more than the cart is worth. Promotions keep their
+        // discount in priority order until the cart total is used up, so the
+        // rows PromotionUsage::recordForSale stores add up to total_discount;
+        // a promotion left with nothing to give is not applied.
+        $applicablePromotions = [];
+        $totalDiscount = 0.0;
+        $remaining = round(max(0.0, (float) $cartTotal), 2);
+        foreach ($chosen as [$promo, $discount]) {
+            $discount = min(round($discount, 2), $remaining);
+            if ($discount <= 0) {
+                continue;
+            }
+            $remaining = round($remaining - $discount, 2);
+            $applicablePromotions[] = self::applicableRow($promo, $discount);
+            $totalDiscount += $discount;
+        }
+
+        if (PromotionMetrics::active()) {
+            PromotionMetrics::recordCart(count($cartItems), self::quantityTotal($cartItems), count($candidates), count($applicablePromotions));
+        }
+
+        return [
+            'applicable_promotions' => $applicablePromotions,
+            'total_discount' => round($totalDiscount, 2),
+        ];
+    }
+
+    /**
+     * Products a buy X get Y promotion gives its free units from: its get
+     * products, or the lines it matches when it has none. Null for other
+     * promotion types.
+     *
+     * @return array<int, true>|null
+     */
+    private function freeUnitPool(CompiledPromotion $promo, array $cartItems, PromotionCartContext $context): ?array
+    {
+        if ($promo->type !== 'buy_x_get_y') {
+            return null;
+        }
+        if (!empty($promo->getProductSet)) {
+            return $promo->getProductSet;
+        }
+
+        return array_fill_keys(array_map('intval', array_column($this->matchedItems($promo, $cartItems, $context), 'product_id')), true);
+    }
+
+    public static function quantityTotal(array $cartItems): int
+    {
+        return array_reduce($cartItems, function ($sum, $item) {
+            return $sum + ($item['quantity'] ?? 0);
+        }, 0);
+    }
+
+    /**
+     * Discount one promotion gives the cart on its own, ignoring stacking
+     * and usage limits.
+     */
+    public function promotionDiscount(CompiledPromotion $promo, array $cartItems, $cartTotal, $cartQuantityTotal, PromotionCartContext $context): float
+    {
+        if (!PromotionMetrics::active()) {
+            return $this->discountFor($promo, $cartItems, $cartTotal, $cartQuantityTotal, $context);
+        }
+
+        $startedAt = hrtime(true);
+        $discount = $this->discountFor($promo, $cartItems, $cartTotal, $cartQuantityTotal, $context);
+        PromotionMetrics::recordPromotion($promo, hrtime(true) - $startedAt);
+
+        return $discount;
+    }
+
+    private function discountFor(CompiledPromotion $promo, array $cartItems, $cartTotal, $cartQuantityTotal, PromotionCartContext $context): float
+    {
+        $matchedItems = $this->matchedItems($promo, $cartItems, $context);
+
+        if (empty($matchedItems)) {
+            if ($this->notes !== null) {
+                $this->note(['reason' => 'scope_mismatch']);
+            }
+            return 0.0;
+        }
+        if ($this->notes !== null) {
+            $this->note(['matched_lines' => count($matchedItems)]);
+        }
+
+        $minimumPurchase = $promo->minimumPurchase;
+        $minimumQuantity = $promo->minimumQuantity;
+
+        // check minimum requirements (if configured)
+        $minimumPurchaseMet = $minimumPurchase !== null ? ($cartTotal >= $minimumPurchase) : false;
+        $minimumQuantityMet = $minimumQuantity !== null ? ($cartQuantityTotal >= $minimumQuantity) : false;
+
+        $hasAnyMinConfigured = $minimumPurchase !== null || $minimumQuantity !== null;
+        if ($hasAnyMinConfigured && !$minimumPurchaseMet && !$minimumQuantityMet) {
+            if ($this->notes !== null) {
+                $this->note([
+                    'reason' => 'minimum_not_met',
+                    'cart_total' => (float) $cartTotal,
+                    'cart_quantity' => $cartQuantityTotal,
+                    'minimum_purchase' => $minimumPurchase,
+                    'minimum_quantity' => $minimumQuantity,
+                ]);
+            }
+            return 0.0;
+        }
+
+        switch ($promo->type) {
+            case 'percentage':
+            case 'bulk_discount':
+                $matchedTotal = array_reduce($matchedItems, function ($sum, $item) {
+                    return $sum + ($item['price'] * $item['quantity']);
+                }, 0);
+                if ($this->notes !== null) {
+                    $this->note(['matched_subtotal' => $matchedTotal, 'percent' => $promo->discountValue]);
+                }
+
+                return $matchedTotal * ($promo->discountValue / 100);
+
+            case 'spend_save':
+                // Percentage off the matched lines once they reach the minimum spend
+                $matchedTotal = array_reduce($matchedItems, function ($sum, $item) {
+                    return $sum + ($item['price'] * $item['quantity']);
+                }, 0);
+                if ($this->notes !== null) {
+                    $this->note(['matched_subtotal' => $matchedTotal, 'percent' => $promo->discountValue]);
+                }
+                if ($minimumPurchase !== null && $matchedTotal < $minimumPurchase) {
+                    if ($this->notes !== null) {
+                        $this->note(['reason' => 'minimum_not_met', 'minimum_purchase' => $minimumPurchase]);
+                    }
+                    return 0.0;
+                }
+
+                return $matchedTotal * ($promo->discountValue / 100);
+
+            case 'fixed_amount':
+                if ($minimumPurchase !== null && $cartTotal < $minimumPurchase) {
+                    if ($this->notes !== null) {
+                        $this->note(['reason' => 'minimum_not_met', 'cart_total' => (float) $cartTotal, 'minimum_purchase' => $minimumPurchase]);
+                    }
+                    return 0.0;
+                }
+
+                return $promo->discountValue;
+
+            case 'buy_x_get_y':
+                return $this->buyXGetYDiscount($promo, $matchedItems, $cartItems, $cartTotal, $context);
+        }
+
+        return 0.0;
+    }
+
+    /**
+     * Cart lines inside the promotion's scope.
+     */
+    private function matchedItems(CompiledPromotion $promo, array $cartItems, PromotionCartContext $context): array
+    {
+        switch ($promo->scope) {
+            case 'product':
+                return array_filter($cartItems, function ($item) use ($promo) {
+                    return isset($promo->scopeProductIds[(int) $item['product_id']]);
+                });
+            case 'category':
+                return array_filter($cartItems, function ($item) use ($promo, $context) {
+                    $category = $context->category((int) $item['product_id']);
+                    return $category !== null && isset($promo->scopeCategories[$category]);
+                });
+            default:
+                return $cartItems;
+        }
+    }
+
+    private static function applicableRow(CompiledPromotion $promo, float $discount): array
+    {
+        return [
+            'id' => $promo->id,
+            'name' => $promo->name,
+            'type' => $promo->type,
+            'discount' => round($discount, 2),
+            'buy_quantity' => $promo->buyQuantity,
+            'get_quantity' => $promo->getQuantity,
+            'buy_products' => $promo->buyProducts,
+            'get_products' => $promo->getProducts,
+            'minimum_purchase' => $promo->minimumPurchase,
+            'minimum_quantity' => $promo->minimumQuantity
+        ];
+    }
+
+    /**
+     * Value of the free units of a buy X get Y promotion.
+     *
+     * Lines are collapsed into price buckets (price => units, cheapest
+     * first) so the cost depends on the number of distinct prices, not on
+     * how many units are in the cart.
+     */
+    private function buyXGetYDiscount(CompiledPromotion $promo, array $matchedItems, array $cartItems, $cartTotal, PromotionCartContext $context): float
+    {
+        $buyQty = (int) $promo->buyQuantity;
+        $getQty = (int) $promo->getQuantity;
+
+        switch ($promo->scenario) {
+            case 'specific_product':
+                if (empty($promo->buyProducts) || $buyQty <= 0) {
+                    return 0.0;
+                }
+                $totalBuyUnits = 0;
+                foreach ($cartItems as $it) {
+                    if (isset($promo->buyProductSet[(int) $it['product_id']])) {
+                        $totalBuyUnits += max(0, (int) ($it['quantity'] ?? 0));
+                    }
+                }
+                $freeUnits = intdiv($totalBuyUnits, $buyQty) * $getQty;
+                if ($this->notes !== null) {
+                    $this->note(['buy_units' => $totalBuyUnits, 'buy_quantity' => $buyQty, 'free_units' => $freeUnits]);
+                }
+                if ($freeUnits <= 0) {
+                    return 0.0;
+                }
+
+                // Without get_products the free units come from the matched items
+                if (empty($promo->getProducts)) {
+                    return self::cheapestUnitsValue(self::priceBuckets($matchedItems), $freeUnits);
+                }
+
+                $buckets = self::priceBuckets($this->itemsIn($cartItems, $promo->getProductSet));
+                $missingUnits = $freeUnits - self::unitCount($buckets);
+                if ($this->notes !== null && $missingUnits > 0) {
+                    $this->note(['free_units_not_in_cart' => $missingUnits, 'valued_at' => $context->cheapestPrice($promo->getProducts)]);
+                }
+                if ($missingUnits > 0) {
+                    // Free units not in the cart are valued at the cheapest get product
+                    $buckets = self::addBucket($buckets, $context->cheapestPrice($promo->getProducts), $missingUnits);
+                }
+
+                return self::cheapestUnitsValue($buckets, $freeUnits);
+
+            case 'any_x_items':
+                if ($buyQty <= 0) {
+                    return 0.0;
+                }
+                $buckets = self::priceBuckets($matchedItems);
+                $freeUnits = intdiv(self::unitCount($buckets), $buyQty) * $getQty;
+                if ($this->notes !== null) {
+                    $this->note(['matched_units' => self::unitCount($buckets), 'buy_quantity' => $buyQty, 'free_units' => $freeUnits]);
+                }
+                if ($freeUnits <= 0) {
+                    return 0.0;
+                }
+
+                return self::cheapestUnitsValue($buckets, $freeUnits);
+
+            case 'spend_x_get_y':
+                if ($promo->minimumPurchase === null || $cartTotal < $promo->minimumPurchase || $getQty <= 0) {
+                    if ($this->notes !== null) {
+                        $this->note(['reason' => 'minimum_not_met', 'cart_total' => (float) $cartTotal, 'minimum_purchase' => $promo->minimumPurchase]);
+                    }
+                    return 0.0;
+                }
+                if ($this->notes !== null) {
+                    $this->note(['free_units' => $getQty]);
+                }
+                $eligibleGetItems = empty($promo->getProducts) ? [] : $this->itemsIn($cartItems, $promo->getProductSet);
+                if (!empty($eligibleGetItems)) {
+                    $buckets = self::priceBuckets($eligibleGetItems);
+                } elseif (!empty($promo->getProducts)) {
+                    $buckets = [[$context->cheapestPrice($promo->getProducts), $getQty]];
+                } else {
+                    $buckets = self::priceBuckets($matchedItems);
+                }
+
+                return self::cheapestUnitsValue($buckets, $getQty);
+
+            case 'tiered':
+                if (empty($promo->tierRules)) {
+                    return 0.0;
+                }
+                $buckets = self::priceBuckets($matchedItems);
+                $totalUnits = self::unitCount($buckets);
+                $discount = 0.0;
+                // Each tier takes its free units from the cheapest units left by the previous tier
+                foreach ($promo->tierRules as $tier) {
+                    $freeUnits = min(intdiv($totalUnits, $tier['buy']) * $tier['get'], $totalUnits);
+                    if ($freeUnits <= 0) {
+                        continue;
+                    }
+                    $discount += self::cheapestUnitsValue($buckets, $freeUnits);
+                    $buckets = self::dropCheapestUnits($buckets, $freeUnits);
+                    $totalUnits -= $freeUnits;
+                    if ($this->notes !== null) {
+                        $this->note(['tiers' => array_merge($this->notes['tiers'] ?? [], [$tier + ['free_units' => $freeUnits]])]);
+                    }
+                }
+
+                return $discount;
+        }
+
+        return 0.0;
+    }
+
+    private function itemsIn(array $cartItems, array $productSet): array
+    {
+        return array_filter($cartItems, function ($it) use ($productSet) {
+            return isset($productSet[(int) $it['product_id']]);
+        });
+    }
+
+    /**
+     * Collapse cart lines into [price, units] buckets sorted by price ascending.
+     *
+     * @return array<int, array{0: float, 1: int}>
+     */
+    private static function priceBuckets(array $items): array
+    {
+        $units = [];
+        foreach ($items as $it) {
+            $qty = max(0, (int) ($it['quantity'] ?? 0));
+            if ($qty > 0) {
+                $price = (string) (float) $it['price'];
+                $units[$price] = ($units[$price] ?? 0) + $qty;
+            }
+        }
+        ksort($units, SORT_NUMERIC);
+
+        $buckets = [];
+        foreach ($units as $price => $qty) {
+            $buckets[] = [(float) $price, $qty];
+        }
+
+        return $buckets;
+    }
+
+    private static function addBucket(array $buckets, float $price, int $units): array
+    {
+        $buckets[] = [$price, $units];
+        usort($buckets, fn ($a, $b) => $a[0] <=> $b[0]);
+
+        return $buckets;
+    }
+
+    private static function unitCount(array $buckets): int
+    {
+        return array_sum(array_column($buckets, 1));
+    }
+
+    /**
+     * Total price of the $units cheapest units (or all units if fewer).
+     */
+    private static function cheapestUnitsValue(array $buckets, int $units): float
+    {
+        $value = 0.0;
+        foreach ($buckets as [$price, $qty]) {
+            if ($units <= 0) {
+                break;
+            }
+            $take = min($qty, $units);
+            $value += $price * $take;
+            $units -= $take;
+        }
+
+        return $value;
+    }
+
+    private static function dropCheapestUnits(array $buckets, int $units): array
+    {
+        foreach ($buckets as $i => [$price, $qty]) {
+            if ($units <= 0) {
+                break;
+            }
+            $take = min($qty, $units);
+            $units -= $take;
+            if ($take === $qty) {
+                unset($buckets[$i]);
+            } else {
+                $buckets[$i] = [$price, $qty - $take];
+            }
+        }
+
+        return array_values($buckets);
+    }
+}
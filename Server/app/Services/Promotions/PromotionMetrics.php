@@ -0,0 +1,267 @@
+<?php
+
+namespace App\Services\Promotions;
+
+use Illuminate\Database\Events\QueryExecuted;
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\DB;
+use Illuminate\Support\Facades\Log;
+
+/**
+ * Per-request instrumentation of promotion evaluation.
+ *
+ * PromotionMetricsMiddleware calls begin() before the promotion hot paths
+ * (quotes, cart deltas, checkout) and finish() after them. In between,
+ * PromotionEvaluator reports cart sizes, candidate and matched promotions
+ * and the time spent pricing each promotion type and buy X get Y scenario,
+ * and every query is counted and timed. finish() returns the request's
+ * numbers (sent as Server-Timing), adds them to the company's cached
+ * histograms (GET /promotions/metrics) and logs requests slower than
+ * promotions.metrics.slow_evaluation_ms. request_ms is the whole request
+ * as seen by the middleware, including validation and sale writes, not
+ * just the evaluator; the per-type timings are the evaluator's share.
+ *
+ * Nothing is recorded outside begin()/finish(), so evaluations from jobs,
+ * commands and benchmarks cost no more than a static flag check.
+ */
+class PromotionMetrics
+{
+    /** How long aggregated histograms are kept after their last update. */
+    private const TTL_SECONDS = 86400;
+
+
+    private static bool $active = false;
+    private static bool $listening = false;
+    private static int $startedAt = 0;
+    private static array $current = [];
+
+    public static function active(): bool
+    {
+        return self::$active;
+    }
+
+    /**
+     * Start recording the current request.
+     */
+    public static function begin(): void
+    {
+        if (!self::$listening) {
+            DB::listen(function (QueryExecuted $query) {
+                if (self::$active) {
+                    self::$current['queries']++;
+                    self::$current['query_ms'] += $query->time;
+                }
+            });
+            self::$listening = true;
+        }
+
+        self::$current = [
+            'carts' => 0,
+            'cart_lines' => 0,
+            'cart_units' => 0,
+            'candidates' => 0,
+            'matched' => 0,
+            'queries' => 0,
+            'query_ms' => 0.0,
+            'types' => [],
+        ];
+        self::$startedAt = hrtime(true);
+        self::$active = true;
+    }
+
+    /**
+     * Record one cart priced by the evaluator.
+     */
+    public static function recordCart(int $lines, int $units, int $candidates, int $matched): void
+    {
+        self::$current['carts']++;
+        self::$current['cart_lines'] += $lines;
+        self::$current['cart_units'] += $units;
+        self::$current['candidates'] += $candidates;
+        self::$current['matched'] += $matched;
+    }
+
+    /**
+     * Record the time spent pricing one promotion, keyed by type (and
+     * scenario for buy X get Y).
+     */
+    public static function recordPromotion(CompiledPromotion $promo, int $elapsedNs): void
+    {
+        $key = $promo->type === 'buy_x_get_y' ? 'buy_x_get_y.' . ($promo->scenario ?: 'none') : $promo->type;
+        $entry = self::$current['types'][$key] ?? ['count' => 0, 'ms' => 0.0];
+        $entry['count']++;
+        $entry['ms'] += $elapsedNs / 1e6;
+        self::$current['types'][$key] = $entry;
+    }
+
+    /**
+     * Stop recording and publish the request's numbers.
+     *
+     * @return array|null the request's metrics, or null when nothing was recording
+     */
+    public static function finish(?int $companyId, string $route): ?array
+    {
+        if (!self::$active) {
+            return null;
+        }
+        self::$active = false;
+
+        $metrics = self::$current + ['request_ms' => (hrtime(true) - self::$startedAt) / 1e6];
+        self::$current = [];
+
+        if ($companyId) {
+            self::aggregate($companyId, $route, $metrics);
+
+            if ($metrics['request_ms'] >= (float) config('promotions.metrics.slow_evaluation_ms', 250)) {
+                Log::warning('Slow promotion request', [
+                    'company_id' => $companyId,
+                    'route' => $route,
+                    'request_ms' => round($metrics['request_ms'], 2),
+                    'query_ms' => round($metrics['query_ms'], 2),
+                    'queries' => $metrics['queries'],
+                    'carts' => $metrics['carts'],
+                    'cart_lines' => $metrics['cart_lines'],
+                    'cart_units' => $metrics['cart_units'],
+                    'candidates' => $metrics['candidates'],
+                    'matched' => $metrics['matched'],
+                    'types' => $metrics['types'],
+                ]);
+            }
+        }
+
+        return $metrics;
+    }
+
+    /**
+     * Server-Timing header value for one request's metrics.
+     */
+    public static function serverTiming(array $metrics): string
+    {
+        $entries = [
+            sprintf('promo;dur=%.2f;desc="%d lines, %d candidates, %d matched"',
+                $metrics['request_ms'], $metrics['cart_lines'], $metrics['candidates'], $metrics['matched']),
+            sprintf('promo-db;dur=%.2f;desc="%d queries"', $metrics['query_ms'], $metrics['queries']),
+        ];
+        foreach ($metrics['types'] as $key => $entry) {
+            $entries[] = sprintf('promo-%s;dur=%.2f;desc="%d priced"', str_replace('.', '-', $key), $entry['ms'], $entry['count']);
+        }
+
+        return implode(', ', $entries);
+    }
+
+    /**
+     * Aggregated histograms for a company, per route.
+     */
+    public static function summary(int $companyId): array
+    {
+        $stored = Cache::get(self::cacheKey($companyId));
+
+        return [
+            'company_id' => $companyId,
+            'since' => $stored['since'] ?? null,
+            // Requests not counted because another one was aggregating
+            'dropped' => (int) Cache::get(self::cacheKey($companyId) . '_dropped', 0),
+            'buckets_ms' => self::buckets(),
+            'routes' => $stored['routes'] ?? [],
+        ];
+    }
+
+    public static function forget(int $companyId): void
+    {
+        Cache::forget(self::cacheKey($companyId));
+        Cache::forget(self::cacheKey($companyId) . '_dropped');
+    }
+
+    /**
+     * Add one request's numbers to the company's histograms. Requests of a
+     * company run in parallel, so the read-modify-write happens under a
+     * cache lock. The lock is never waited for: a request that finds it
+     * taken only bumps the dropped counter, so metrics never hold up the
+     * hot path they measure.
+     */
+    private static function aggregate(int $companyId, string $route, array $metrics): void
+    {
+        $key = self::cacheKey($companyId);
+
+        $added = Cache::lock("{$key}_lock", 5)->get(function () use ($key, $route, $metrics) {
+            self::add($key, $route, $metrics);
+
+            return true;
+        });
+
+        if (!$added) {
+            Cache::add("{$key}_dropped", 0, self::TTL_SECONDS);
+            Cache::increment("{$key}_dropped");
+        }
+    }
+
+    private static function add(string $key, string $route, array $metrics): void
+    {
+        $stored = Cache::get($key) ?: ['since' => now()->toIso8601String(), 'routes' => []];
+        $buckets = self::buckets();
+
+        $entry = $stored['routes'][$route] ?? [
+            'requests' => 0,
+            'slow' => 0,
+            'request_ms' => 0.0,
+            'max_ms' => 0.0,
+            'latency_histogram' => array_fill(0, count($buckets) + 1, 0),
+            'queries' => 0,
+            'query_ms' => 0.0,
+            'cart_lines' => 0,
+            'cart_units' => 0,
+            'candidates' => 0,
+            'matched' => 0,
+            'types' => [],
+        ];
+
+        $entry['requests']++;
+        if ($metrics['request_ms'] >= (float) config('promotions.metrics.slow_evaluation_ms', 250)) {
+            $entry['slow']++;
+        }
+        $entry['request_ms'] += $metrics['request_ms'];
+        $entry['max_ms'] = max($entry['max_ms'], $metrics['request_ms']);
+        $entry['latency_histogram'][self::bucketIndex($buckets, $metrics['request_ms'])]++;
+        foreach (['queries', 'query_ms', 'cart_lines', 'cart_units', 'candidates', 'matched'] as $field) {
+            $entry[$field] += $metrics[$field];
+        }
+        foreach ($metrics['types'] as $type => $timing) {
+            $entry['types'][$type]['count'] = ($entry['types'][$type]['count'] ?? 0) + $timing['count'];
+            $entry['types'][$type]['ms'] = ($entry['types'][$type]['ms'] ?? 0.0) + $timing['ms'];
+        }
+
+        $stored['routes'][$route] = $entry;
+        Cache::put($key, $stored, self::TTL_SECONDS);
+    }
+
+    /**
+     * Index of the first bucket whose upper bound holds the value; the last
+     * index counts everything above the largest bound.
+     */
+    private static function bucketIndex(array $buckets, float $ms): int
+    {
+        foreach ($buckets as $i => $upperBound) {
+            if ($ms <= $upperBound) {
+                return $i;
+            }
+        }
+
+        return count($buckets);
+    }
+
+    /**
+     * @return float[] histogram bucket upper bounds in ms, ascending
+     */
+    private static function buckets(): array
+    {
+        $buckets = array_map('floatval', (array) config('promotions.metrics.histogram_buckets_ms', [5, 10, 25, 50, 100, 250, 500, 1000]));
+        sort($buckets);
+
+        return $buckets;
+    }
+
+    private static function cacheKey(int $companyId): string
+    {
+        return "promotion_metrics_{$companyId}";
+    }
+}
@@ -0,0 +1,74 @@
+<?php
+
+namespace App\Services\Promotions;
+
+use App\Models\Product;
+use Illuminate\Support\Facades\Cache;
+
+/**
+ * Cached prices of the products given away by buy X get Y promotions, used
+ * to value free units that are not in the cart. Looked up with one query per
+ * rule set and kept until a product price changes (ProductController::update
+ * calls forget()).
+ */
+class PromotionPriceCache
+{
+    private const TTL_SECONDS = 3600;
+
+    /**
+     * Prices of the rule set's get products, keyed by product id.
+     *
+     * @return array<int, float>
+     */
+    public static function getProductPrices(PromotionRuleSet $ruleSet): array
+    {
+        $productIds = array_keys($ruleSet->getProductIds());
+        if (empty($productIds)) {
+            return [];
+        }
+        sort($productIds);
+
+        $version = self::version($ruleSet->companyId);
+        $cacheKey = "promotion_get_prices_{$ruleSet->companyId}_v{$version}_" . sha1(implode(',', $productIds));
+
+        return Cache::remember($cacheKey, self::TTL_SECONDS, function () use ($ruleSet, $productIds) {
+            return Product::whereIn('id', $productIds)
+                ->where('company_id', $ruleSet->companyId)
+                ->toBase()
+                ->pluck('price', 'id')
+                ->map(fn ($price) => (float) $price)
+                ->all();
+        });
+    }
+
+    /**
+     * Current price version; bumped every time a product price changes.
+     * Seeded randomly like PromotionRuleCache::version(), so an evicted
+     * counter never brings back old prices or an old snapshot ETag.
+     */
+    public static function version(int $companyId): int
+    {
+        $key = "promotion_prices_version_{$companyId}";
+
+        $version = Cache::get($key);
+        if ($version === null) {
+            Cache::add($key, random_int(1, PHP_INT_MAX >> 1));
+            $version = Cache::get($key);
+        }
+
+        return (int) $version;
+    }
+
+    /**
+     * Invalidate cached prices (call after changing a product price).
+     */
+    public static function forget(?int $companyId): void
+    {
+        if (!$companyId) {
+            return;
+        }
+
+        self::version($companyId);
+        Cache::increment("promotion_prices_version_{$companyId}");
+    }
+}
@@ -0,0 +1,73 @@
+<?php
+
+namespace App\Services\Promotions;
+
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Str;
+
+/**
+ * Short-lived discount quotes issued by calculateDiscount so checkout can
+ * reuse the POS result instead of evaluating promotions again.
+ *
+ * A quote is bound to the cart contents, the customer and the rule set and
+ * get-product price versions it was computed against, and can be redeemed
+ * once.
+ */
+class PromotionQuoteStore
+{
+    private const TTL_SECONDS = 300;
+
+    public static function issue(PromotionRuleSet $ruleSet, array $cartItems, $cartTotal, ?int $customerId, array $result): string
+    {
+        $quoteId = (string) Str::uuid();
+        $ttl = min(self::TTL_SECONDS, $ruleSet->expiresAt - now()->getTimestamp());
+
+        Cache::put("promotion_quote_{$quoteId}", [
+            'company_id' => $ruleSet->companyId,
+            'version' => $ruleSet->version,
+            'price_version' => PromotionPriceCache::version($ruleSet->companyId),
+            'cart_hash' => self::cartHash($cartItems, $customerId),
+            'cart_total' => round((float) $cartTotal, 2),
+            'result' => $result,
+        ], max(1, $ttl));
+
+        return $quoteId;
+    }
+
+    /**
+     * Redeem a quote for the submitted cart. Returns the quoted result, or
+     * null when the quote is unknown, expired, stale or for a different cart.
+     */
+    public static function redeem(?string $quoteId, int $companyId, array $cartItems, $cartTotal, ?int $customerId): ?array
+    {
+        if (!$quoteId) {
+            return null;
+        }
+
+        $quote = Cache::pull("promotion_quote_{$quoteId}");
+        if (!is_array($quote)) {
+            return null;
+        }
+
+        $matches = $quote['company_id'] === $companyId
+            && $quote['version'] === PromotionRuleCache::version($companyId)
+            && ($quote['price_version'] ?? null) === PromotionPriceCache::version($companyId)
+            && hash_equals($quote['cart_hash'], self::cartHash($cartItems, $customerId))
+            && abs($quote['cart_total'] - round((float) $cartTotal, 2)) < 0.005;
+
+        return $matches ? $quote['result'] : null;
+    }
+
+    /**
+     * Order-independent hash of the cart lines and customer.
+     */
+    public static function cartHash(array $cartItems, ?int $customerId): string
+    {
+        $lines = array_map(function ($item) {
+            return [(int) $item['product_id'], (float) $item['quantity'], round((float) $item['price'], 2)];
+        }, $cartItems);
+        sort($lines);
+
+        return hash('sha256', json_encode([$customerId ?: null, $lines]));
+    }
+}
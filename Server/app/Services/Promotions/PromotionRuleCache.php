@@ -0,0 +1,128 @@
+<?php
+
+namespace App\Services\Promotions;
+
+use App\Models\Promotion;
+use Illuminate\Database\Eloquent\Builder;
+use Illuminate\Database\Eloquent\Collection;
+use Illuminate\Support\Facades\Cache;
+
+class PromotionRuleCache
+{
+    /**
+     * Upper bound on how long an active set is kept when no promotion
+     * starts or ends sooner.
+     */
+    private const TTL_SECONDS = 3600;
+
+    /**
+     * Get the compiled rule set of a company's currently active promotions.
+     */
+    public static function forCompany(int $companyId): PromotionRuleSet
+    {
+        return self::activeSet($companyId)['rules'];
+    }
+
+    /**
+     * Get the company's currently active promotions, highest priority first.
+     * Same rows as Promotion::active(), served from cache.
+     */
+    public static function activePromotions(int $companyId): Collection
+    {
+        return self::activeSet($companyId)['promotions'];
+    }
+
+    /**
+     * Current rule set version; bumped every time a promotion is written.
+     *
+     * A missing counter (first use, or evicted from the cache) is seeded
+     * with a random value rather than 1, so a reset never lands on the
+     * version of a rule set still cached under an older key.
+     */
+    public static function version(int $companyId): int
+    {
+        $key = "promotion_rules_version_{$companyId}";
+
+        $version = Cache::get($key);
+        if ($version === null) {
+            Cache::add($key, random_int(1, PHP_INT_MAX >> 1));
+            $version = Cache::get($key);
+        }
+
+        return (int) $version;
+    }
+
+    /**
+     * Invalidate the cached active set (call after writing a promotion).
+     */
+    public static function forget(?int $companyId): void
+    {
+        if (!$companyId) {
+            return;
+        }
+
+        // Seed the counter if missing, then bump it atomically so concurrent
+        // invalidations never settle on the same version
+        self::version($companyId);
+        Cache::increment("promotion_rules_version_{$companyId}");
+    }
+
+    /**
+     * Query for a company's enabled promotions in evaluation order; served by
+     * the promotions_company_active_priority_index.
+     */
+    public static function enabledQuery(int $companyId): Builder
+    {
+        return Promotion::where('company_id', $companyId)
+            ->where('is_active', true)
+            ->orderBy('priority', 'desc')
+            ->orderBy('id');
+    }
+
+    /**
+     * Load the active set, caching it until the next start_date or end_date
+     * boundary among the company's enabled promotions so it expires exactly
+     * when the set can change.
+     */
+    private static function activeSet(int $companyId): array
+    {
+        $version = self::version($companyId);
+        $cacheKey = "promotion_rules_{$companyId}_v{$version}";
+
+        $cached = Cache::get($cacheKey);
+        if ($cached !== null) {
+            return $cached;
+        }
+
+        $now = now()->getTimestamp();
+        $expiresAt = $now + self::TTL_SECONDS;
+        $active = new Collection();
+        $rules = [];
+
+        $promotions = self::enabledQuery($companyId)->get();
+
+        foreach ($promotions as $promo) {
+            $rule = CompiledPromotion::fromModel($promo);
+
+            if ($rule->isLiveAt($now)) {
+                $active->push($promo);
+                $rules[] = $rule;
+            }
+            if ($rule->startsAt !== null && $rule->startsAt > $now) {
+                $expiresAt = min($expiresAt, $rule->startsAt);
+            }
+            if ($rule->endsAt !== null && $rule->endsAt >= $now) {
+                $expiresAt = min($expiresAt, $rule->endsAt + 1);
+            }
+        }
+
+        $set = [
+            'promotions' => $active,
+            'rules' => new PromotionRuleSet($companyId, $version, $rules, $expiresAt),
+        ];
+
+        Cache::put($cacheKey, $set, max(1, $expiresAt - $now));
+
+        return $set;
+    }
+}
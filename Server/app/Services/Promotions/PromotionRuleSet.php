@@ -0,0 +1,187 @@
+<?php
+
+namespace App\Services\Promotions;
+
+/**
+ * The compiled active promotions of one company, ordered by priority
+ * (highest first), with product and category indexes over their scopes.
+ */
+class PromotionRuleSet
+{
+    public int $companyId;
+    public int $version;
+
+    /** @var CompiledPromotion[] */
+    public array $promotions;
+
+    /**
+     * Unix timestamp of the next start_date/end_date boundary, after which
+     * the set may no longer be accurate.
+     */
+    public int $expiresAt;
+
+    /** @var array<int, int[]> product id => positions in $promotions */
+    private array $productIndex = [];
+
+    /** @var array<string, int[]> category => positions in $promotions */
+    private array $categoryIndex = [];
+
+    /** @var int[] positions of promotions that apply to every cart line */
+    private array $globalPositions = [];
+
+    /** @var array<int, int[]> buy/get product id => positions in $promotions */
+    private array $bxgyProductIndex = [];
+
+    /** @var int[] positions of promotions with a cart-wide minimum */
+    private array $minimumPositions = [];
+
+    /** @var array<int, true> get products of buy X get Y promotions */
+    private array $getProductIds = [];
+
+    public function __construct(int $companyId, int $version, array $promotions, int $expiresAt)
+    {
+        $this->companyId = $companyId;
+        $this->version = $version;
+        $this->promotions = array_values($promotions);
+        $this->expiresAt = $expiresAt;
+
+        foreach ($this->promotions as $position => $rule) {
+            if ($rule->scope === 'product') {
+                foreach (array_keys($rule->scopeProductIds) as $productId) {
+                    $this->productIndex[$productId][] = $position;
+                }
+            } elseif ($rule->scope === 'category') {
+                foreach (array_keys($rule->scopeCategories) as $category) {
+                    $this->categoryIndex[(string) $category][] = $position;
+                }
+            } else {
+                $this->globalPositions[] = $position;
+            }
+
+            foreach (array_keys($rule->buyProductSet + $rule->getProductSet) as $productId) {
+                $this->bxgyProductIndex[$productId][] = $position;
+            }
+            if ($rule->minimumPurchase !== null || $rule->minimumQuantity !== null) {
+                $this->minimumPositions[] = $position;
+            }
+            if ($rule->type === 'buy_x_get_y') {
+                $this->getProductIds += $rule->getProductSet;
+            }
+        }
+    }
+
+    /**
+     * Identifies this exact set: changes when a promotion is written or a
+     * start/end boundary passes. Part of the POS snapshot version.
+     */
+    public function snapshotVersion(): string
+    {
+        return "{$this->companyId}.{$this->version}.{$this->expiresAt}";
+    }
+
+    public function hasCategoryRules(): bool
+    {
+        return !empty($this->categoryIndex);
+    }
+
+    /**
+     * Products whose price may be needed to value free units.
+     *
+     * @return array<int, true>
+     */
+    public function getProductIds(): array
+    {
+        return $this->getProductIds;
+    }
+
+    /**
+     * Promotions whose scope touches any of the given products or categories,
+     * in priority order. Product/category scoped promotions with no match are
+     * never returned.
+     *
+     * @param int[] $productIds
+     * @param string[] $categories
+     * @return CompiledPromotion[]
+     */
+    public function candidatesFor(array $productIds, array $categories = []): array
+    {
+        return $this->atPositions($this->candidatePositions($productIds, $categories));
+    }
+
+    /**
+     * Promotions whose discount may change when lines of the given products
+     * (or categories) change: those the products' scope touches, those that
+     * buy or give the products, and those whose cart-wide minimum the change
+     * crosses. A minimum only gates the discount, so a promotion scoped away
+     * from the changed lines keeps its discount unless the cart total or
+     * quantity moves across one of its thresholds.
+     *
+     * @param int[] $productIds
+     * @param string[] $categories
+     * @param array{total: float, quantity: int} $before cart totals before the change
+     * @param array{total: float, quantity: int} $after cart totals after the change
+     * @return CompiledPromotion[]
+     */
+    public function affectedBy(array $productIds, array $categories, array $before, array $after): array
+    {
+        $positions = $this->candidatePositions($productIds, $categories);
+
+        foreach ($productIds as $productId) {
+            foreach ($this->bxgyProductIndex[(int) $productId] ?? [] as $position) {
+                $positions[$position] = true;
+            }
+        }
+
+        foreach ($this->minimumPositions as $position) {
+            if (!isset($positions[$position]) && self::crossesMinimum($this->promotions[$position], $before, $after)) {
+                $positions[$position] = true;
+            }
+        }
+
+        return $this->atPositions($positions);
+    }
+
+    private static function crossesMinimum(CompiledPromotion $rule, array $before, array $after): bool
+    {
+        if ($rule->minimumPurchase !== null
+            && ($before['total'] >= $rule->minimumPurchase) !== ($after['total'] >= $rule->minimumPurchase)) {
+            return true;
+        }
+
+        return $rule->minimumQuantity !== null
+            && ($before['quantity'] >= $rule->minimumQuantity) !== ($after['quantity'] >= $rule->minimumQuantity);
+    }
+
+    /**
+     * @return array<int, true>
+     */
+    private function candidatePositions(array $productIds, array $categories): array
+    {
+        $positions = array_fill_keys($this->globalPositions, true);
+
+        foreach ($productIds as $productId) {
+            foreach ($this->productIndex[(int) $productId] ?? [] as $position) {
+                $positions[$position] = true;
+            }
+        }
+        foreach ($categories as $category) {
+            foreach ($this->categoryIndex[(string) $category] ?? [] as $position) {
+                $positions[$position] = true;
+            }
+        }
+
+        return $positions;
+    }
+
+    /**
+     * @param array<int, true> $positions
+     * @return CompiledPromotion[]
+     */
+    private function atPositions(array $positions): array
+    {
+        $positions = array_keys($positions);
+        sort($positions);
+
+        return array_map(fn ($position) => $this->promotions[$position], $positions);
+    }
+}
@@ -20,6 +20,7 @@
         $middleware->alias([
             'role' => \App\Http\Middleware\RoleMiddleware::class,
             'feature' => \App\Http\Middleware\CheckFeature::class,
+            'promotion.metrics' => \App\Http\Middleware\PromotionMetricsMiddleware::class,
         ]);
 
         // Global request timing instrumentation for all routes.
@@ -0,0 +1,84 @@
+<?php
+
+return [
+
+    /*
+    |--------------------------------------------------------------------------
+    | Batch Evaluation
+    |--------------------------------------------------------------------------
+    |
+    | Maximum number of carts accepted by POST /promotions/calculate-discount/batch
+    | in a single request (offline POS replays, what-if pricing scripts).
+    |
+    */
+
+    'batch_max_carts' => (int) env('PROMOTIONS_BATCH_MAX_CARTS', 500),
+
+    /*
+    |--------------------------------------------------------------------------
+    | Backtests
+    |--------------------------------------------------------------------------
+    |
+    | A backtest splits the sales in its date range into at most this many
+    | id-range shards, each processed by its own queued job, reading sales
+    | in chunks of backtest_chunk_size.
+    |
+    */
+
+    'backtest_shards' => (int) env('PROMOTIONS_BACKTEST_SHARDS', 4),
+
+    'backtest_chunk_size' => (int) env('PROMOTIONS_BACKTEST_CHUNK_SIZE', 500),
+
+    /*
+    |--------------------------------------------------------------------------
+    | Combining Promotions
+    |--------------------------------------------------------------------------
+    |
+    | How the promotions that apply to a cart are combined:
+    |
+    | "priority_first"    - by priority, stopping at the first non-stackable one
+    | "best_for_customer" - the valid combination with the largest discount
+    |
+    | best_for_customer searches for at most solver_budget_ms per cart and
+    | then applies the best combination found so far.
+    |
+    */
+
+    'combination_policy' => env('PROMOTIONS_COMBINATION_POLICY', 'priority_first'),
+
+    'solver_budget_ms' => (float) env('PROMOTIONS_SOLVER_BUDGET_MS', 5),
+
+    /*
+    |--------------------------------------------------------------------------
+    | Benchmarks
+    |--------------------------------------------------------------------------
+    |
+    | promotions:benchmark (and PromotionBenchmarkTest, run with
+    | --group=benchmark) fail when a scenario's p95 latency or peak memory
+    | exceeds its stored baseline by more than this factor, when it issues
+    | more queries than the baseline, or when no baseline is recorded.
+    |
+    */
+
+    'benchmark_tolerance' => (float) env('PROMOTIONS_BENCHMARK_TOLERANCE', 1.5),
+
+    /*
+    |--------------------------------------------------------------------------
+    | Evaluation Metrics
+    |--------------------------------------------------------------------------
+    |
+    | When enabled, quotes, cart deltas and checkout record per-request
+    | promotion metrics (Server-Timing header) and per-company histograms,
+    | read through GET /promotions/metrics or promotions:metrics. Off by
+    | default: each request then also writes to the cache. Requests taking
+    | at least slow_evaluation_ms end to end are logged as warnings.
+    |
+    */
+
+    'metrics' => [
+        'enabled' => (bool) env('PROMOTIONS_METRICS_ENABLED', false),
+        'slow_evaluation_ms' => (float) env('PROMOTIONS_SLOW_EVALUATION_MS', 250),
+        'histogram_buckets_ms' => [5, 10, 25, 50, 100, 250, 500, 1000],
+    ],
+
+];
@@ -0,0 +1,29 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    public function up(): void
+    {
+        // Running (promotion, customer) => uses counters for per-customer limits.
+        // Backfill existing data with: php artisan promotions:backfill-customer-usage
+        Schema::create('promotion_customer_usage', function (Blueprint $table) {
+            $table->id();
+            $table->foreignId('promotion_id')->constrained()->cascadeOnDelete();
+            $table->foreignId('customer_id')->constrained()->cascadeOnDelete();
+            $table->unsignedInteger('uses')->default(0);
+            $table->timestamps();
+
+            $table->unique(['promotion_id', 'customer_id']);
+            $table->index('customer_id');
+        });
+    }
+
+    public function down(): void
+    {
+        Schema::dropIfExists('promotion_customer_usage');
+    }
+};
@@ -0,0 +1,51 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    /**
+     * Run the migrations.
+     */
+    public function up(): void
+    {
+        // Active set lookups: company + is_active, ordered by priority, with the
+        // date window checked from the index instead of the table rows.
+        Schema::table('promotions', function (Blueprint $table) {
+            $table->index(
+                ['company_id', 'is_active', 'priority', 'start_date', 'end_date'],
+                'promotions_company_active_priority_index'
+            );
+        });
+
+        Schema::table('promotion_usage', function (Blueprint $table) {
+            // Reports: usage of a promotion within a created_at range
+            $table->index(['promotion_id', 'created_at'], 'promotion_usage_promotion_created_index');
+            // Per-customer history of a promotion
+            $table->index(['customer_id', 'promotion_id'], 'promotion_usage_customer_promotion_index');
+        });
+    }
+
+    public function down(): void
+    {
+        Schema::table('promotion_usage', function (Blueprint $table) {
+            // MySQL may have dropped the implicit foreign key indexes in favour of
+            // the composite ones; put single-column indexes back before removing them.
+            if (Schema::getConnection()->getDriverName() === 'mysql') {
+                $table->index('promotion_id');
+                $table->index('customer_id');
+            }
+            $table->dropIndex('promotion_usage_promotion_created_index');
+            $table->dropIndex('promotion_usage_customer_promotion_index');
+        });
+
+        Schema::table('promotions', function (Blueprint $table) {
+            if (Schema::getConnection()->getDriverName() === 'mysql') {
+                $table->index('company_id');
+            }
+            $table->dropIndex('promotions_company_active_priority_index');
+        });
+    }
+};
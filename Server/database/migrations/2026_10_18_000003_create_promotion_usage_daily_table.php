@@ -0,0 +1,30 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    public function up(): void
+    {
+        // Per-promotion daily totals kept up to date at sale time for reports.
+        // Backfill existing data with: php artisan promotions:backfill-usage-daily
+        Schema::create('promotion_usage_daily', function (Blueprint $table) {
+            $table->id();
+            $table->foreignId('promotion_id')->constrained()->cascadeOnDelete();
+            $table->date('day');
+            $table->unsignedInteger('uses')->default(0);
+            $table->decimal('discount', 14, 2)->default(0);
+            $table->timestamps();
+
+            $table->unique(['promotion_id', 'day']);
+            $table->index('day');
+        });
+    }
+
+    public function down(): void
+    {
+        Schema::dropIfExists('promotion_usage_daily');
+    }
+};
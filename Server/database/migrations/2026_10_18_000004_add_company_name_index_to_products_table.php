@@ -0,0 +1,30 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    /**
+     * Run the migrations.
+     */
+    public function up(): void
+    {
+        // Serves prefix searches on product name within a company (product pickers)
+        Schema::table('products', function (Blueprint $table) {
+            $table->index(['company_id', 'name'], 'products_company_name_index');
+        });
+    }
+
+    public function down(): void
+    {
+        Schema::table('products', function (Blueprint $table) {
+            // MySQL may have dropped the implicit company_id foreign key index in favour of this one
+            if (Schema::getConnection()->getDriverName() === 'mysql') {
+                $table->index('company_id');
+            }
+            $table->dropIndex('products_company_name_index');
+        });
+    }
+};
@@ -0,0 +1,48 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    public function up(): void
+    {
+        // A draft promotion replayed over a range of past sales
+        Schema::create('promotion_backtests', function (Blueprint $table) {
+            $table->id();
+            $table->foreignId('company_id')->constrained()->cascadeOnDelete();
+            $table->foreignId('created_by')->constrained('users')->cascadeOnDelete();
+            $table->json('promotion'); // Draft promotion attributes from the form
+            $table->date('start_date');
+            $table->date('end_date');
+            $table->string('status', 20)->default('pending'); // pending, processing, completed, failed
+            $table->unsignedInteger('total_sales')->default(0);
+            $table->timestamp('completed_at')->nullable();
+            $table->timestamps();
+
+            $table->index(['company_id', 'created_at']);
+        });
+
+        // One row per worker: a contiguous sale id range and its partial results
+        Schema::create('promotion_backtest_shards', function (Blueprint $table) {
+            $table->id();
+            $table->foreignId('promotion_backtest_id')->constrained()->cascadeOnDelete();
+            $table->unsignedBigInteger('from_sale_id');
+            $table->unsignedBigInteger('to_sale_id');
+            $table->string('status', 20)->default('pending'); // pending, processing, completed, failed
+            $table->unsignedInteger('processed_sales')->default(0);
+            $table->unsignedInteger('redemptions')->default(0);
+            $table->decimal('total_discount', 14, 2)->default(0);
+            $table->json('products')->nullable(); // product id => [sales, units]
+            $table->text('error')->nullable();
+            $table->timestamps();
+        });
+    }
+
+    public function down(): void
+    {
+        Schema::dropIfExists('promotion_backtest_shards');
+        Schema::dropIfExists('promotion_backtests');
+    }
+};
@@ -0,0 +1,28 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    /**
+     * Run the migrations.
+     */
+    public function up(): void
+    {
+        // Serves prefix searches on SKU within a company (product pickers). The
+        // (company_id, warehouse_id, sku) unique index cannot, as warehouse_id
+        // sits between the two.
+        Schema::table('products', function (Blueprint $table) {
+            $table->index(['company_id', 'sku'], 'products_company_sku_index');
+        });
+    }
+
+    public function down(): void
+    {
+        Schema::table('products', function (Blueprint $table) {
+            $table->dropIndex('products_company_sku_index');
+        });
+    }
+};
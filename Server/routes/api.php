@@ -49,7 +49,7 @@
     
     // Sales (auth required + sales feature)
     Route::middleware(['auth:sanctum', 'feature:sales'])->group(function () {
-        Route::apiResource('sales', SaleController::class);
+        Route::apiResource('sales', SaleController::class)->middlewareFor('store', 'promotion.metrics:sale');
         Route::get('sales/stats/dashboard', [SaleController::class, 'getDashboardStats']);
     });
     
@@ -2,9 +2,13 @@
 
 use App\Models\Company;
 use App\Services\PriceGroupService;
+use App\Services\Promotions\PromotionBenchmark;
+use App\Services\Promotions\PromotionMetrics;
 use App\Services\SubscriptionPlanService;
 use Illuminate\Foundation\Inspiring;
 use Illuminate\Support\Facades\Artisan;
+use Illuminate\Support\Facades\Cache;
+use Illuminate\Support\Facades\DB;
 
 Artisan::command('inspire', function () {
     $this->comment(Inspiring::quote());
@@ -53,3 +57,143 @@
 
     $this->info("Completed. Processed {$processed} companies; assigned Starter Essentials to {$assigned} compan" . ($assigned === 1 ? 'y' : 'ies') . '.');
 })->purpose('Assign Starter Essentials subscription to existing companies with no subscription');
+
+Artisan::command('promotions:backfill-customer-usage', function () {
+    $this->info('Rebuilding per-customer promotion usage counters from promotion_usage...');
+
+    $now = now();
+
+    DB::transaction(function () use ($now) {
+        DB::table('promotion_customer_usage')->delete();
+
+        DB::table('promotion_customer_usage')->insertUsing(
+            ['promotion_id', 'customer_id', 'uses', 'created_at', 'updated_at'],
+            DB::table('promotion_usage')
+                ->join('customers', 'customers.id', '=', 'promotion_usage.customer_id')
+                ->selectRaw('promotion_usage.promotion_id, promotion_usage.customer_id, COUNT(*), ?, ?', [$now, $now])
+                ->groupBy('promotion_usage.promotion_id', 'promotion_usage.customer_id')
+        );
+    });
+
+    $counters = DB::table('promotion_customer_usage')->count();
+
+    $this->info("Completed. Rebuilt {$counters} customer usage counter" . ($counters === 1 ? '' : 's') . '.');
+})->purpose('Rebuild promotion_customer_usage counters from recorded promotion usage');
+
+Artisan::command('promotions:backfill-usage-daily', function () {
+    $this->info('Rebuilding the promotion_usage_daily rollup from promotion_usage...');
+
+    $now = now();
+    $day = 'DATE(COALESCE(promotion_usage.created_at, promotion_usage.used_at))';
+
+    DB::transaction(function () use ($now, $day) {
+        DB::table('promotion_usage_daily')->delete();
+
+        DB::table('promotion_usage_daily')->insertUsing(
+            ['promotion_id', 'day', 'uses', 'discount', 'created_at', 'updated_at'],
+            DB::table('promotion_usage')
+                ->selectRaw("promotion_usage.promotion_id, {$day}, COUNT(*), COALESCE(SUM(promotion_usage.discount_amount), 0), ?, ?", [$now, $now])
+                ->groupBy('promotion_usage.promotion_id', DB::raw($day))
+        );
+    });
+
+    $rows = DB::table('promotion_usage_daily')->count();
+
+    $this->info("Completed. Rebuilt {$rows} daily rollup row" . ($rows === 1 ? '' : 's') . '.');
+})->purpose('Rebuild promotion_usage_daily totals from recorded promotion usage');
+
+Artisan::command('promotions:benchmark {--iterations=30} {--save-baseline} {--tolerance=}', function () {
+    // Run against a throwaway in-memory SQLite database and cache
+    config(['database.connections.promotions_benchmark' => [
+        'driver' => 'sqlite',
+        'database' => ':memory:',
+        'prefix' => '',
+        'foreign_key_constraints' => true,
+    ]]);
+    DB::setDefaultConnection('promotions_benchmark');
+    Cache::setDefaultDriver('array');
+
+    $this->info('Seeding synthetic promotion catalogue...');
+    Artisan::call('migrate', ['--database' => 'promotions_benchmark', '--force' => true]);
+
+    $benchmark = new PromotionBenchmark((int) $this->option('iterations'));
+    $benchmark->seed();
+    $results = $benchmark->run(fn ($name) => $this->line("  running {$name}"));
+
+    $this->table(
+        ['Scenario', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms', 'peak MB', 'queries'],
+        collect($results)->map(fn ($r, $name) => [$name, $r['p50_ms'], $r['p95_ms'], $r['p99_ms'], $r['max_ms'], $r['peak_memory_mb'], $r['queries']])->values()->all()
+    );
+
+    if ($this->option('save-baseline')) {
+        PromotionBenchmark::saveBaselines($results);
+        $this->info('Baselines saved to ' . PromotionBenchmark::baselinePath());
+        return 0;
+    }
+
+    $overBudget = PromotionBenchmark::overQueryBudget($results);
+    foreach ($overBudget as $message) {
+        $this->error($message);
+    }
+
+    $baselines = PromotionBenchmark::loadBaselines();
+    if (empty($baselines)) {
+        $this->error('No baselines recorded at ' . PromotionBenchmark::baselinePath() . '; run with --save-baseline on the reference machine.');
+        return 1;
+    }
+
+    $tolerance = (float) ($this->option('tolerance') ?: config('promotions.benchmark_tolerance', 1.5));
+    $regressions = PromotionBenchmark::compare($results, $baselines, $tolerance);
+    foreach ($regressions as $regression) {
+        $this->error($regression);
+    }
+    if (!empty($regressions) || !empty($overBudget)) {
+        return 1;
+    }
+
+    $this->info('No regressions against the stored baselines.');
+    return 0;
+})->purpose('Benchmark the promotion engine and compare against stored baselines');
+
+Artisan::command('promotions:metrics {--company= : Only this company} {--limit=20}', function () {
+    $rows = [];
+
+    $query = Company::query()->select(['id', 'name'])->orderBy('id');
+    if ($this->option('company')) {
+        $query->where('id', (int) $this->option('company'));
+    }
+
+    $query->chunkById(100, function ($companies) use (&$rows) {
+        foreach ($companies as $company) {
+            foreach (PromotionMetrics::summary((int) $company->id)['routes'] as $route => $entry) {
+                $rows[] = [
+                    $company->id,
+                    $company->name,
+                    $route,
+                    $entry['requests'],
+                    $entry['slow'],
+                    round($entry['request_ms'] / max(1, $entry['requests']), 2),
+                    round($entry['max_ms'], 2),
+                    round($entry['queries'] / max(1, $entry['requests']), 1),
+                    round($entry['cart_lines'] / max(1, $entry['requests']), 1),
+                    round($entry['candidates'] / max(1, $entry['requests']), 1),
+                ];
+            }
+        }
+    });
+
+    if (empty($rows)) {
+        $this->info('No promotion metrics recorded yet.');
+        return 0;
+    }
+
+    // Slowest tenants and routes first
+    usort($rows, fn ($a, $b) => $b[5] <=> $a[5]);
+
+    $this->table(
+        ['Company', 'Name', 'Route', 'Requests', 'Slow', 'Avg request ms', 'Max ms', 'Avg queries', 'Avg lines', 'Avg candidates'],
+        array_slice($rows, 0, max(1, (int) $this->option('limit')))
+    );
+
+    return 0;
+})->purpose('List the slowest promotion evaluation routes per company');
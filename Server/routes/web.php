@@ -351,6 +351,7 @@
 Route::get('/products/out-of-stock', [ProductController::class, 'getOutOfStockProducts']);
 Route::get('/products/low-stock', [ProductController::class, 'getLowStockProducts']);
 Route::get('/products/csv-template', [ProductController::class, 'downloadCSVTemplate']);
+Route::middleware('auth:sanctum')->get('/products/search', [ProductController::class, 'search']);
 Route::get('/products/{id}', [ProductController::class, 'show']);
 
 // DASHBOARD STATS - Add this missing endpoint
@@ -379,7 +380,16 @@
     Route::get('/promotions', [\App\Http\Controllers\PromotionController::class, 'index']);
     Route::post('/promotions', [\App\Http\Controllers\PromotionController::class, 'store']);
     Route::get('/promotions/active', [\App\Http\Controllers\PromotionController::class, 'getActivePromotions']);
-    Route::post('/promotions/calculate-discount', [\App\Http\Controllers\PromotionController::class, 'calculateDiscount']);
+    Route::get('/promotions/snapshot', [\App\Http\Controllers\PromotionController::class, 'snapshot']);
+    Route::get('/promotions/metrics', [\App\Http\Controllers\PromotionController::class, 'metrics']);
+    Route::post('/promotions/calculate-discount', [\App\Http\Controllers\PromotionController::class, 'calculateDiscount'])->middleware('promotion.metrics:calculate_discount');
+    Route::post('/promotions/calculate-discount/batch', [\App\Http\Controllers\PromotionController::class, 'calculateDiscountBatch'])->middleware('promotion.metrics:calculate_discount_batch');
+    Route::post('/promotions/carts', [\App\Http\Controllers\PromotionCartController::class, 'store']);
+    Route::get('/promotions/carts/{id}', [\App\Http\Controllers\PromotionCartController::class, 'show']);
+    Route::post('/promotions/carts/{id}/deltas', [\App\Http\Controllers\PromotionCartController::class, 'applyDeltas'])->middleware('promotion.metrics:cart_deltas');
+    Route::delete('/promotions/carts/{id}', [\App\Http\Controllers\PromotionCartController::class, 'destroy']);
+    Route::post('/promotions/backtests', [\App\Http\Controllers\PromotionBacktestController::class, 'store']);
+    Route::get('/promotions/backtests/{id}', [\App\Http\Controllers\PromotionBacktestController::class, 'show']);
     Route::get('/promotions/{id}', [\App\Http\Controllers\PromotionController::class, 'show']);
     Route::put('/promotions/{id}', [\App\Http\Controllers\PromotionController::class, 'update']);
     Route::delete('/promotions/{id}', [\App\Http\Controllers\PromotionController::class, 'destroy']);
@@ -741,7 +751,7 @@
 
     // Sales CRUD (without /api prefix)
     Route::get('/sales', [SaleController::class, 'index']);
-    Route::post('/sales', [SaleController::class, 'store']);
+    Route::post('/sales', [SaleController::class, 'store'])->middleware('promotion.metrics:sale');
     Route::get('/sales/{id}', [SaleController::class, 'show']);
     Route::put('/sales/{id}', [SaleController::class, 'update']);
     Route::delete('/sales/{id}', [SaleController::class, 'destroy']);
@@ -0,0 +1,80 @@
+<?php
+
+namespace Tests\Concerns;
+
+use App\Models\Promotion;
+use App\Models\User;
+use Illuminate\Support\Facades\DB;
+
+/**
+ * Minimal company, user, product, customer and promotion rows for the
+ * promotion feature tests.
+ */
+trait PromotionFixtures
+{
+    protected int $companyId;
+    protected User $user;
+
+    protected function createCompanyAndUser(): void
+    {
+        $now = now();
+        $this->companyId = DB::table('companies')->insertGetId([
+            'name' => 'Promo Test Co',
+            'email' => 'promo-' . uniqid() . '@example.test',
+            'created_at' => $now,
+            'updated_at' => $now,
+        ]);
+
+        $this->user = User::factory()->create(['company_id' => $this->companyId]);
+    }
+
+    protected function createProduct(float $price, array $attributes = []): int
+    {
+        $now = now();
+
+        return DB::table('products')->insertGetId($attributes + [
+            'name' => 'Product ' . uniqid(),
+            'price' => $price,
+            'stock_quantity' => 1000,
+            'company_id' => $this->companyId,
+            'created_at' => $now,
+            'updated_at' => $now,
+        ]);
+    }
+
+    protected function createCustomer(array $attributes = []): int
+    {
+        $now = now();
+
+        return DB::table('customers')->insertGetId($attributes + [
+            'name' => 'Customer ' . uniqid(),
+            'company_id' => $this->companyId,
+            'created_by' => $this->user->id,
+            'created_at' => $now,
+            'updated_at' => $now,
+        ]);
+    }
+
+    protected function createPromotion(array $attributes = []): Promotion
+    {
+        return Promotion::create($attributes + [
+            'name' => 'Promo ' . uniqid(),
+            'type' => 'percentage',
+            'discount_value' => 10,
+            'scope' => 'all',
+            'is_active' => true,
+            'priority' => 0,
+            'is_stackable' => false,
+            'company_id' => $this->companyId,
+            'created_by' => $this->user->id,
+        ]);
+    }
+
+    /**
+     * Cart line in the shape calculateDiscount and the evaluator take.
+     */
+    protected function line(int $productId, int $quantity, float $price): array
+    {
+        return ['product_id' => $productId, 'quantity' => $quantity, 'price' => $price];
+    }
+}
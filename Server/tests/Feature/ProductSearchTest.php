@@ -0,0 +1,74 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Tests\Concerns\PromotionFixtures;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Illuminate\Support\Facades\DB;
+
+class ProductSearchTest extends TestCase
+{
+    use RefreshDatabase, PromotionFixtures;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->artisan('migrate');
+        $this->createCompanyAndUser();
+        $this->actingAs($this->user, 'sanctum');
+    }
+
+    private function names(string $query): array
+    {
+        return array_column($this->getJson('/products/search?' . $query)->assertOk()->json(), 'name');
+    }
+
+    public function test_matches_name_or_sku_prefix_sorted_by_name()
+    {
+        $this->createProduct(10, ['name' => 'Cola 500ml', 'sku' => 'DRK-001']);
+        $this->createProduct(10, ['name' => 'Diet Cola', 'sku' => 'COL-002']);
+        $this->createProduct(10, ['name' => 'Coffee', 'sku' => 'HOT-003']);
+        $this->createProduct(10, ['name' => 'Bread', 'sku' => 'BAK-004']);
+
+        $this->assertSame(['Coffee', 'Cola 500ml', 'Diet Cola'], $this->names('q=co'));
+        $this->assertSame(['Cola 500ml'], $this->names('q=drk'));
+        $this->assertSame([], $this->names('q=ola'));
+    }
+
+    public function test_product_matching_both_columns_is_listed_once()
+    {
+        $this->createProduct(10, ['name' => 'Salt', 'sku' => 'SALT-1']);
+
+        $this->assertSame(['Salt'], $this->names('q=sal'));
+    }
+
+    public function test_limit_applies_to_the_merged_results()
+    {
+        foreach (['Tea A', 'Tea B', 'Tea C'] as $i => $name) {
+            $this->createProduct(10, ['name' => $name, 'sku' => "X-{$i}"]);
+        }
+        foreach (['Apple', 'Banana'] as $i => $name) {
+            $this->createProduct(10, ['name' => $name, 'sku' => "TEA-{$i}"]);
+        }
+
+        $this->assertSame(['Apple', 'Banana', 'Tea A'], $this->names('q=tea&limit=3'));
+    }
+
+    public function test_only_the_users_company_products_are_returned()
+    {
+        $mine = $this->createProduct(10, ['name' => 'Milk', 'sku' => 'M-1']);
+        $otherCompanyId = DB::table('companies')->insertGetId(['name' => 'Other', 'email' => 'other@example.test']);
+        $theirs = $this->createProduct(10, ['name' => 'Milk Powder', 'sku' => 'M-2', 'company_id' => $otherCompanyId]);
+
+        $this->assertSame(['Milk'], $this->names('q=mil'));
+        $this->assertSame(['Milk'], $this->names(http_build_query(['ids' => [$mine, $theirs]])));
+    }
+
+    public function test_blank_query_returns_nothing()
+    {
+        $this->createProduct(10, ['name' => 'Rice']);
+
+        $this->assertSame([], $this->names('q=%20'));
+    }
+}
@@ -0,0 +1,142 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Tests\Concerns\PromotionFixtures;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Illuminate\Support\Facades\DB;
+use App\Jobs\Promotions\RunPromotionBacktestShardJob;
+use App\Models\PromotionBacktest;
+
+class PromotionBacktestTest extends TestCase
+{
+    use RefreshDatabase, PromotionFixtures;
+
+    private int $crate;
+    private int $bottle;
+    private int $bread;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->artisan('migrate');
+        $this->createCompanyAndUser();
+        $this->actingAs($this->user, 'sanctum');
+
+        $this->crate = $this->createProduct(50.0, ['name' => 'Soda crate']);
+        $this->bottle = $this->createProduct(5.0, ['name' => 'Empty crate']);
+        $this->bread = $this->createProduct(10.0, ['name' => 'Bread']);
+        DB::table('product_empties')->insert([
+            'product_id' => $this->crate,
+            'empty_product_id' => $this->bottle,
+            'quantity' => 1,
+            'deposit_amount' => 5.0,
+            'is_active' => true,
+        ]);
+
+        config(['promotions.backtest_shards' => 3, 'promotions.backtest_chunk_size' => 2]);
+    }
+
+    private function sale(string $at, array $lines): int
+    {
+        $saleId = DB::table('sales')->insertGetId([
+            'total' => 0,
+            'company_id' => $this->companyId,
+            'created_at' => $at,
+            'updated_at' => $at,
+        ]);
+        foreach ($lines as [$productId, $quantity, $price]) {
+            DB::table('sale_items')->insert([
+                'sale_id' => $saleId,
+                'product_id' => $productId,
+                'quantity' => $quantity,
+                'unit_price' => $price,
+                'total_price' => $quantity * $price,
+            ]);
+        }
+
+        return $saleId;
+    }
+
+    private function startBacktest()
+    {
+        return $this->postJson('/promotions/backtests', [
+            'start_date' => '2026-10-01',
+            'end_date' => '2026-10-10',
+            'promotion' => ['type' => 'percentage', 'discount_value' => 10, 'scope' => 'all'],
+        ]);
+    }
+
+    public function test_sales_are_split_into_shards_and_results_summed()
+    {
+        // With the auto-added empties line
+        $this->sale('2026-10-01 09:00:00', [[$this->crate, 2, 50.0], [$this->bottle, 2, 5.0]]);
+        $this->sale('2026-10-02 09:00:00', [[$this->crate, 1, 50.0]]);
+        // Outside the date range but inside the id range
+        $this->sale('2026-09-15 09:00:00', [[$this->crate, 10, 50.0]]);
+        $this->sale('2026-10-05 09:00:00', [[$this->bread, 4, 10.0]]);
+        // An empty sold on its own is a real line
+        $this->sale('2026-10-08 09:00:00', [[$this->bottle, 3, 5.0]]);
+        $last = $this->sale('2026-10-10 23:00:00', [[$this->crate, 1, 50.0]]);
+
+        $response = $this->startBacktest()->assertStatus(202);
+
+        $backtest = PromotionBacktest::findOrFail($response->json('id'));
+        $shards = $backtest->shards()->orderBy('from_sale_id')->get();
+        $this->assertCount(3, $shards);
+        $this->assertSame($last - 5, (int) $shards->first()->from_sale_id);
+        $this->assertSame($last, (int) $shards->last()->to_sale_id);
+        foreach ($shards->slice(1)->values() as $i => $shard) {
+            $this->assertSame((int) $shards[$i]->to_sale_id + 1, (int) $shard->from_sale_id);
+        }
+        $this->assertSame(['completed'], $shards->pluck('status')->unique()->values()->all());
+
+        $summary = $this->getJson("/promotions/backtests/{$backtest->id}")->assertOk();
+        $summary->assertJsonPath('status', 'completed')
+            ->assertJsonPath('total_sales', 5)
+            ->assertJsonPath('processed_sales', 5)
+            ->assertJsonPath('redemptions', 5)
+            ->assertJsonPath('affected_product_count', 3);
+        $this->assertEquals(100.0, $summary->json('progress'));
+        $this->assertEquals(25.5, $summary->json('total_discount'));
+
+        $products = collect($summary->json('affected_products'))->keyBy('product_id');
+        $this->assertEquals([3, 4], [$products[$this->crate]['sales'], $products[$this->crate]['units']]);
+        $this->assertEquals([1, 3], [$products[$this->bottle]['sales'], $products[$this->bottle]['units']]);
+        $this->assertEquals([1, 4], [$products[$this->bread]['sales'], $products[$this->bread]['units']]);
+    }
+
+    public function test_range_without_sales_completes_immediately()
+    {
+        $this->startBacktest()
+            ->assertStatus(202)
+            ->assertJsonPath('status', 'completed')
+            ->assertJsonPath('total_sales', 0);
+
+        $this->assertSame(0, DB::table('promotion_backtest_shards')->count());
+    }
+
+    public function test_failed_shard_fails_the_backtest()
+    {
+        $backtest = PromotionBacktest::create([
+            'company_id' => $this->companyId,
+            'created_by' => $this->user->id,
+            'promotion' => ['type' => 'percentage', 'discount_value' => 10, 'scope' => 'all'],
+            'start_date' => '2026-10-01',
+            'end_date' => '2026-10-10',
+            'status' => 'processing',
+            'total_sales' => 10,
+        ]);
+        $failing = $backtest->shards()->create(['from_sale_id' => 1, 'to_sale_id' => 5, 'status' => 'processing']);
+        $backtest->shards()->create(['from_sale_id' => 6, 'to_sale_id' => 10, 'status' => 'completed']);
+
+        (new RunPromotionBacktestShardJob($failing))->failed(new \RuntimeException('Job has timed out.'));
+
+        $this->assertSame('failed', $failing->fresh()->status);
+        $summary = $backtest->fresh()->summary();
+        $this->assertSame('failed', $summary['status']);
+        $this->assertSame(['Job has timed out.'], $summary['errors']->all());
+        $this->assertNotNull($summary['completed_at']);
+    }
+}
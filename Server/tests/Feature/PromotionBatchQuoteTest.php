@@ -0,0 +1,69 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Tests\Concerns\PromotionFixtures;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+
+class PromotionBatchQuoteTest extends TestCase
+{
+    use RefreshDatabase, PromotionFixtures;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->artisan('migrate');
+        $this->createCompanyAndUser();
+        $this->actingAs($this->user, 'sanctum');
+        $this->createPromotion(['discount_value' => 10, 'minimum_purchase' => 50]);
+
+        config(['promotions.batch_max_carts' => 3]);
+    }
+
+    private function cart(float $price, ?string $ref = null): array
+    {
+        return array_filter([
+            'ref' => $ref,
+            'cart_total' => $price * 2,
+            'cart_items' => [$this->line(1, 2, $price)],
+        ], fn ($value) => $value !== null);
+    }
+
+    public function test_batch_quotes_each_cart_like_the_single_endpoint()
+    {
+        $carts = [$this->cart(40, 'till-1'), $this->cart(10), $this->cart(100, 'till-3')];
+
+        $results = $this->postJson('/promotions/calculate-discount/batch', ['carts' => $carts])
+            ->assertOk()
+            ->json('results');
+
+        $this->assertSame(['till-1', '1', 'till-3'], array_column($results, 'ref'));
+        foreach ($carts as $i => $cart) {
+            $single = $this->postJson('/promotions/calculate-discount', $cart)->assertOk();
+            $this->assertEquals($single->json('total_discount'), $results[$i]['total_discount']);
+            $this->assertEquals($single->json('applicable_promotions'), $results[$i]['applicable_promotions']);
+        }
+        $this->assertEquals([8.0, 0.0, 20.0], array_column($results, 'total_discount'));
+    }
+
+    public function test_batch_larger_than_the_limit_is_rejected()
+    {
+        $carts = array_fill(0, 4, $this->cart(40));
+
+        $this->postJson('/promotions/calculate-discount/batch', ['carts' => $carts])
+            ->assertStatus(422)
+            ->assertJsonValidationErrors('carts');
+
+        $this->postJson('/promotions/calculate-discount/batch', ['carts' => array_slice($carts, 0, 3)])
+            ->assertOk()
+            ->assertJsonCount(3, 'results');
+    }
+
+    public function test_empty_batch_is_rejected()
+    {
+        $this->postJson('/promotions/calculate-discount/batch', ['carts' => []])
+            ->assertStatus(422)
+            ->assertJsonValidationErrors('carts');
+    }
+}
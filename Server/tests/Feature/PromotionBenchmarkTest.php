@@ -0,0 +1,44 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use PHPUnit\Framework\Attributes\Group;
+use App\Services\Promotions\PromotionBenchmark;
+
+/**
+ * Runs the promotion micro-benchmarks on SQLite. Excluded from the default
+ * run by phpunit.xml; run with `php artisan test --group=benchmark`.
+ * Queries per call are held to PromotionBenchmark::QUERY_BUDGETS, and
+ * latency and memory to tests/Benchmarks/promotion_baselines.json, which
+ * must be recorded on the reference machine with
+ * `php artisan promotions:benchmark --save-baseline`.
+ */
+#[Group('benchmark')]
+class PromotionBenchmarkTest extends TestCase
+{
+    use RefreshDatabase;
+
+    public function test_promotion_hot_path_stays_within_query_budgets_and_baselines()
+    {
+        $benchmark = new PromotionBenchmark(10);
+        $benchmark->seed();
+        $results = $benchmark->run();
+
+        $this->assertSame(array_keys(PromotionBenchmark::QUERY_BUDGETS), array_keys($results));
+        foreach ($results as $name => $result) {
+            $this->assertGreaterThan(0, $result['max_ms'], "{$name} did not run");
+        }
+
+        $overBudget = PromotionBenchmark::overQueryBudget($results);
+        $this->assertSame([], $overBudget, implode("\n", $overBudget));
+
+        $baselines = PromotionBenchmark::loadBaselines();
+        $this->assertNotEmpty($baselines, 'No promotion benchmark baselines recorded at ' . PromotionBenchmark::baselinePath()
+            . '; run promotions:benchmark --save-baseline on the reference machine and commit the file.');
+
+        $regressions = PromotionBenchmark::compare($results, $baselines, (float) config('promotions.benchmark_tolerance', 1.5));
+
+        $this->assertSame([], $regressions, implode("\n", $regressions));
+    }
+}
@@ -0,0 +1,82 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Tests\Concerns\PromotionFixtures;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use App\Services\Promotions\PromotionCartSession;
+
+class PromotionCartSessionTest extends TestCase
+{
+    use RefreshDatabase, PromotionFixtures;
+
+    private int $shirt;
+    private int $socks;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->artisan('migrate');
+        $this->createCompanyAndUser();
+
+        $this->shirt = $this->createProduct(30.0);
+        $this->socks = $this->createProduct(5.0);
+        // Scoped to shirts but gated on the whole cart
+        $this->createPromotion(['scope' => 'product', 'scope_items' => [$this->shirt], 'minimum_purchase' => 50, 'is_stackable' => true]);
+        $this->createPromotion(['scope' => 'product', 'scope_items' => [$this->shirt], 'minimum_quantity' => 4, 'is_stackable' => true, 'discount_value' => 5]);
+        $this->createPromotion(['scope' => 'product', 'scope_items' => [$this->socks], 'minimum_purchase' => 1, 'is_stackable' => true, 'discount_value' => 20]);
+    }
+
+    /**
+     * Discounts a full re-evaluation of the same lines gives.
+     */
+    private function recomputed(PromotionCartSession $session): array
+    {
+        $fresh = clone $session;
+        $fresh->recompute();
+
+        return $fresh->discounts;
+    }
+
+    public function test_deltas_on_other_products_reprice_promotions_whose_minimum_they_cross()
+    {
+        $session = PromotionCartSession::create($this->companyId, [
+            ['line_id' => 'a', 'product_id' => $this->shirt, 'quantity' => 1, 'price' => 30.0],
+        ]);
+        $this->assertSame([], $session->discounts);
+
+        $steps = [
+            // 30 -> 55: crosses the 50 minimum of the shirt promotion
+            [['op' => 'add_line', 'line_id' => 'b', 'product_id' => $this->socks, 'quantity' => 5, 'price' => 5.0]],
+            // 55 -> 45: back under it
+            [['op' => 'set_quantity', 'line_id' => 'b', 'quantity' => 3]],
+            // 4 units: reaches the quantity minimum
+            [['op' => 'set_quantity', 'line_id' => 'b', 'quantity' => 4]],
+            [['op' => 'remove_line', 'line_id' => 'b']],
+        ];
+        foreach ($steps as $i => $deltas) {
+            $session->applyDeltas($deltas);
+
+            $this->assertEqualsWithDelta($this->recomputed($session), $session->discounts, 0.0001, "step {$i}");
+        }
+    }
+
+    public function test_quote_after_deltas_matches_calculate_discount()
+    {
+        $session = PromotionCartSession::create($this->companyId, [
+            ['line_id' => 'a', 'product_id' => $this->shirt, 'quantity' => 1, 'price' => 30.0],
+        ]);
+        $session->applyDeltas([['op' => 'add_line', 'line_id' => 'b', 'product_id' => $this->socks, 'quantity' => 5, 'price' => 5.0]]);
+
+        $this->actingAs($this->user, 'sanctum');
+        $expected = $this->postJson('/promotions/calculate-discount', [
+            'cart_total' => 55,
+            'cart_items' => $session->cartItems(),
+        ])->assertOk();
+
+        $quote = $session->quote();
+        $this->assertEqualsWithDelta($expected->json('total_discount'), $quote['total_discount'], 0.0001);
+        $this->assertEqualsWithDelta(3.0 + 1.5 + 5.0, $quote['total_discount'], 0.0001);
+    }
+}
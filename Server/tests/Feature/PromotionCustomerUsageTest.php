@@ -0,0 +1,105 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Tests\Concerns\PromotionFixtures;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Illuminate\Support\Facades\DB;
+use App\Models\PromotionCustomerUsage;
+
+class PromotionCustomerUsageTest extends TestCase
+{
+    use RefreshDatabase, PromotionFixtures;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->artisan('migrate');
+        $this->createCompanyAndUser();
+    }
+
+    public function test_record_uses_inserts_then_increments_one_counter_per_promotion()
+    {
+        $customerId = $this->createCustomer();
+        $first = $this->createPromotion()->id;
+        $second = $this->createPromotion()->id;
+
+        PromotionCustomerUsage::recordUses($customerId, [$first, $second, $first]);
+        PromotionCustomerUsage::recordUses($customerId, [$first]);
+
+        $this->assertSame([$first => 2, $second => 1], PromotionCustomerUsage::usesFor($customerId, [$first, $second]));
+        $this->assertSame(2, PromotionCustomerUsage::where('customer_id', $customerId)->count());
+    }
+
+    public function test_counters_are_kept_per_customer()
+    {
+        $alice = $this->createCustomer();
+        $bob = $this->createCustomer();
+        $promotionId = $this->createPromotion()->id;
+
+        PromotionCustomerUsage::recordUses($alice, [$promotionId]);
+        PromotionCustomerUsage::recordUses($alice, [$promotionId]);
+        PromotionCustomerUsage::recordUses($bob, [$promotionId]);
+
+        $this->assertSame(
+            [$alice => [$promotionId => 2], $bob => [$promotionId => 1]],
+            PromotionCustomerUsage::usesForCustomers([$alice, $bob], [$promotionId])
+        );
+    }
+
+    public function test_can_be_used_by_reads_the_counter()
+    {
+        $customerId = $this->createCustomer();
+        $promotion = $this->createPromotion(['usage_limit_per_customer' => 2]);
+
+        PromotionCustomerUsage::recordUses($customerId, [$promotion->id]);
+        $this->assertTrue($promotion->canBeUsedBy($customerId));
+
+        PromotionCustomerUsage::recordUses($customerId, [$promotion->id]);
+        $this->assertFalse($promotion->canBeUsedBy($customerId));
+        $this->assertTrue($promotion->canBeUsedBy($this->createCustomer()));
+    }
+
+    public function test_backfill_rebuilds_counters_from_recorded_usage()
+    {
+        $alice = $this->createCustomer();
+        $bob = $this->createCustomer();
+        $first = $this->createPromotion()->id;
+        $second = $this->createPromotion()->id;
+
+        $this->recordUsage($first, $alice, 3);
+        $this->recordUsage($second, $alice, 1);
+        $this->recordUsage($first, $bob, 2);
+        // Walk-in sales have no customer and get no counter
+        $this->recordUsage($first, null, 4);
+
+        // A stale counter is replaced, not added to
+        PromotionCustomerUsage::recordUses($alice, [$first]);
+
+        $this->artisan('promotions:backfill-customer-usage')
+            ->expectsOutputToContain('Rebuilt 3 customer usage counters.')
+            ->assertExitCode(0);
+
+        $this->assertSame(
+            [$alice => [$first => 3, $second => 1], $bob => [$first => 2]],
+            PromotionCustomerUsage::usesForCustomers([$alice, $bob], [$first, $second])
+        );
+        $this->assertSame(3, PromotionCustomerUsage::count());
+    }
+
+    private function recordUsage(int $promotionId, ?int $customerId, int $times): void
+    {
+        $now = now();
+        for ($i = 0; $i < $times; $i++) {
+            DB::table('promotion_usage')->insert([
+                'promotion_id' => $promotionId,
+                'customer_id' => $customerId,
+                'discount_amount' => 5,
+                'used_at' => $now,
+                'created_at' => $now,
+                'updated_at' => $now,
+            ]);
+        }
+    }
+}
@@ -0,0 +1,68 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Tests\Concerns\PromotionFixtures;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+
+class PromotionExplainTest extends TestCase
+{
+    use RefreshDatabase, PromotionFixtures;
+
+    private array $cart;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->artisan('migrate');
+        $this->createCompanyAndUser();
+        $this->actingAs($this->user, 'sanctum');
+
+        $this->cart = ['cart_total' => 50, 'cart_items' => [$this->line(1, 2, 25.0)]];
+    }
+
+    public function test_trace_gives_the_decision_behind_every_promotion()
+    {
+        $applied = $this->createPromotion(['priority' => 10]);
+        $otherProduct = $this->createPromotion(['discount_value' => 20, 'scope' => 'product', 'scope_items' => [999]]);
+        $minimum = $this->createPromotion(['discount_value' => 5, 'minimum_purchase' => 1000, 'priority' => 5]);
+        $outranked = $this->createPromotion(['discount_value' => 15]);
+        $usedUp = $this->createPromotion(['usage_limit_total' => 1, 'usage_count' => 1]);
+        $firstTime = $this->createPromotion(['first_time_only' => true]);
+
+        $response = $this->postJson('/promotions/calculate-discount', $this->cart + ['explain' => true])->assertOk();
+
+        $trace = $response->json('trace');
+        $this->assertSame('priority_first', $trace['policy']);
+        $this->assertSame(1, $trace['cart_lines']);
+        $this->assertSame(2, $trace['cart_units']);
+        $this->assertSame(3, $trace['priced']);
+        $this->assertCount(6, $trace['promotions']);
+
+        $rows = array_column($trace['promotions'], null, 'id');
+        $this->assertSame('applied', $rows[$applied->id]['decision']);
+        $this->assertEquals(5.0, $rows[$applied->id]['values']['discount']);
+        $this->assertSame('scope_mismatch', $rows[$otherProduct->id]['decision']);
+        $this->assertSame('minimum_not_met', $rows[$minimum->id]['decision']);
+        $this->assertEquals(1000, $rows[$minimum->id]['values']['minimum_purchase']);
+        $this->assertSame('not_combined', $rows[$outranked->id]['decision']);
+        $this->assertSame([$applied->id], $rows[$outranked->id]['values']['blocked_by']);
+        $this->assertSame('total_limit_reached', $rows[$usedUp->id]['decision']);
+        $this->assertSame('customer_required', $rows[$firstTime->id]['decision']);
+    }
+
+    public function test_explained_quote_matches_the_plain_quote()
+    {
+        $this->createPromotion(['priority' => 10]);
+        $this->createPromotion(['discount_value' => 15, 'is_stackable' => true]);
+
+        $plain = $this->postJson('/promotions/calculate-discount', $this->cart)->assertOk();
+        $explained = $this->postJson('/promotions/calculate-discount', $this->cart + ['explain' => true])->assertOk();
+
+        $this->assertArrayNotHasKey('trace', $plain->json());
+        $this->assertEquals($plain->json('total_discount'), $explained->json('total_discount'));
+        $this->assertEquals($plain->json('applicable_promotions'), $explained->json('applicable_promotions'));
+        $this->assertNotEmpty($explained->json('quote_id'));
+    }
+}
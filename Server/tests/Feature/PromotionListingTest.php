@@ -0,0 +1,122 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Tests\Concerns\PromotionFixtures;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Illuminate\Support\Carbon;
+
+class PromotionListingTest extends TestCase
+{
+    use RefreshDatabase, PromotionFixtures;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->artisan('migrate');
+        $this->createCompanyAndUser();
+        $this->actingAs($this->user, 'sanctum');
+        $this->travelTo(Carbon::parse('2026-10-18 12:00:00'));
+    }
+
+    private function ids(string $query): array
+    {
+        $ids = array_column($this->getJson('/promotions?' . $query)->assertOk()->json(), 'id');
+        sort($ids);
+
+        return $ids;
+    }
+
+    public function test_active_and_inactive_tabs_add_up_to_all_promotions()
+    {
+        $running = $this->createPromotion()->id;
+        $switchedOff = $this->createPromotion(['is_active' => false])->id;
+        $expired = $this->createPromotion(['end_date' => '2026-10-01 00:00:00'])->id;
+        $scheduled = $this->createPromotion(['start_date' => '2026-11-01 00:00:00'])->id;
+
+        $this->assertSame([$running], $this->ids('status=active'));
+        $this->assertSame([$switchedOff, $expired, $scheduled], $this->ids('status=inactive'));
+
+        $this->getJson('/promotions?per_page=10&with_counts=1')
+            ->assertOk()
+            ->assertJsonPath('counts', ['all' => 4, 'active' => 1, 'inactive' => 3]);
+    }
+
+    public function test_type_and_date_window_filters()
+    {
+        $percentage = $this->createPromotion(['start_date' => '2026-10-20 18:00:00', 'end_date' => '2026-10-25 00:00:00'])->id;
+        $fixed = $this->createPromotion(['type' => 'fixed_amount'])->id;
+        $later = $this->createPromotion(['start_date' => '2026-10-21 00:00:00'])->id;
+        $ended = $this->createPromotion(['end_date' => '2026-10-05 10:00:00'])->id;
+
+        $this->assertSame([$fixed], $this->ids('type=fixed_amount'));
+        // A datetime date_to still covers the rest of that day
+        $this->assertSame([$percentage, $fixed, $ended], $this->ids('date_to=' . urlencode('2026-10-20 08:00:00')));
+        $this->assertSame([$percentage, $fixed, $later], $this->ids('date_from=' . urlencode('2026-10-05 10:00:01')));
+        $this->assertSame([$percentage, $fixed], $this->ids('date_from=2026-10-19&date_to=2026-10-20'));
+    }
+
+    public function test_fields_are_limited_to_the_whitelist()
+    {
+        $this->createPromotion(['name' => 'Weekend']);
+
+        $row = $this->getJson('/promotions?fields=name,company_id,password')->assertOk()->json('0');
+
+        $this->assertSame('Weekend', $row['name']);
+        $this->assertArrayNotHasKey('company_id', $row);
+        $this->assertArrayNotHasKey('description', $row);
+        $this->assertArrayHasKey('id', $row);
+    }
+
+    public function test_cursor_pages_cover_every_promotion_once()
+    {
+        $expected = [];
+        foreach ([5, 5, 3, 1, 0] as $priority) {
+            $expected[] = $this->createPromotion(['priority' => $priority])->id;
+        }
+
+        $first = $this->getJson('/promotions?per_page=2')->assertOk();
+        $second = $this->getJson('/promotions?per_page=2&cursor=' . $first->json('next_cursor'))->assertOk();
+        $third = $this->getJson('/promotions?per_page=2&cursor=' . $second->json('next_cursor'))->assertOk();
+
+        $this->assertNull($third->json('next_cursor'));
+        $this->assertSame(
+            [$expected[1], $expected[0], $expected[2], $expected[3], $expected[4]],
+            array_merge(...array_map(fn ($page) => array_column($page->json('data'), 'id'), [$first, $second, $third]))
+        );
+    }
+
+    public function test_updated_since_returns_changed_rows_and_matching_ids()
+    {
+        $unchanged = $this->createPromotion();
+        $changed = $this->createPromotion();
+        $since = now()->addSecond()->toIso8601String();
+
+        $this->travel(5)->seconds();
+        $changed->update(['name' => 'Renamed']);
+
+        $response = $this->getJson('/promotions?updated_since=' . urlencode($since))->assertOk();
+
+        $this->assertSame([$changed->id], array_column($response->json('data'), 'id'));
+        $this->assertEqualsCanonicalizing([$unchanged->id, $changed->id], $response->json('ids'));
+        $this->assertNotNull($response->json('server_time'));
+    }
+
+    public function test_unchanged_listing_answers_304_until_a_promotion_changes()
+    {
+        $promotion = $this->createPromotion();
+
+        $etag = $this->getJson('/promotions')->assertOk()->headers->get('ETag');
+        $this->assertNotEmpty($etag);
+
+        $this->getJson('/promotions', ['If-None-Match' => $etag])->assertStatus(304);
+
+        $this->travel(1)->seconds();
+        $promotion->update(['discount_value' => 15]);
+
+        $this->getJson('/promotions', ['If-None-Match' => $etag])->assertOk()
+            ->assertHeader('ETag');
+        $this->assertNotSame($etag, $this->getJson('/promotions')->headers->get('ETag'));
+    }
+}
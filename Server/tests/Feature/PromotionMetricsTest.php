@@ -0,0 +1,77 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Tests\Concerns\PromotionFixtures;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Illuminate\Support\Facades\Cache;
+
+class PromotionMetricsTest extends TestCase
+{
+    use RefreshDatabase, PromotionFixtures;
+
+    private array $cart;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->artisan('migrate');
+        $this->createCompanyAndUser();
+        $this->actingAs($this->user, 'sanctum');
+        $this->createPromotion();
+
+        config(['promotions.metrics.enabled' => true]);
+        $this->cart = ['cart_total' => 50, 'cart_items' => [$this->line(1, 2, 25.0)]];
+    }
+
+    public function test_nothing_is_recorded_unless_enabled()
+    {
+        config(['promotions.metrics.enabled' => false]);
+
+        $response = $this->postJson('/promotions/calculate-discount', $this->cart)->assertOk();
+
+        $this->assertFalse($response->headers->has('Server-Timing'));
+        $this->assertSame([], $this->getJson('/promotions/metrics')->json('routes'));
+    }
+
+    public function test_each_quote_is_added_to_the_company_histograms()
+    {
+        $response = $this->postJson('/promotions/calculate-discount', $this->cart)->assertOk();
+        $this->postJson('/promotions/calculate-discount', $this->cart)->assertOk();
+
+        $this->assertStringStartsWith('promo;dur=', $response->headers->get('Server-Timing'));
+
+        $entry = $this->getJson('/promotions/metrics')->assertOk()->json('routes.calculate_discount');
+        $this->assertSame(2, $entry['requests']);
+        $this->assertSame(2, array_sum($entry['latency_histogram']));
+        $this->assertSame(2, $entry['cart_lines']);
+        $this->assertGreaterThan(0, $entry['request_ms']);
+        $this->assertGreaterThanOrEqual($entry['max_ms'], $entry['request_ms']);
+        $this->assertArrayNotHasKey('total_ms', $entry);
+    }
+
+    public function test_reset_clears_the_histograms()
+    {
+        $this->postJson('/promotions/calculate-discount', $this->cart)->assertOk();
+
+        $this->getJson('/promotions/metrics?reset=1')->assertOk()->assertJsonPath('routes.calculate_discount.requests', 1);
+
+        $this->assertSame([], $this->getJson('/promotions/metrics')->json('routes'));
+    }
+
+    public function test_request_skips_a_locked_histogram_and_counts_the_dropped_sample()
+    {
+        $lock = Cache::lock("promotion_metrics_{$this->companyId}_lock", 10);
+        $this->assertTrue($lock->get());
+
+        $this->postJson('/promotions/calculate-discount', $this->cart)->assertOk();
+        $this->getJson('/promotions/metrics')
+            ->assertJsonPath('routes', [])
+            ->assertJsonPath('dropped', 1);
+
+        $lock->release();
+        $this->postJson('/promotions/calculate-discount', $this->cart)->assertOk();
+        $this->getJson('/promotions/metrics')->assertJsonPath('routes.calculate_discount.requests', 1);
+    }
+}
@@ -0,0 +1,217 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Illuminate\Support\Facades\DB;
+use App\Models\Promotion;
+use App\Models\PromotionCustomerUsage;
+use App\Models\PromotionUsage;
+use App\Models\PromotionUsageDaily;
+use App\Models\User;
+use App\Services\Promotions\PromotionRuleCache;
+
+/**
+ * Guards the promotion hot queries against regressing to full scans by
+ * checking the query plan (EXPLAIN QUERY PLAN on SQLite, EXPLAIN on MySQL).
+ */
+class PromotionQueryPlanTest extends TestCase
+{
+    use RefreshDatabase;
+
+    private int $companyId;
+    private int $customerId;
+
+    /** @var int[] */
+    private array $promotionIds = [];
+
+    /** @var int[] */
+    private array $customerIds = [];
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->artisan('migrate');
+
+        $this->seedVolumes();
+    }
+
+    public function test_active_rule_set_query_uses_company_active_index()
+    {
+        $plan = $this->plan(PromotionRuleCache::enabledQuery($this->companyId));
+
+        $this->assertUsesIndex('promotions_company_active_priority_index', $plan);
+    }
+
+    public function test_active_scope_uses_company_active_index()
+    {
+        $query = Promotion::forCompany($this->companyId)->active()->orderBy('priority', 'desc');
+
+        $this->assertUsesIndex('promotions_company_active_priority_index', $this->plan($query));
+    }
+
+    public function test_report_usage_totals_use_promotion_created_index()
+    {
+        $plan = $this->planOf(fn () => PromotionUsage::totalsForCompany(
+            $this->companyId,
+            now()->subDays(30)->toDateString() . ' 00:00:00',
+            now()->toDateString() . ' 23:59:59'
+        ));
+
+        $this->assertUsesIndex('promotion_usage_promotion_created_index', $plan);
+    }
+
+    public function test_report_daily_totals_use_a_daily_rollup_index()
+    {
+        $plan = $this->planOf(fn () => PromotionUsageDaily::totalsForCompany(
+            $this->companyId,
+            now()->subDays(30)->toDateString(),
+            now()->toDateString()
+        ));
+
+        $this->assertUsesAnyIndex(['promotion_usage_daily_promotion_id_day_unique', 'promotion_usage_daily_day_index'], $plan);
+    }
+
+    public function test_customer_usage_lookups_use_customer_usage_indexes()
+    {
+        $indexes = ['promotion_customer_usage_promotion_id_customer_id_unique', 'promotion_customer_usage_customer_id_index'];
+        $promotionIds = array_slice($this->promotionIds, 0, 5);
+
+        $this->assertUsesAnyIndex($indexes, $this->planOf(fn () => PromotionCustomerUsage::usesFor($this->customerId, $promotionIds)));
+        $this->assertUsesAnyIndex($indexes, $this->planOf(fn () => PromotionCustomerUsage::usesForCustomers(
+            array_slice($this->customerIds, 0, 3),
+            $promotionIds
+        )));
+    }
+
+    private function seedVolumes(): void
+    {
+        $user = User::factory()->create();
+        $now = now();
+
+        $companyIds = [];
+        for ($c = 1; $c <= 5; $c++) {
+            $companyIds[] = DB::table('companies')->insertGetId([
+                'name' => "Company {$c}",
+                'email' => "company{$c}@example.test",
+                'created_at' => $now,
+                'updated_at' => $now,
+            ]);
+        }
+        $this->companyId = $companyIds[0];
+
+        $customers = [];
+        foreach ($companyIds as $companyId) {
+            for ($i = 1; $i <= 40; $i++) {
+                $customers[] = [
+                    'name' => "Customer {$companyId}-{$i}",
+                    'company_id' => $companyId,
+                    'created_by' => $user->id,
+                    'created_at' => $now,
+                    'updated_at' => $now,
+                ];
+            }
+        }
+        DB::table('customers')->insert($customers);
+        $customerIds = DB::table('customers')->pluck('id')->all();
+        $this->customerIds = $customerIds;
+        $this->customerId = $customerIds[0];
+
+        // Mostly expired or disabled promotions, as accumulate over time
+        $promotions = [];
+        foreach ($companyIds as $companyId) {
+            for ($i = 1; $i <= 200; $i++) {
+                $promotions[] = [
+                    'name' => "Promo {$companyId}-{$i}",
+                    'type' => 'percentage',
+                    'discount_value' => 10,
+                    'scope' => 'all',
+                    'is_active' => $i % 10 === 0,
+                    'priority' => $i % 5,
+                    'start_date' => $now->copy()->subDays(400 - $i),
+                    'end_date' => $now->copy()->subDays(370 - $i * 2),
+                    'company_id' => $companyId,
+                    'created_by' => $user->id,
+                    'created_at' => $now,
+                    'updated_at' => $now,
+                ];
+            }
+        }
+        foreach (array_chunk($promotions, 250) as $chunk) {
+            DB::table('promotions')->insert($chunk);
+        }
+        $promotionIds = DB::table('promotions')->pluck('id')->all();
+        $this->promotionIds = $promotionIds;
+
+        $usage = [];
+        for ($i = 0; $i < 20000; $i++) {
+            $at = $now->copy()->subMinutes($i * 26);
+            $usage[] = [
+                'promotion_id' => $promotionIds[$i % count($promotionIds)],
+                'customer_id' => $customerIds[$i % count($customerIds)],
+                'discount_amount' => 5,
+                'used_at' => $at,
+                'created_at' => $at,
+                'updated_at' => $at,
+            ];
+            if (count($usage) === 500) {
+                DB::table('promotion_usage')->insert($usage);
+                $usage = [];
+            }
+        }
+
+        // Derive the per-customer counters and daily rollup from the usage rows
+        $this->artisan('promotions:backfill-customer-usage')->run();
+        $this->artisan('promotions:backfill-usage-daily')->run();
+
+        // Refresh planner statistics so the plan reflects the seeded volumes
+        if (DB::getDriverName() === 'mysql') {
+            DB::statement('ANALYZE TABLE promotions, promotion_usage, promotion_customer_usage, promotion_usage_daily');
+        } else {
+            DB::statement('ANALYZE');
+        }
+    }
+
+    private function plan($query): string
+    {
+        return $this->planSql($query->toSql(), $query->getBindings());
+    }
+
+    /**
+     * Plan of the single query $run issues, captured without running it so
+     * the test follows whatever builder the model method produces.
+     */
+    private function planOf(callable $run): string
+    {
+        $queries = DB::pretend($run);
+        $this->assertCount(1, $queries);
+
+        return $this->planSql($queries[0]['query'], $queries[0]['bindings']);
+    }
+
+    private function planSql(string $sql, array $bindings): string
+    {
+        if (DB::getDriverName() === 'mysql') {
+            $rows = DB::select('EXPLAIN ' . $sql, $bindings);
+
+            return collect($rows)->pluck('key')->filter()->implode(' ');
+        }
+
+        $rows = DB::select('EXPLAIN QUERY PLAN ' . $sql, $bindings);
+
+        return collect($rows)->pluck('detail')->implode(' ');
+    }
+
+    private function assertUsesIndex(string $index, string $plan): void
+    {
+        $this->assertStringContainsString($index, $plan, "Expected query plan to use {$index}, got: {$plan}");
+    }
+
+    private function assertUsesAnyIndex(array $indexes, string $plan): void
+    {
+        $used = array_filter($indexes, fn ($index) => str_contains($plan, $index));
+
+        $this->assertNotEmpty($used, 'Expected query plan to use one of ' . implode(', ', $indexes) . ", got: {$plan}");
+    }
+}
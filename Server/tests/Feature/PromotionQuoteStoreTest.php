@@ -0,0 +1,90 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Tests\Concerns\PromotionFixtures;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use App\Services\Promotions\PromotionPriceCache;
+use App\Services\Promotions\PromotionQuoteStore;
+use App\Services\Promotions\PromotionRuleCache;
+
+class PromotionQuoteStoreTest extends TestCase
+{
+    use RefreshDatabase, PromotionFixtures;
+
+    private array $cart;
+    private array $result = ['applicable_promotions' => [], 'total_discount' => 5.0];
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->artisan('migrate');
+        $this->createCompanyAndUser();
+        $this->createPromotion();
+
+        $this->cart = [$this->line(1, 2, 25.0), $this->line(2, 1, 50.0)];
+    }
+
+    private function issue(?int $customerId = null): string
+    {
+        return PromotionQuoteStore::issue(PromotionRuleCache::forCompany($this->companyId), $this->cart, 100, $customerId, $this->result);
+    }
+
+    public function test_quote_is_redeemed_for_the_same_cart_in_any_line_order()
+    {
+        $quoteId = $this->issue();
+
+        $redeemed = PromotionQuoteStore::redeem($quoteId, $this->companyId, array_reverse($this->cart), 100, null);
+
+        $this->assertSame($this->result, $redeemed);
+    }
+
+    public function test_quote_can_only_be_redeemed_once()
+    {
+        $quoteId = $this->issue();
+
+        $this->assertNotNull(PromotionQuoteStore::redeem($quoteId, $this->companyId, $this->cart, 100, null));
+        $this->assertNull(PromotionQuoteStore::redeem($quoteId, $this->companyId, $this->cart, 100, null));
+    }
+
+    public function test_quote_is_rejected_for_a_different_cart_customer_or_company()
+    {
+        $changedCart = [$this->line(1, 3, 25.0), $this->line(2, 1, 50.0)];
+        $this->assertNull(PromotionQuoteStore::redeem($this->issue(), $this->companyId, $changedCart, 125, null));
+        $this->assertNull(PromotionQuoteStore::redeem($this->issue(), $this->companyId, $this->cart, 90, null));
+        $this->assertNull(PromotionQuoteStore::redeem($this->issue(7), $this->companyId, $this->cart, 100, 8));
+        $this->assertNull(PromotionQuoteStore::redeem($this->issue(), $this->companyId + 1, $this->cart, 100, null));
+    }
+
+    public function test_quote_is_rejected_after_a_promotion_changes()
+    {
+        $quoteId = $this->issue();
+        PromotionRuleCache::forget($this->companyId);
+
+        $this->assertNull(PromotionQuoteStore::redeem($quoteId, $this->companyId, $this->cart, 100, null));
+    }
+
+    public function test_quote_is_rejected_after_a_get_product_price_changes()
+    {
+        $quoteId = $this->issue();
+        PromotionPriceCache::forget($this->companyId);
+
+        $this->assertNull(PromotionQuoteStore::redeem($quoteId, $this->companyId, $this->cart, 100, null));
+    }
+
+    public function test_quote_expires()
+    {
+        $quoteId = $this->issue();
+
+        $this->travel(301)->seconds();
+
+        $this->assertNull(PromotionQuoteStore::redeem($quoteId, $this->companyId, $this->cart, 100, null));
+    }
+
+    public function test_unknown_or_missing_quote_is_rejected()
+    {
+        $this->assertNull(PromotionQuoteStore::redeem(null, $this->companyId, $this->cart, 100, null));
+        $this->assertNull(PromotionQuoteStore::redeem('not-a-quote', $this->companyId, $this->cart, 100, null));
+    }
+}
@@ -0,0 +1,171 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Tests\Concerns\PromotionFixtures;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Illuminate\Support\Carbon;
+use Illuminate\Support\Facades\DB;
+use App\Models\PromotionUsage;
+use App\Models\PromotionUsageDaily;
+
+class PromotionReportTest extends TestCase
+{
+    use RefreshDatabase, PromotionFixtures;
+
+    private int $spring;
+    private int $summer;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->artisan('migrate');
+        $this->createCompanyAndUser();
+        $this->actingAs($this->user, 'sanctum');
+
+        $this->spring = $this->createPromotion(['name' => 'Spring'])->id;
+        $this->summer = $this->createPromotion(['name' => 'Summer'])->id;
+
+        $this->recordSale('2026-10-09 23:59:00', [$this->spring => 1.00]);
+        $this->recordSale('2026-10-10 09:00:00', [$this->spring => 5.00, $this->summer => 2.50]);
+        $this->recordSale('2026-10-11 18:30:00', [$this->spring => 4.25]);
+        $this->recordSale('2026-10-12 23:59:59', [$this->summer => 3.00]);
+        $this->recordSale('2026-10-13 00:00:00', [$this->summer => 8.00]);
+    }
+
+    private function recordSale(string $at, array $discounts): void
+    {
+        $this->travelTo(Carbon::parse($at));
+
+        $saleId = DB::table('sales')->insertGetId([
+            'total' => 100,
+            'company_id' => $this->companyId,
+            'created_at' => now(),
+            'updated_at' => now(),
+        ]);
+        $applied = [];
+        foreach ($discounts as $promotionId => $discount) {
+            $applied[] = ['id' => $promotionId, 'discount' => $discount];
+        }
+        PromotionUsage::recordForSale($saleId, null, $applied);
+
+        $this->travelBack();
+    }
+
+    private function usage(array $query): array
+    {
+        $report = $this->getJson('/reports/promotions?' . http_build_query($query))->assertOk();
+
+        return collect($report->json('list'))
+            ->mapWithKeys(fn ($row) => [$row['id'] => [$row['usage_count'], $row['total_discount']]])
+            ->all();
+    }
+
+    public function test_whole_day_report_from_the_rollup_matches_the_timestamp_aggregate()
+    {
+        $fromRollup = $this->usage(['start_date' => '2026-10-10', 'end_date' => '2026-10-12']);
+        $fromUsage = $this->usage(['start_date' => '2026-10-10 00:00:00', 'end_date' => '2026-10-12 23:59:59']);
+
+        $this->assertEquals([$this->spring => [2, 9.25], $this->summer => [2, 5.5]], $fromRollup);
+        $this->assertEquals($fromRollup, $fromUsage);
+    }
+
+    public function test_period_with_times_is_aggregated_from_usage_rows()
+    {
+        $usage = $this->usage(['start_date' => '2026-10-11 12:00:00', 'end_date' => '2026-10-12 12:00:00']);
+
+        $this->assertEquals([$this->spring => [1, 4.25], $this->summer => [0, 0]], $usage);
+    }
+
+    public function test_backfilled_rollup_matches_the_incrementally_recorded_one()
+    {
+        $recorded = $this->dailyRows();
+
+        $this->artisan('promotions:backfill-usage-daily')->assertExitCode(0);
+
+        $this->assertEquals($recorded, $this->dailyRows());
+        $this->assertCount(6, $recorded);
+    }
+
+    public function test_rollup_adds_a_sale_to_existing_days_in_one_statement()
+    {
+        $this->travelTo(Carbon::parse('2026-10-10 15:00:00'));
+        DB::enableQueryLog();
+
+        PromotionUsageDaily::recordForSale([
+            ['id' => $this->spring, 'discount' => 2.00],
+            ['id' => $this->summer, 'discount' => 1.25],
+        ], now());
+
+        $this->assertCount(1, DB::getQueryLog());
+        $this->travelBack();
+
+        $rows = DB::table('promotion_usage_daily')->where('day', '2026-10-10')->get()->keyBy('promotion_id');
+        $this->assertEquals([2, 7.0], [$rows[$this->spring]->uses, $rows[$this->spring]->discount]);
+        $this->assertEquals([2, 3.75], [$rows[$this->summer]->uses, $rows[$this->summer]->discount]);
+    }
+
+    public function test_report_only_counts_the_companys_promotions()
+    {
+        $otherCompanyId = DB::table('companies')->insertGetId(['name' => 'Other', 'email' => 'other@example.test']);
+        $other = $this->createPromotion(['company_id' => $otherCompanyId]);
+        $this->recordSale('2026-10-11 10:00:00', [$other->id => 50.00]);
+
+        $report = $this->getJson('/reports/promotions?start_date=2026-10-01&end_date=2026-10-31')->assertOk();
+
+        $report->assertJsonCount(2, 'list');
+        $this->assertEquals(6, $report->json('total_usage'));
+        $this->assertEquals(23.75, $report->json('total_discount'));
+    }
+
+    public function test_summary_csv_is_streamed_with_one_row_per_promotion()
+    {
+        $response = $this->get('/api/reports/promotions/export-csv?start_date=2026-10-10&end_date=2026-10-12')->assertOk();
+
+        $this->assertStringContainsString('Promotions_2026-10-10_2026-10-12.csv', $response->headers->get('Content-Disposition'));
+        $rows = $this->csvRows($response->streamedContent());
+
+        $this->assertSame(['Promotion Name', 'Type', 'Scope', 'Usage Count', 'Total Discount', 'Status'], $rows[6]);
+        $this->assertSame([
+            ['Spring', 'percentage', 'all', '2', '9.25', 'Active'],
+            ['Summer', 'percentage', 'all', '2', '5.50', 'Active'],
+        ], array_slice($rows, 7));
+    }
+
+    public function test_redemptions_csv_lists_every_redemption_in_the_period()
+    {
+        $customerId = $this->createCustomer(['name' => 'Jane']);
+        DB::table('promotion_usage')->where('promotion_id', $this->summer)->whereDate('created_at', '2026-10-12')->update(['customer_id' => $customerId]);
+
+        $response = $this->get('/api/reports/promotions/export-csv?mode=redemptions&start_date=2026-10-10&end_date=2026-10-12')->assertOk();
+
+        $this->assertStringContainsString('Promotion_Redemptions_2026-10-10_2026-10-12.csv', $response->headers->get('Content-Disposition'));
+        $rows = array_slice($this->csvRows($response->streamedContent()), 7);
+
+        $this->assertCount(4, $rows);
+        $this->assertSame(
+            [['Spring', '5.00'], ['Summer', '2.50'], ['Spring', '4.25'], ['Summer', '3.00']],
+            array_map(fn ($row) => [$row[2], $row[8]], $rows)
+        );
+        $this->assertSame(['100.00', 'Walk-in'], [$rows[0][5], $rows[0][7]]);
+        $this->assertSame([(string) $customerId, 'Jane'], [$rows[3][6], $rows[3][7]]);
+    }
+
+    private function csvRows(string $csv): array
+    {
+        $csv = preg_replace('/^\xEF\xBB\xBF/', '', $csv);
+
+        return array_map('str_getcsv', preg_split('/\r?\n/', trim($csv)));
+    }
+
+    private function dailyRows(): array
+    {
+        return DB::table('promotion_usage_daily')
+            ->orderBy('promotion_id')
+            ->orderBy('day')
+            ->get(['promotion_id', 'day', 'uses', 'discount'])
+            ->map(fn ($row) => [(int) $row->promotion_id, substr((string) $row->day, 0, 10), (int) $row->uses, round((float) $row->discount, 2)])
+            ->all();
+    }
+}
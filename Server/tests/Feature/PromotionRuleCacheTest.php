@@ -0,0 +1,63 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Tests\Concerns\PromotionFixtures;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Illuminate\Support\Facades\Cache;
+use App\Services\Promotions\PromotionRuleCache;
+
+class PromotionRuleCacheTest extends TestCase
+{
+    use RefreshDatabase, PromotionFixtures;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->artisan('migrate');
+        $this->createCompanyAndUser();
+    }
+
+    public function test_forget_serves_a_freshly_compiled_set()
+    {
+        $this->createPromotion(['name' => 'First']);
+        $this->assertCount(1, PromotionRuleCache::forCompany($this->companyId)->promotions);
+
+        $this->createPromotion(['name' => 'Second']);
+        $this->assertCount(1, PromotionRuleCache::forCompany($this->companyId)->promotions);
+
+        PromotionRuleCache::forget($this->companyId);
+        $this->assertCount(2, PromotionRuleCache::forCompany($this->companyId)->promotions);
+    }
+
+    public function test_evicted_version_does_not_fall_back_to_an_old_cached_set()
+    {
+        $this->createPromotion(['name' => 'First']);
+
+        // A set cached under every low version a naive counter would restart from
+        $stale = PromotionRuleCache::forCompany($this->companyId);
+        foreach ([1, 2, 3] as $version) {
+            Cache::forever("promotion_rules_{$this->companyId}_v{$version}", [
+                'promotions' => PromotionRuleCache::activePromotions($this->companyId),
+                'rules' => $stale,
+            ]);
+        }
+
+        $this->createPromotion(['name' => 'Second']);
+        Cache::forget("promotion_rules_version_{$this->companyId}");
+
+        $this->assertNotContains(PromotionRuleCache::version($this->companyId), [1, 2, 3]);
+        $this->assertCount(2, PromotionRuleCache::forCompany($this->companyId)->promotions);
+    }
+
+    public function test_every_forget_moves_to_a_new_version()
+    {
+        $version = PromotionRuleCache::version($this->companyId);
+
+        PromotionRuleCache::forget($this->companyId);
+        PromotionRuleCache::forget($this->companyId);
+
+        $this->assertSame($version + 2, PromotionRuleCache::version($this->companyId));
+    }
+}
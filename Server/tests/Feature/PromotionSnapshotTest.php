@@ -0,0 +1,82 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Tests\Concerns\PromotionFixtures;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Illuminate\Support\Facades\Cache;
+use App\Services\Promotions\PromotionPriceCache;
+
+class PromotionSnapshotTest extends TestCase
+{
+    use RefreshDatabase, PromotionFixtures;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->artisan('migrate');
+        $this->createCompanyAndUser();
+        $this->actingAs($this->user, 'sanctum');
+    }
+
+    private function etag(): string
+    {
+        return $this->getJson('/promotions/snapshot')->assertOk()->headers->get('ETag');
+    }
+
+    public function test_snapshot_carries_its_version_as_etag()
+    {
+        $freeProduct = $this->createProduct(3.5);
+        $promotion = $this->createPromotion([
+            'type' => 'buy_x_get_y',
+            'buy_quantity' => 2,
+            'get_quantity' => 1,
+            'get_products' => [$freeProduct],
+        ]);
+
+        $response = $this->getJson('/promotions/snapshot')->assertOk();
+
+        $this->assertSame('"' . $response->json('version') . '"', $response->headers->get('ETag'));
+        $response->assertJsonPath('rules.0.id', $promotion->id);
+        $this->assertEquals(3.5, $response->json('rules.0.get_price'));
+    }
+
+    public function test_unchanged_snapshot_answers_304()
+    {
+        $this->createPromotion();
+        $etag = $this->etag();
+
+        $this->getJson('/promotions/snapshot', ['If-None-Match' => $etag])
+            ->assertStatus(304)
+            ->assertHeader('ETag', $etag);
+    }
+
+    public function test_promotion_write_changes_the_version()
+    {
+        $promotion = $this->createPromotion();
+        $etag = $this->etag();
+
+        $this->postJson("/promotions/{$promotion->id}/toggle")->assertOk();
+
+        $this->getJson('/promotions/snapshot', ['If-None-Match' => $etag])
+            ->assertOk()
+            ->assertJsonPath('rules', []);
+        $this->assertNotSame($etag, $this->etag());
+    }
+
+    public function test_price_change_changes_the_version()
+    {
+        $this->createPromotion();
+        $seen = [$this->etag()];
+
+        PromotionPriceCache::forget($this->companyId);
+        $seen[] = $this->etag();
+
+        // An evicted price counter must not fall back to an earlier version
+        Cache::forget("promotion_prices_version_{$this->companyId}");
+        $seen[] = $this->etag();
+
+        $this->assertCount(3, array_unique($seen));
+    }
+}
@@ -0,0 +1,114 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Tests\Concerns\PromotionFixtures;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Illuminate\Support\Facades\DB;
+use App\Services\Promotions\PromotionCustomerProfile;
+
+class PromotionTargetingTest extends TestCase
+{
+    use RefreshDatabase, PromotionFixtures;
+
+    private int $productId;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->artisan('migrate');
+        $this->createCompanyAndUser();
+        $this->productId = $this->createProduct(50.0);
+        $this->actingAs($this->user, 'sanctum');
+    }
+
+    /**
+     * Ids of the promotions quoted for a two-unit cart.
+     */
+    private function appliedIds(?int $customerId): array
+    {
+        $promotions = $this->postJson('/promotions/calculate-discount', [
+            'cart_total' => 100,
+            'cart_items' => [['product_id' => $this->productId, 'quantity' => 2, 'price' => 50]],
+            'customer_id' => $customerId,
+        ])->assertOk()->json('applicable_promotions');
+
+        return array_column($promotions, 'id');
+    }
+
+    private function createPriceGroup(string $code): int
+    {
+        $now = now();
+
+        return DB::table('price_groups')->insertGetId([
+            'name' => "Group {$code}",
+            'code' => $code,
+            'discount_percentage' => 0,
+            'is_system' => false,
+            'company_id' => $this->companyId,
+            'created_at' => $now,
+            'updated_at' => $now,
+        ]);
+    }
+
+    public function test_first_time_promotion_stops_applying_once_the_customer_has_bought()
+    {
+        $promotion = $this->createPromotion(['first_time_only' => true]);
+        $customerId = $this->createCustomer();
+
+        $this->assertSame([], $this->appliedIds(null));
+        $this->assertSame([$promotion->id], $this->appliedIds($customerId));
+
+        // The profile cached by the quote above is updated by the sale
+        $this->postJson('/sales', [
+            'items' => [['product_id' => $this->productId, 'quantity' => 2, 'price' => 50]],
+            'customer_id' => $customerId,
+            'amount_paid' => 1000,
+        ])->assertStatus(201)->assertJsonPath('applied_promotions.0.id', $promotion->id);
+
+        $this->assertSame([], $this->appliedIds($customerId));
+        $this->assertSame([$promotion->id], $this->appliedIds($this->createCustomer()));
+    }
+
+    public function test_customer_group_promotion_matches_the_price_group_by_code_or_id()
+    {
+        $vipId = $this->createPriceGroup('VIP');
+        $byCode = $this->createPromotion(['customer_groups' => ['vip'], 'is_stackable' => true]);
+        $byId = $this->createPromotion(['customer_groups' => [(string) $vipId], 'is_stackable' => true]);
+
+        $this->assertEqualsCanonicalizing([$byCode->id, $byId->id], $this->appliedIds($this->createCustomer(['price_group_id' => $vipId])));
+        $this->assertSame([], $this->appliedIds($this->createCustomer()));
+        $this->assertSame([], $this->appliedIds($this->createCustomer(['price_group_id' => $this->createPriceGroup('STOCKIST')])));
+    }
+
+    public function test_changing_the_customer_group_takes_effect_once_the_profile_is_forgotten()
+    {
+        $vipId = $this->createPriceGroup('VIP');
+        $promotion = $this->createPromotion(['customer_groups' => ['VIP']]);
+        $customerId = $this->createCustomer();
+        $this->assertSame([], $this->appliedIds($customerId));
+
+        DB::table('customers')->where('id', $customerId)->update(['price_group_id' => $vipId]);
+        $this->assertSame([], $this->appliedIds($customerId));
+
+        PromotionCustomerProfile::forget($this->companyId, $customerId);
+        $this->assertSame([$promotion->id], $this->appliedIds($customerId));
+    }
+
+    public function test_renaming_a_price_group_code_invalidates_every_profile_of_the_company()
+    {
+        $groupId = $this->createPriceGroup('VIP');
+        $promotion = $this->createPromotion(['customer_groups' => ['GOLD']]);
+        $customerId = $this->createCustomer(['price_group_id' => $groupId]);
+        $this->assertSame([], $this->appliedIds($customerId));
+
+        $this->putJson("/price-groups/{$groupId}", [
+            'name' => 'Gold',
+            'code' => 'gold',
+            'discount_percentage' => 0,
+        ])->assertOk();
+
+        $this->assertSame([$promotion->id], $this->appliedIds($customerId));
+    }
+}
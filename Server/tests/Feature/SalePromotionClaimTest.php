@@ -0,0 +1,123 @@
+<?php
+namespace Tests\Feature;
+
+use Tests\TestCase;
+use Tests\Concerns\PromotionFixtures;
+use Illuminate\Foundation\Testing\RefreshDatabase;
+use Illuminate\Support\Facades\DB;
+use App\Models\Promotion;
+use App\Models\PromotionCustomerUsage;
+use App\Services\Promotions\PromotionRuleCache;
+
+class SalePromotionClaimTest extends TestCase
+{
+    use RefreshDatabase, PromotionFixtures;
+
+    private int $productId;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->artisan('migrate');
+        $this->createCompanyAndUser();
+        $this->productId = $this->createProduct(50.0);
+        $this->actingAs($this->user, 'sanctum');
+    }
+
+    private function postSale(array $extra = [])
+    {
+        return $this->postJson('/sales', $extra + [
+            'items' => [['product_id' => $this->productId, 'quantity' => 2, 'price' => 50]],
+            'amount_paid' => 1000,
+        ]);
+    }
+
+    private function quote(?int $customerId = null): string
+    {
+        return $this->postJson('/promotions/calculate-discount', [
+            'cart_total' => 100,
+            'cart_items' => [['product_id' => $this->productId, 'quantity' => 2, 'price' => 50]],
+            'customer_id' => $customerId,
+        ])->assertOk()->json('quote_id');
+    }
+
+    public function test_capped_promotion_is_only_claimed_up_to_its_limit()
+    {
+        $promotion = $this->createPromotion(['usage_limit_total' => 1]);
+
+        $this->postSale()->assertStatus(201)
+            ->assertJsonPath('applied_promotions.0.id', $promotion->id);
+        $this->postSale()->assertStatus(201)
+            ->assertJsonPath('applied_promotions', []);
+
+        $this->assertEquals(1, $promotion->fresh()->usage_count);
+        $this->assertSame(1, DB::table('promotion_usage')->where('promotion_id', $promotion->id)->count());
+    }
+
+    public function test_quote_with_an_exhausted_promotion_is_repriced_once()
+    {
+        $capped = $this->createPromotion(['discount_value' => 20, 'priority' => 10, 'usage_limit_total' => 1]);
+        $fallback = $this->createPromotion(['discount_value' => 5]);
+        $quoteId = $this->quote();
+
+        // Another terminal takes the last use after the quote was issued
+        DB::table('promotions')->where('id', $capped->id)->update(['usage_count' => 1]);
+
+        $this->postSale(['promotion_quote_id' => $quoteId])->assertStatus(201)
+            ->assertJsonPath('applied_promotions.0.id', $fallback->id)
+            ->assertJsonCount(1, 'applied_promotions');
+
+        $this->assertEquals(1, $capped->fresh()->usage_count);
+        $this->assertEquals(1, $fallback->fresh()->usage_count);
+    }
+
+    public function test_sale_fails_with_409_when_the_claim_fails_after_repricing()
+    {
+        $promotion = $this->createPromotion();
+        PromotionRuleCache::forCompany($this->companyId);
+
+        // The cached rules predate the cap, so re-pricing applies it again
+        DB::table('promotions')->where('id', $promotion->id)->update(['usage_limit_total' => 1, 'usage_count' => 1]);
+
+        $this->postSale()->assertStatus(409)
+            ->assertJsonPath('message', 'Sale failed');
+
+        $this->assertSame(0, DB::transactionLevel());
+        $this->assertSame(0, DB::table('sales')->count());
+        $this->assertEquals(1, Promotion::find($promotion->id)->usage_count);
+    }
+
+    public function test_failed_sale_gives_back_the_claimed_use()
+    {
+        $promotion = $this->createPromotion(['usage_limit_total' => 1]);
+        DB::table('products')->where('id', $this->productId)->update(['stock_quantity' => 1]);
+
+        $this->postSale()->assertStatus(400)
+            ->assertJsonPath('message', 'Sale failed');
+
+        $this->assertSame(0, DB::transactionLevel());
+        $this->assertEquals(0, $promotion->fresh()->usage_count);
+        $this->assertSame(0, DB::table('promotion_usage')->count());
+
+        // The use is available to the next sale
+        DB::table('products')->where('id', $this->productId)->update(['stock_quantity' => 100]);
+        $this->postSale()->assertStatus(201)
+            ->assertJsonPath('applied_promotions.0.id', $promotion->id);
+    }
+
+    public function test_redeemed_quote_respects_the_per_customer_limit()
+    {
+        $customerId = $this->createCustomer();
+        $promotion = $this->createPromotion(['usage_limit_per_customer' => 1]);
+        $quoteId = $this->quote($customerId);
+
+        // The customer uses the promotion elsewhere after the quote was issued
+        PromotionCustomerUsage::recordUses($customerId, [$promotion->id]);
+
+        $this->postSale(['promotion_quote_id' => $quoteId, 'customer_id' => $customerId])->assertStatus(201)
+            ->assertJsonPath('applied_promotions', []);
+
+        $this->assertSame([$promotion->id => 1], PromotionCustomerUsage::usesFor($customerId, [$promotion->id]));
+    }
+}
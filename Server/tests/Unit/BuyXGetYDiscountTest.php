@@ -0,0 +1,270 @@
+<?php
+
+namespace Tests\Unit;
+
+use App\Services\Promotions\CompiledPromotion;
+use App\Services\Promotions\PromotionCartContext;
+use App\Services\Promotions\PromotionCombinationSolver;
+use App\Services\Promotions\PromotionEvaluator;
+use App\Services\Promotions\PromotionRuleSet;
+use PHPUnit\Framework\TestCase;
+
+/**
+ * Checks the price-bucket buy X get Y valuation against the original
+ * per-unit algorithm (every unit expanded, sorted by price, cheapest free).
+ */
+class BuyXGetYDiscountTest extends TestCase
+{
+    private const COMPANY_ID = 1;
+
+    /** Price of the cheapest get product outside the cart, per product id. */
+    private array $getPrices = [101 => 7.5, 102 => 4.25, 103 => 12.0];
+
+    public function test_specific_product_with_get_products_in_cart()
+    {
+        $rule = $this->rule('specific_product', ['buy' => [1, 2], 'get' => [101, 102], 'buy_qty' => 2, 'get_qty' => 1]);
+        $cart = [$this->line(1, 5, 20.0), $this->line(2, 3, 15.5), $this->line(101, 2, 7.5), $this->line(102, 1, 4.25)];
+
+        $this->assertMatchesReference($rule, $cart);
+    }
+
+    public function test_specific_product_values_missing_free_units_at_cheapest_get_product()
+    {
+        $rule = $this->rule('specific_product', ['buy' => [1], 'get' => [101, 102], 'buy_qty' => 1, 'get_qty' => 2]);
+        $cart = [$this->line(1, 4, 20.0), $this->line(101, 1, 7.5)];
+
+        // 8 free units: one in the cart at 7.50, seven valued at 4.25
+        $this->assertEqualsWithDelta(7.5 + 7 * 4.25, $this->discount($rule, $cart), 0.0001);
+        $this->assertMatchesReference($rule, $cart);
+    }
+
+    public function test_specific_product_without_get_products_gives_cheapest_matched_units()
+    {
+        $rule = $this->rule('specific_product', ['buy' => [1], 'buy_qty' => 3, 'get_qty' => 1]);
+        $cart = [$this->line(1, 7, 9.99), $this->line(2, 2, 1.25), $this->line(3, 1, 30.0)];
+
+        $this->assertMatchesReference($rule, $cart);
+    }
+
+    public function test_overlapping_buy_and_get_pools()
+    {
+        // Product 2 counts toward buying and can also be given away
+        $rule = $this->rule('specific_product', ['buy' => [1, 2], 'get' => [2, 3], 'buy_qty' => 2, 'get_qty' => 1, 'scope' => [1, 2, 3]]);
+        $cart = [$this->line(1, 3, 10.0), $this->line(2, 3, 6.0), $this->line(3, 2, 8.0), $this->line(4, 5, 1.0)];
+
+        $this->assertMatchesReference($rule, $cart);
+    }
+
+    public function test_any_x_items_with_mixed_and_equal_prices()
+    {
+        $rule = $this->rule('any_x_items', ['buy_qty' => 3, 'get_qty' => 1]);
+        // 0.1 + 0.2 and 0.3 land in the same "0.3" bucket; "10" and 10.00 in "10"
+        $cart = [
+            $this->line(1, 2, 0.1 + 0.2),
+            $this->line(2, 3, 0.3),
+            $this->line(3, 2, '10'),
+            $this->line(4, 2, 10.00),
+            $this->line(5, 4, 2.5),
+            $this->line(6, 1, 99.99),
+        ];
+
+        $this->assertMatchesReference($rule, $cart);
+    }
+
+    public function test_spend_x_get_y_variants()
+    {
+        $inCart = $this->rule('spend_x_get_y', ['get' => [101, 102], 'get_qty' => 2, 'minimum_purchase' => 50.0]);
+        $notInCart = $this->rule('spend_x_get_y', ['get' => [102, 103], 'get_qty' => 3, 'minimum_purchase' => 50.0]);
+        $noGetProducts = $this->rule('spend_x_get_y', ['get_qty' => 2, 'minimum_purchase' => 50.0]);
+        $cart = [$this->line(1, 3, 20.0), $this->line(101, 1, 7.5), $this->line(102, 4, 4.25)];
+
+        $this->assertMatchesReference($inCart, $cart);
+        $this->assertMatchesReference($notInCart, $cart);
+        $this->assertMatchesReference($noGetProducts, $cart);
+        $this->assertSame(0.0, $this->discount($inCart, [$this->line(1, 1, 20.0)]));
+    }
+
+    public function test_tiered_takes_each_tier_from_units_left_by_the_previous()
+    {
+        $rule = $this->rule('tiered', ['tiers' => [['buy' => 5, 'get' => 2], ['buy' => 2, 'get' => 1], ['buy' => 10, 'get' => 5]]]);
+        $cart = [$this->line(1, 6, 3.0), $this->line(2, 4, 1.5), $this->line(3, 3, 12.0), $this->line(4, 1, 0.5)];
+
+        $this->assertMatchesReference($rule, $cart);
+    }
+
+    public function test_fifty_thousand_unit_line()
+    {
+        $anyX = $this->rule('any_x_items', ['buy_qty' => 4, 'get_qty' => 1]);
+        $specific = $this->rule('specific_product', ['buy' => [1], 'get' => [2], 'buy_qty' => 10, 'get_qty' => 3]);
+        $tiered = $this->rule('tiered', ['tiers' => [['buy' => 3, 'get' => 1], ['buy' => 7, 'get' => 2]]]);
+        $cart = [$this->line(1, 50000, 2.35), $this->line(2, 20000, 1.1), $this->line(3, 3, 0.99)];
+
+        $this->assertMatchesReference($anyX, $cart);
+        $this->assertMatchesReference($specific, $cart);
+        $this->assertMatchesReference($tiered, $cart);
+    }
+
+    public function test_random_carts_match_the_per_unit_algorithm()
+    {
+        mt_srand(5);
+        $scenarios = ['specific_product', 'any_x_items', 'spend_x_get_y', 'tiered'];
+        $prices = [0.3, 0.1 + 0.2, 1.0, 2.5, 2.50, 9.99, 10.0, 19.95];
+
+        for ($run = 0; $run < 200; $run++) {
+            $cart = [];
+            foreach ((array) array_rand(array_flip(range(1, 12)), mt_rand(1, 8)) as $productId) {
+                $cart[] = $this->line($productId, mt_rand(1, 25), $prices[mt_rand(0, count($prices) - 1)]);
+            }
+
+            $rule = $this->rule($scenarios[$run % 4], [
+                'buy' => [mt_rand(1, 6), mt_rand(1, 12)],
+                'get' => $run % 3 === 0 ? [] : [mt_rand(1, 12), 101 + $run % 3],
+                'buy_qty' => mt_rand(1, 5),
+                'get_qty' => mt_rand(1, 3),
+                'minimum_purchase' => $scenarios[$run % 4] === 'spend_x_get_y' ? 1.0 : null,
+                'tiers' => [['buy' => mt_rand(2, 6), 'get' => 1], ['buy' => mt_rand(2, 4), 'get' => mt_rand(1, 2)]],
+            ]);
+
+            $this->assertMatchesReference($rule, $cart, "run {$run}");
+        }
+    }
+
+    private function assertMatchesReference(CompiledPromotion $rule, array $cart, string $message = ''): void
+    {
+        $this->assertEqualsWithDelta($this->reference($rule, $cart), $this->discount($rule, $cart), 0.0001, $message);
+    }
+
+    private function discount(CompiledPromotion $rule, array $cart): float
+    {
+        $evaluator = new PromotionEvaluator(
+            new PromotionRuleSet(self::COMPANY_ID, 1, [$rule], PHP_INT_MAX),
+            new PromotionCombinationSolver()
+        );
+
+        return $evaluator->promotionDiscount($rule, $cart, self::total($cart), PromotionEvaluator::quantityTotal($cart), $this->context());
+    }
+
+    /**
+     * Context holding the get product prices, as prefetch() would load them.
+     */
+    private function context(): PromotionCartContext
+    {
+        $context = new PromotionCartContext(self::COMPANY_ID);
+        $reflection = new \ReflectionClass($context);
+        $reflection->getProperty('prices')->setValue($context, $this->getPrices);
+        $reflection->getProperty('pricesLoaded')->setValue($context, true);
+
+        return $context;
+    }
+
+    /**
+     * The original per-unit valuation.
+     */
+    private function reference(CompiledPromotion $rule, array $cart): float
+    {
+        $matched = $rule->scope === 'product'
+            ? array_filter($cart, fn ($it) => isset($rule->scopeProductIds[(int) $it['product_id']]))
+            : $cart;
+        $expand = function (array $items) {
+            $units = [];
+            foreach ($items as $it) {
+                for ($i = 0; $i < (int) $it['quantity']; $i++) {
+                    $units[] = (float) $it['price'];
+                }
+            }
+            sort($units);
+
+            return $units;
+        };
+        $in = fn (array $ids) => array_filter($cart, fn ($it) => in_array((int) $it['product_id'], $ids, true));
+        $cheapestGetPrice = function () use ($rule) {
+            $known = array_intersect_key($this->getPrices, array_flip($rule->getProducts));
+
+            return empty($known) ? 0.0 : min($known);
+        };
+        $sumCheapest = fn (array $units, int $count) => array_sum(array_slice($units, 0, max(0, $count)));
+
+        switch ($rule->scenario) {
+            case 'specific_product':
+                $buyUnits = array_sum(array_column($in($rule->buyProducts), 'quantity'));
+                $freeUnits = intdiv($buyUnits, $rule->buyQuantity) * $rule->getQuantity;
+                if ($freeUnits <= 0) {
+                    return 0.0;
+                }
+                if (empty($rule->getProducts)) {
+                    return $sumCheapest($expand($matched), $freeUnits);
+                }
+                $units = $expand($in($rule->getProducts));
+                for ($i = count($units); $i < $freeUnits; $i++) {
+                    $units[] = $cheapestGetPrice();
+                }
+                sort($units);
+
+                return $sumCheapest($units, $freeUnits);
+
+            case 'any_x_items':
+                $units = $expand($matched);
+
+                return $sumCheapest($units, intdiv(count($units), $rule->buyQuantity) * $rule->getQuantity);
+
+            case 'spend_x_get_y':
+                if (self::total($cart) < $rule->minimumPurchase) {
+                    return 0.0;
+                }
+                $getItems = empty($rule->getProducts) ? [] : $in($rule->getProducts);
+                if (!empty($getItems)) {
+                    $units = $expand($getItems);
+                } elseif (!empty($rule->getProducts)) {
+                    $units = array_fill(0, $rule->getQuantity, $cheapestGetPrice());
+                } else {
+                    $units = $expand($matched);
+                }
+
+                return $sumCheapest($units, $rule->getQuantity);
+
+            case 'tiered':
+                $units = $expand($matched);
+                $discount = 0.0;
+                foreach ($rule->tierRules as $tier) {
+                    $freeUnits = min(intdiv(count($units), $tier['buy']) * $tier['get'], count($units));
+                    $discount += $sumCheapest($units, $freeUnits);
+                    $units = array_slice($units, $freeUnits);
+                }
+
+                return $discount;
+        }
+
+        return 0.0;
+    }
+
+    private function rule(string $scenario, array $options): CompiledPromotion
+    {
+        $rule = new CompiledPromotion();
+        $rule->id = 1;
+        $rule->name = 'Test';
+        $rule->type = 'buy_x_get_y';
+        $rule->scenario = $scenario;
+        $rule->scope = isset($options['scope']) ? 'product' : 'all';
+        $rule->scopeProductIds = array_fill_keys($options['scope'] ?? [], true);
+        $rule->buyProducts = array_values(array_unique($options['buy'] ?? []));
+        $rule->buyProductSet = array_fill_keys($rule->buyProducts, true);
+        $rule->getProducts = array_values(array_unique($options['get'] ?? []));
+        $rule->getProductSet = array_fill_keys($rule->getProducts, true);
+        $rule->buyQuantity = $options['buy_qty'] ?? null;
+        $rule->getQuantity = $options['get_qty'] ?? null;
+        $rule->minimumPurchase = $options['minimum_purchase'] ?? null;
+        $rule->tierRules = $options['tiers'] ?? [];
+
+        return $rule;
+    }
+
+    private function line(int $productId, int $quantity, $price): array
+    {
+        return ['product_id' => $productId, 'quantity' => $quantity, 'price' => $price];
+    }
+
+    private static function total(array $cart): float
+    {
+        return array_sum(array_map(fn ($it) => (float) $it['price'] * $it['quantity'], $cart));
+    }
+}
@@ -0,0 +1,23 @@
+<?php
+
+namespace Tests\Unit;
+
+use App\Services\Promotions\PromotionBenchmark;
+use PHPUnit\Framework\TestCase;
+
+class PromotionBenchmarkTest extends TestCase
+{
+    public function test_query_budgets_flag_scenarios_over_budget_or_without_one()
+    {
+        $results = [
+            'quote_10_lines' => ['queries' => 3],
+            'batch_100_carts' => ['queries' => 104],
+            'new_scenario' => ['queries' => 0],
+        ];
+
+        $this->assertSame([
+            'batch_100_carts: 104 queries per call, budget 5',
+            'new_scenario: no query budget set',
+        ], PromotionBenchmark::overQueryBudget($results));
+    }
+}
@@ -0,0 +1,145 @@
+<?php
+
+namespace Tests\Unit;
+
+use App\Services\Promotions\CompiledPromotion;
+use App\Services\Promotions\PromotionCartContext;
+use App\Services\Promotions\PromotionCombinationSolver;
+use App\Services\Promotions\PromotionEvaluator;
+use App\Services\Promotions\PromotionRuleSet;
+use PHPUnit\Framework\TestCase;
+
+class PromotionCombinationSolverTest extends TestCase
+{
+    /** @var array<int, float> promotion id => discount */
+    private array $discounts = [];
+
+    /** @var array<int, array<int, true>> promotion id => free unit pool */
+    private array $pools = [];
+
+    public function test_priority_first_stops_at_the_first_non_stackable_promotion()
+    {
+        $candidates = [
+            $this->rule(1, true, 5.0),
+            $this->rule(2, false, 3.0),
+            $this->rule(3, true, 4.0),
+            $this->rule(4, false, 9.0),
+        ];
+
+        $this->assertSame([1, 2], $this->solve(new PromotionCombinationSolver(), $candidates));
+    }
+
+    public function test_priority_first_skips_non_stackable_promotions_without_a_discount()
+    {
+        $candidates = [
+            $this->rule(1, false, 0.0),
+            $this->rule(2, true, 5.0),
+            $this->rule(3, false, 2.0),
+            $this->rule(4, true, 1.0),
+        ];
+
+        $this->assertSame([2, 3], $this->solve(new PromotionCombinationSolver(), $candidates));
+    }
+
+    public function test_best_for_customer_beats_priority_first()
+    {
+        $candidates = [
+            $this->rule(1, false, 5.0),
+            $this->rule(2, false, 8.0),
+            $this->rule(3, true, 4.0),
+            $this->rule(4, true, 3.0),
+        ];
+        $solver = new PromotionCombinationSolver(PromotionCombinationSolver::BEST_FOR_CUSTOMER, 1000);
+
+        $this->assertSame([1], $this->solve(new PromotionCombinationSolver(), $candidates));
+        // One non-stackable at most, plus every stackable
+        $this->assertSame([2, 3, 4], $this->solve($solver, $candidates));
+        $this->assertFalse($solver->timedOut());
+    }
+
+    public function test_best_for_customer_never_gives_a_unit_away_twice()
+    {
+        $candidates = [
+            $this->rule(1, true, 6.0, [7 => true]),
+            $this->rule(2, true, 5.0, [7 => true, 8 => true]),
+            $this->rule(3, true, 4.0, [8 => true]),
+        ];
+        $solver = new PromotionCombinationSolver(PromotionCombinationSolver::BEST_FOR_CUSTOMER, 1000);
+
+        $this->assertSame([1, 3], $this->solve($solver, $candidates));
+    }
+
+    public function test_spent_budget_returns_the_priority_first_seed()
+    {
+        // Every promotion gives units from the same product, so only one can
+        // apply, but the bound stays loose and the search needs many nodes
+        $candidates = [];
+        for ($id = 1; $id <= 40; $id++) {
+            $candidates[] = $this->rule($id, true, $id === 1 ? 10.0 : 9.0 + $id / 100, [1 => true]);
+        }
+        $solver = new PromotionCombinationSolver(PromotionCombinationSolver::BEST_FOR_CUSTOMER, 0.0);
+
+        $this->assertSame([1], $this->solve($solver, $candidates));
+        $this->assertTrue($solver->timedOut());
+    }
+
+    public function test_combinations_are_valued_at_most_the_cap()
+    {
+        $candidates = [
+            $this->rule(1, false, 45.0),
+            $this->rule(2, true, 30.0),
+            $this->rule(3, true, 25.0),
+        ];
+        $solver = new PromotionCombinationSolver(PromotionCombinationSolver::BEST_FOR_CUSTOMER, 1000);
+
+        // 45 + 30 already covers a 60 cart, so 25 is not added
+        $this->assertSame([1, 2], $this->solve($solver, $candidates, 60.0));
+        // The priority_first seed already covers a 40 cart
+        $this->assertSame([1], $this->solve($solver, $candidates, 40.0));
+    }
+
+    public function test_applied_discounts_are_clipped_to_the_cart_total()
+    {
+        $candidates = [
+            $this->rule(1, true, 30.0),
+            $this->rule(2, true, 25.0),
+            $this->rule(3, true, 5.0),
+        ];
+        $evaluator = new PromotionEvaluator(new PromotionRuleSet(1, 1, $candidates, PHP_INT_MAX), new PromotionCombinationSolver());
+
+        $result = $evaluator->combine($candidates, $this->discounts, [], 40.0, new PromotionCartContext(1));
+
+        $this->assertSame(40.0, $result['total_discount']);
+        $this->assertSame([1, 2], array_column($result['applicable_promotions'], 'id'));
+        $this->assertSame([30.0, 10.0], array_column($result['applicable_promotions'], 'discount'));
+    }
+
+    private function solve(PromotionCombinationSolver $solver, array $candidates, float $cap = 1000.0): array
+    {
+        $chosen = $solver->solve(
+            $candidates,
+            fn (CompiledPromotion $rule) => $this->discounts[$rule->id],
+            fn (CompiledPromotion $rule) => $this->pools[$rule->id] ?? null,
+            $cap
+        );
+
+        return array_map(fn ($pair) => $pair[0]->id, $chosen);
+    }
+
+    private function rule(int $id, bool $stackable, float $discount, ?array $pool = null): CompiledPromotion
+    {
+        $rule = new CompiledPromotion();
+        $rule->id = $id;
+        $rule->name = "Promotion {$id}";
+        $rule->type = $pool !== null ? 'buy_x_get_y' : 'percentage';
+        $rule->scope = 'all';
+        $rule->isStackable = $stackable;
+
+        $this->discounts[$id] = $discount;
+        if ($pool !== null) {
+            $this->pools[$id] = $pool;
+        }
+
+        return $rule;
+    }
+}
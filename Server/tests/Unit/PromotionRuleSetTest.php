@@ -0,0 +1,79 @@
+<?php
+
+namespace Tests\Unit;
+
+use App\Services\Promotions\CompiledPromotion;
+use App\Services\Promotions\PromotionRuleSet;
+use PHPUnit\Framework\TestCase;
+
+class PromotionRuleSetTest extends TestCase
+{
+    private PromotionRuleSet $ruleSet;
+
+    protected function setUp(): void
+    {
+        parent::setUp();
+
+        $this->ruleSet = new PromotionRuleSet(1, 1, [
+            $this->rule(1, 'product', ['products' => [10], 'minimum_purchase' => 50.0]),
+            $this->rule(2, 'product', ['products' => [20], 'minimum_purchase' => 100.0]),
+            $this->rule(3, 'category', ['categories' => ['drinks'], 'minimum_quantity' => 5]),
+            $this->rule(4, 'all', ['minimum_purchase' => 20.0]),
+            $this->rule(5, 'product', ['products' => [90], 'buy' => [30], 'get' => [40], 'minimum_quantity' => 1]),
+        ], PHP_INT_MAX);
+    }
+
+    public function test_promotions_outside_the_changed_scope_are_not_re_evaluated()
+    {
+        $affected = $this->ruleSet->affectedBy([20], [], $this->totals(60.0, 3), $this->totals(80.0, 4));
+
+        $this->assertSame([2, 4], $this->ids($affected));
+    }
+
+    public function test_minimum_bound_promotions_are_included_when_a_threshold_is_crossed()
+    {
+        // 50 crossed upwards for promotion 1, 5 units reached for promotion 3
+        $this->assertSame([1, 2, 3, 4], $this->ids($this->ruleSet->affectedBy([20], [], $this->totals(40.0, 3), $this->totals(80.0, 5))));
+
+        // ... and downwards
+        $this->assertSame([1, 2, 3, 4], $this->ids($this->ruleSet->affectedBy([20], [], $this->totals(80.0, 5), $this->totals(40.0, 3))));
+
+        // Landing exactly on the threshold counts as crossing it
+        $this->assertSame([1, 2, 4], $this->ids($this->ruleSet->affectedBy([20], [], $this->totals(49.99, 1), $this->totals(50.0, 1))));
+    }
+
+    public function test_changed_category_and_buy_x_get_y_products_are_included()
+    {
+        $this->assertSame([3, 4], $this->ids($this->ruleSet->affectedBy([70], ['drinks'], $this->totals(60.0, 1), $this->totals(70.0, 2))));
+        $this->assertSame([4, 5], $this->ids($this->ruleSet->affectedBy([40], [], $this->totals(60.0, 1), $this->totals(70.0, 2))));
+    }
+
+    private function totals(float $total, int $quantity): array
+    {
+        return ['total' => $total, 'quantity' => $quantity];
+    }
+
+    private function ids(array $promotions): array
+    {
+        return array_map(fn (CompiledPromotion $rule) => $rule->id, $promotions);
+    }
+
+    private function rule(int $id, string $scope, array $options): CompiledPromotion
+    {
+        $rule = new CompiledPromotion();
+        $rule->id = $id;
+        $rule->name = "Promotion {$id}";
+        $rule->type = isset($options['buy']) ? 'buy_x_get_y' : 'percentage';
+        $rule->scope = $scope;
+        $rule->scopeProductIds = array_fill_keys($options['products'] ?? [], true);
+        $rule->scopeCategories = array_fill_keys($options['categories'] ?? [], true);
+        $rule->buyProducts = $options['buy'] ?? [];
+        $rule->buyProductSet = array_fill_keys($rule->buyProducts, true);
+        $rule->getProducts = $options['get'] ?? [];
+        $rule->getProductSet = array_fill_keys($rule->getProducts, true);
+        $rule->minimumPurchase = $options['minimum_purchase'] ?? null;
+        $rule->minimumQuantity = $options['minimum_quantity'] ?? null;
+
+        return $rule;
+    }
+}
@@ -0,0 +1,172 @@
+/**
+ * Promotion Store Composable
+ *
+ * Shared, normalized client-side store for the promotions admin page.
+ * Promotions, products and categories are kept in Maps keyed by id, so
+ * lookups are O(1) instead of scanning arrays on every render, and the
+ * product labels shown on promotion cards are memoized until one of the
+ * products they reference changes.
+ */
+
+import { ref, shallowReactive } from 'vue'
+
+const promotionsById = shallowReactive(new Map())
+const productsById = shallowReactive(new Map())
+const categoriesById = shallowReactive(new Map())
+
+// Bumped on every product write; labels read it so cards re-render, then
+// recompute only if one of their own products was touched since.
+const productsVersion = ref(0)
+const productTouchedAt = new Map()
+
+// promotion object -> { buy, get, scope } parsed id lists
+const parsedIds = new WeakMap()
+// `${promotionId}:${kind}` -> { promo, version, label }
+const labelMemo = new Map()
+
+/**
+ * JSON id columns may arrive as arrays or (double-)encoded strings
+ */
+export const parseIdList = (value) => {
+  let ids = value
+  for (let i = 0; i < 2 && typeof ids === 'string'; i++) {
+    try {
+      ids = JSON.parse(ids || '[]')
+    } catch (e) {
+      ids = []
+    }
+  }
+  return (Array.isArray(ids) ? ids : []).map(Number).filter(Boolean)
+}
+
+const promoIds = (promo) => {
+  let ids = parsedIds.get(promo)
+  if (!ids) {
+    ids = {
+      buy: parseIdList(promo.buy_products),
+      get: parseIdList(promo.get_products),
+      scope: promo.scope === 'product' ? parseIdList(promo.scope_items) : []
+    }
+    parsedIds.set(promo, ids)
+  }
+  return ids
+}
+
+const upsertPromotions = (list = []) => {
+  list.forEach(promo => {
+    if (promo && promo.id) promotionsById.set(promo.id, promo)
+  })
+}
+
+const removePromotion = (id) => {
+  promotionsById.delete(id)
+  labelMemo.delete(`${id}:buy`)
+  labelMemo.delete(`${id}:get`)
+}
+
+const getPromotion = (id) => promotionsById.get(id)
+
+const upsertProducts = (list = []) => {
+  if (list.length === 0) return
+  const version = productsVersion.value + 1
+  list.forEach(product => {
+    if (!product || !product.id) return
+    productsById.set(product.id, product)
+    productTouchedAt.set(product.id, version)
+  })
+  productsVersion.value = version
+}
+
+const hasProduct = (id) => productsById.has(id)
+
+const getProduct = (id) => productsById.get(id)
+
+const setCategories = (list = []) => {
+  categoriesById.clear()
+  list.forEach(category => {
+    if (category && category.id !== undefined) categoriesById.set(category.id, category)
+  })
+}
+
+/**
+ * Product ids referenced by promotions that are not in the store yet
+ */
+const missingProductIds = (promotions = []) => {
+  const missing = new Set()
+  promotions.forEach(promo => {
+    const ids = promoIds(promo)
+    ;[ids.buy, ids.get, ids.scope].forEach(list => {
+      list.forEach(id => {
+        if (!productsById.has(id)) missing.add(id)
+      })
+    })
+  })
+  return [...missing]
+}
+
+/**
+ * "A", "A or B", "A, B, or C" for a list of product ids
+ */
+const productNamesLabel = (productIds = []) => {
+  if (!productIds || productIds.length === 0) return ''
+  const names = productIds.map(id => productsById.get(Number(id))?.name).filter(Boolean)
+  if (names.length === 0) return 'selected product(s)'
+  if (names.length === 1) return names[0]
+  if (names.length === 2) return names.join(' or ')
+  return `${names.slice(0, -1).join(', ')}, or ${names[names.length - 1]}`
+}
+
+const buildPromoProductsLabel = (ids) => {
+  if (ids.length === 0) return 'product(s)'
+  const names = ids.map(id => productsById.get(id)?.name).filter(Boolean)
+  if (names.length === 0) return 'product(s)'
+  if (names.length === 1) return names[0]
+  return `${names.length} products`
+}
+
+/**
+ * Memoized buy/get product label for a promotion card
+ */
+const promoProductsLabel = (promo, kind) => {
+  const version = productsVersion.value
+  const parsed = promoIds(promo)
+  const ids = kind === 'buy'
+    ? (parsed.buy.length ? parsed.buy : parsed.scope)
+    : (parsed.get.length ? parsed.get : parsed.scope)
+  const key = `${promo.id}:${kind}`
+  const memo = labelMemo.get(key)
+
+  if (memo && memo.promo === promo &&
+      (memo.version === version || !ids.some(id => (productTouchedAt.get(id) || 0) > memo.version))) {
+    memo.version = version
+    return memo.label
+  }
+
+  const label = buildPromoProductsLabel(ids)
+  labelMemo.set(key, { promo, version, label })
+  return label
+}
+
+/**
+ * Vue composable for the promotions store
+ */
+export const usePromotionStore = () => {
+  return {
+    promotionsById,
+    productsById,
+    categoriesById,
+    upsertPromotions,
+    removePromotion,
+    getPromotion,
+    upsertProducts,
+    hasProduct,
+    getProduct,
+    setCategories,
+    missingProductIds,
+    productNamesLabel,
+    promoProductsLabel,
+    parseIdList
+  }
+}
+
+export default usePromotionStore
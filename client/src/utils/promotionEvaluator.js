@@ -0,0 +1,336 @@
+/**
+ * Client-side promotion evaluator
+ *
+ * Prices a POS cart against the rule snapshot from GET /promotions/snapshot
+ * without a round-trip. It mirrors PromotionEvaluator and
+ * PromotionCombinationSolver on the server: only rules whose scope touches a
+ * cart line are priced, and the snapshot's policy decides which of them
+ * apply together. Sales are always re-evaluated by the server, so this only
+ * drives what the cashier sees.
+ */
+
+const round2 = (value) => Math.round((value + Number.EPSILON) * 100) / 100
+
+/**
+ * Whether a snapshot can still be used at the given time (ms)
+ */
+export const isSnapshotFresh = (snapshot, now = Date.now()) => {
+  return Boolean(snapshot && Array.isArray(snapshot.rules) && now < Number(snapshot.expires_at) * 1000)
+}
+
+/**
+ * Collapse cart lines into [price, units] buckets sorted by price ascending
+ */
+const priceBuckets = (items) => {
+  const units = new Map()
+  items.forEach(item => {
+    const qty = Math.max(0, Math.trunc(Number(item.quantity) || 0))
+    if (qty > 0) {
+      const price = Number(item.price) || 0
+      units.set(price, (units.get(price) || 0) + qty)
+    }
+  })
+  return [...units.entries()].sort((a, b) => a[0] - b[0])
+}
+
+const addBucket = (buckets, price, units) => {
+  return [...buckets, [price, units]].sort((a, b) => a[0] - b[0])
+}
+
+const unitCount = (buckets) => buckets.reduce((sum, [, qty]) => sum + qty, 0)
+
+// Total price of the `units` cheapest units (or all units if fewer)
+const cheapestUnitsValue = (buckets, units) => {
+  let value = 0
+  for (const [price, qty] of buckets) {
+    if (units <= 0) break
+    const take = Math.min(qty, units)
+    value += price * take
+    units -= take
+  }
+  return value
+}
+
+const dropCheapestUnits = (buckets, units) => {
+  const left = []
+  buckets.forEach(([price, qty]) => {
+    const take = Math.min(qty, Math.max(units, 0))
+    units -= take
+    if (take < qty) left.push([price, qty - take])
+  })
+  return left
+}
+
+const itemsIn = (items, productIds) => items.filter(item => productIds.has(Number(item.product_id)))
+
+const buyXGetYDiscount = (rule, matchedItems, cartItems, cartTotal) => {
+  const buyQty = Math.trunc(Number(rule.buy_quantity) || 0)
+  const getQty = Math.trunc(Number(rule.get_quantity) || 0)
+  const buyProducts = new Set(rule.buy_products || [])
+  const getProducts = new Set(rule.get_products || [])
+
+  switch (rule.scenario) {
+    case 'specific_product': {
+      if (buyProducts.size === 0 || buyQty <= 0) return 0
+      const buyUnits = itemsIn(cartItems, buyProducts)
+        .reduce((sum, item) => sum + Math.max(0, Math.trunc(Number(item.quantity) || 0)), 0)
+      const freeUnits = Math.floor(buyUnits / buyQty) * getQty
+      if (freeUnits <= 0) return 0
+
+      // Without get_products the free units come from the matched items
+      if (getProducts.size === 0) {
+        return cheapestUnitsValue(priceBuckets(matchedItems), freeUnits)
+      }
+
+      let buckets = priceBuckets(itemsIn(cartItems, getProducts))
+      const missingUnits = freeUnits - unitCount(buckets)
+      if (missingUnits > 0) {
+        // Free units not in the cart are valued at the cheapest get product
+        buckets = addBucket(buckets, Number(rule.get_price) || 0, missingUnits)
+      }
+      return cheapestUnitsValue(buckets, freeUnits)
+    }
+
+    case 'any_x_items': {
+      if (buyQty <= 0) return 0
+      const buckets = priceBuckets(matchedItems)
+      const freeUnits = Math.floor(unitCount(buckets) / buyQty) * getQty
+      if (freeUnits <= 0) return 0
+      return cheapestUnitsValue(buckets, freeUnits)
+    }
+
+    case 'spend_x_get_y': {
+      if (rule.minimum_purchase === null || cartTotal < rule.minimum_purchase || getQty <= 0) return 0
+      const eligibleGetItems = getProducts.size === 0 ? [] : itemsIn(cartItems, getProducts)
+      let buckets
+      if (eligibleGetItems.length > 0) {
+        buckets = priceBuckets(eligibleGetItems)
+      } else if (getProducts.size > 0) {
+        buckets = [[Number(rule.get_price) || 0, getQty]]
+      } else {
+        buckets = priceBuckets(matchedItems)
+      }
+      return cheapestUnitsValue(buckets, getQty)
+    }
+
+    case 'tiered': {
+      const tiers = rule.tiers || []
+      if (tiers.length === 0) return 0
+      let buckets = priceBuckets(matchedItems)
+      let totalUnits = unitCount(buckets)
+      let discount = 0
+      // Each tier takes its free units from the cheapest units left by the previous tier
+      tiers.forEach(tier => {
+        const freeUnits = Math.min(Math.floor(totalUnits / tier.buy) * tier.get, totalUnits)
+        if (freeUnits <= 0) return
+        discount += cheapestUnitsValue(buckets, freeUnits)
+        buckets = dropCheapestUnits(buckets, freeUnits)
+        totalUnits -= freeUnits
+      })
+      return discount
+    }
+  }
+
+  return 0
+}
+
+// Products a buy X get Y rule gives free units from; null for other types
+const freeUnitPool = (rule, matchedItems) => {
+  if (rule.type !== 'buy_x_get_y') return null
+  if ((rule.get_products || []).length > 0) return new Set(rule.get_products)
+  return new Set(matchedItems.map(item => Number(item.product_id)))
+}
+
+const overlaps = (pool, used) => {
+  for (const id of pool) {
+    if (used.has(id)) return true
+  }
+  return false
+}
+
+// By priority: take each rule that fits, stop after the first non-stackable one
+const priorityFirst = (priced) => {
+  const chosen = []
+  const used = new Set()
+  for (const entry of priced) {
+    if (entry.pool && overlaps(entry.pool, used)) continue
+    chosen.push(entry)
+    if (entry.pool) entry.pool.forEach(id => used.add(id))
+    if (!entry.rule.stackable) break
+  }
+  return chosen
+}
+
+/**
+ * Largest valid combination (at most one non-stackable rule, no shared free
+ * unit pools, total capped at the cart total) by branch and bound, seeded
+ * with the priority-first answer and stopped once the time budget is spent.
+ */
+const bestForCustomer = (priced, cap, budgetMs) => {
+  const greedy = priorityFirst(priced)
+  const items = [...priced].sort((a, b) => b.discount - a.discount)
+  const suffixStackable = []
+  const suffixExclusive = []
+  let stackable = 0
+  let exclusive = 0
+  for (let i = items.length - 1; i >= 0; i--) {
+    if (items[i].rule.stackable) stackable += items[i].discount
+    else exclusive = Math.max(exclusive, items[i].discount)
+    suffixStackable[i] = stackable
+    suffixExclusive[i] = exclusive
+  }
+
+  const sum = (entries) => entries.reduce((total, entry) => total + entry.discount, 0)
+  let bestValue = Math.min(sum(greedy), cap)
+  let bestChoice = greedy
+  if (bestValue >= Math.min(stackable + exclusive, cap)) return greedy
+
+  const deadline = Date.now() + budgetMs
+  let nodes = 0
+  let timedOut = false
+  const chosen = []
+
+  const search = (index, value, hasExclusive, used) => {
+    if (timedOut) return
+    if (++nodes % 128 === 0 && Date.now() > deadline) {
+      timedOut = true
+      return
+    }
+    const capped = Math.min(value, cap)
+    if (capped > bestValue + 0.000001) {
+      bestValue = capped
+      bestChoice = [...chosen]
+    }
+    if (index >= items.length || bestValue >= cap) return
+    const bound = value + suffixStackable[index] + (hasExclusive ? 0 : suffixExclusive[index])
+    if (Math.min(bound, cap) <= bestValue + 0.000001) return
+
+    const entry = items[index]
+    const fits = !(hasExclusive && !entry.rule.stackable) && !(entry.pool && overlaps(entry.pool, used))
+    if (fits) {
+      chosen.push(entry)
+      const nextUsed = entry.pool ? new Set([...used, ...entry.pool]) : used
+      search(index + 1, value + entry.discount, hasExclusive || !entry.rule.stackable, nextUsed)
+      chosen.pop()
+    }
+    search(index + 1, value, hasExclusive, used)
+  }
+  search(0, 0, false, new Set())
+
+  return bestChoice.sort((a, b) => a.position - b.position)
+}
+
+const matchedItemsFor = (rule, cartItems) => {
+  if (rule.scope === 'product') {
+    const ids = new Set(rule.scope_products || [])
+    return cartItems.filter(item => ids.has(Number(item.product_id)))
+  }
+  if (rule.scope === 'category') {
+    const categories = new Set(rule.scope_categories || [])
+    return cartItems.filter(item => item.category !== null && item.category !== undefined &&
+      categories.has(String(item.category)))
+  }
+  return cartItems
+}
+
+/**
+ * Evaluate a cart against a snapshot.
+ *
+ * cartItems: [{ product_id, quantity, price, category }]
+ *
+ * Returns the same shape as POST /promotions/calculate-discount. When a
+ * rule touching the cart has usage limits or targets some customers only
+ * (first-time buyers, customer groups), `needs_server` is set and the
+ * caller should ask the server instead, since only it knows current usage
+ * and customer profiles.
+ */
+export const evaluatePromotions = (snapshot, cartItems, cartTotal) => {
+  const cartQuantityTotal = cartItems.reduce((sum, item) => sum + (Number(item.quantity) || 0), 0)
+  const candidates = []
+  for (const rule of snapshot.rules) {
+    const matchedItems = matchedItemsFor(rule, cartItems)
+    if (matchedItems.length === 0) continue
+    if (rule.limited || rule.targeted) {
+      return { applicable_promotions: [], total_discount: 0, needs_server: true }
+    }
+    candidates.push([rule, matchedItems])
+  }
+
+  const priced = []
+
+  for (const [rule, matchedItems] of candidates) {
+    const minimumPurchase = rule.minimum_purchase
+    const minimumQuantity = rule.minimum_quantity
+    const hasAnyMinConfigured = minimumPurchase !== null || minimumQuantity !== null
+    const minimumPurchaseMet = minimumPurchase !== null && cartTotal >= minimumPurchase
+    const minimumQuantityMet = minimumQuantity !== null && cartQuantityTotal >= minimumQuantity
+    if (hasAnyMinConfigured && !minimumPurchaseMet && !minimumQuantityMet) continue
+
+    let discount = 0
+    switch (rule.type) {
+      case 'percentage':
+      case 'bulk_discount': {
+        const matchedTotal = matchedItems.reduce((sum, item) => sum + item.price * item.quantity, 0)
+        discount = matchedTotal * (rule.value / 100)
+        break
+      }
+      case 'spend_save': {
+        // Percentage off the matched lines once they reach the minimum spend
+        const matchedTotal = matchedItems.reduce((sum, item) => sum + item.price * item.quantity, 0)
+        if (minimumPurchase !== null && matchedTotal < minimumPurchase) continue
+        discount = matchedTotal * (rule.value / 100)
+        break
+      }
+      case 'fixed_amount':
+        if (minimumPurchase !== null && cartTotal < minimumPurchase) continue
+        discount = rule.value
+        break
+      case 'buy_x_get_y':
+        discount = buyXGetYDiscount(rule, matchedItems, cartItems, cartTotal)
+        break
+    }
+
+    if (discount > 0) {
+      priced.push({ rule, discount, pool: freeUnitPool(rule, matchedItems), position: priced.length })
+    }
+  }
+
+  const cap = Math.max(0, Number(cartTotal) || 0)
+  const chosen = snapshot.policy === 'best_for_customer'
+    ? bestForCustomer(priced, cap, Number(snapshot.solver_budget_ms) || 5)
+    : priorityFirst(priced)
+
+  // Never discount more than the cart is worth. As on the server, rules keep
+  // their discount in priority order until the cart total is used up, each
+  // rounded to cents, so the rows add up to total_discount and match what
+  // checkout charges; a rule left with nothing to give is not applied.
+  const applicablePromotions = []
+  let totalDiscount = 0
+  let remaining = round2(cap)
+  for (const { rule, discount: priced } of chosen) {
+    const discount = Math.min(round2(priced), remaining)
+    if (discount <= 0) continue
+    remaining = round2(remaining - discount)
+    totalDiscount += discount
+    applicablePromotions.push({
+      id: rule.id,
+      name: rule.name,
+      type: rule.type,
+      discount,
+      buy_quantity: rule.buy_quantity,
+      get_quantity: rule.get_quantity,
+      buy_products: rule.buy_products,
+      get_products: rule.get_products,
+      minimum_purchase: rule.minimum_purchase,
+      minimum_quantity: rule.minimum_quantity
+    })
+  }
+
+  return {
+    applicable_promotions: applicablePromotions,
+    total_discount: round2(totalDiscount),
+    needs_server: false
+  }
+}
+
+export default evaluatePromotions
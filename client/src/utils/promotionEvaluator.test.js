@@ -0,0 +1,36 @@
+import test from 'node:test'
+import assert from 'node:assert/strict'
+import { evaluatePromotions } from './promotionEvaluator.js'
+
+const rule = (id, type, value) => ({
+  id,
+  name: `Rule ${id}`,
+  type,
+  value,
+  scope: 'all',
+  stackable: true,
+  minimum_purchase: null,
+  minimum_quantity: null
+})
+
+const snapshot = (rules) => ({ policy: 'priority_first', solver_budget_ms: 5, rules })
+
+test('applied discounts are clipped to the cart total in priority order', () => {
+  const rules = [rule(1, 'fixed_amount', 30), rule(2, 'fixed_amount', 25), rule(3, 'fixed_amount', 5)]
+  const cart = [{ product_id: 1, quantity: 2, price: 20, category: null }]
+
+  const result = evaluatePromotions(snapshot(rules), cart, 40)
+
+  assert.deepEqual(result.applicable_promotions.map(row => [row.id, row.discount]), [[1, 30], [2, 10]])
+  assert.equal(result.total_discount, 40)
+})
+
+test('total is the sum of the rows rounded to cents', () => {
+  const rules = [rule(1, 'percentage', 10), rule(2, 'percentage', 10)]
+  const cart = [{ product_id: 1, quantity: 1, price: 33.33, category: null }]
+
+  const result = evaluatePromotions(snapshot(rules), cart, 33.33)
+
+  assert.deepEqual(result.applicable_promotions.map(row => row.discount), [3.33, 3.33])
+  assert.equal(result.total_discount, 6.66)
+})